@@ -7,34 +7,171 @@ import asyncio
 import logging
 import os
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import re
 from dotenv import load_dotenv
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from emergentintegrations.llm.chat import UserMessage
+
+from ai_response_cache import ai_response_cache, prompt_hash
+from ai_usage import AIBudgetExceededError, ai_usage_tracker
+from circuit_breaker import CircuitOpenError
+from llm_client import llm_client_pool
+from models import AIBlogContent
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Response section markers and the blog fields they map to
+SECTION_FIELDS = {
+    "BLOG_TITLE": "title",
+    "BLOG_SLUG": "slug",
+    "META_TITLE": "metaTitle",
+    "META_DESCRIPTION": "metaDescription",
+    "EXCERPT": "excerpt",
+    "BLOG_CONTENT": "content",
+    "SEO_KEYWORDS": "seoKeywords",
+    "SUGGESTED_TAGS": "tags",
+}
+SECTION_MARKER_PATTERN = re.compile(r"[ \t*#]*(" + "|".join(SECTION_FIELDS) + r")\**:\**[ \t]*")
+# Text that SECTION_MARKER_PATTERN could still match once more of the line arrives
+PARTIAL_MARKER_PATTERN = re.compile(
+    r"[ \t*#]*(?:" + "|".join(name[:length] for name in SECTION_FIELDS for length in range(1, len(name)))
+    + r"|(?:" + "|".join(SECTION_FIELDS) + r")\**)?"
+)
+# Same markers anchored at line starts, for tokenizing a complete response in one pass
+SECTION_TOKEN_PATTERN = re.compile(r"^" + SECTION_MARKER_PATTERN.pattern, re.MULTILINE)
+LIST_SEPARATOR_PATTERN = re.compile(r"[,\n]")
+LIST_BULLET_PATTERN = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])\s*")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+SLUG_STRIP_PATTERN = re.compile(r"[^\w\s-]")
+SLUG_SPACE_PATTERN = re.compile(r"[\s_-]+")
+JSON_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+# Ask for a JSON object matching AIBlogContent instead of labelled sections
+STRUCTURED_OUTPUT = os.environ.get("AI_STRUCTURED_OUTPUT", "").lower() in ("1", "true", "yes")
+BLOG_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "blog_post", "schema": AIBlogContent.model_json_schema()}
+}
+
+TOPIC_PROMPT_TEMPLATE = """Generate {count} engaging blog post topics for Kashmir tourism in the {category} category.
+            
+            Focus on:
+            - Unique aspects of Kashmir
+            - Seasonal attractions
+            - Cultural experiences
+            - Adventure activities
+            - Local insights
+            - Photography opportunities
+            
+            Return only the topic titles, one per line, without numbers or bullets.
+            Make them specific, engaging, and SEO-friendly."""
+
+# How long cached AI responses are reused
+TOPIC_CACHE_TTL_SECONDS = int(os.environ.get("AI_TOPIC_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+GENERATION_CACHE_TTL_SECONDS = int(os.environ.get("AI_GENERATION_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Interactive calls get a tighter budget than full post generation (LLM_TIMEOUT_SECONDS)
+TOPIC_TIMEOUT_SECONDS = float(os.environ.get("LLM_TOPIC_TIMEOUT_SECONDS", "20"))
+CONNECTION_TEST_TIMEOUT_SECONDS = float(os.environ.get("LLM_CONNECTION_TEST_TIMEOUT_SECONDS", "15"))
+
+def tokenize_sections(text: str) -> Dict[str, str]:
+    """Split a complete labelled AI response into section text keyed by blog field.
+
+    Scans the response once; each section runs until the next marker that
+    starts a line, so multi-line sections are never cut short.
+    """
+    sections: Dict[str, str] = {}
+    markers = list(SECTION_TOKEN_PATTERN.finditer(text))
+    for index, marker in enumerate(markers):
+        end = markers[index + 1].start() if index + 1 < len(markers) else len(text)
+        sections.setdefault(SECTION_FIELDS[marker.group(1)], text[marker.end():end].strip())
+    return sections
+
+def _first_line(text: str) -> str:
+    return next((line.strip() for line in text.splitlines() if line.strip()), "")
+
+def _split_list(value) -> List[str]:
+    """Keywords/tags from a comma- or line-separated string (bullets allowed) or a list."""
+    items = value if isinstance(value, list) else LIST_SEPARATOR_PATTERN.split(value or "")
+    cleaned = (LIST_BULLET_PATTERN.sub("", item).strip() for item in items)
+    return [item for item in cleaned if item]
+
+class StreamingSectionParser:
+    """Incrementally splits a streamed AI response into its labelled sections.
+
+    Text is forwarded as soon as it can no longer be the start of a
+    section marker, so content reaches the editor while it is generated.
+    """
+
+    def __init__(self):
+        # Text pieces per marker, joined once in fields(); appending to one string is quadratic
+        self.sections: Dict[str, List[str]] = {}
+        self.current: Optional[str] = None
+        self._pending = ""
+        self._at_line_start = True
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Consume a chunk and return (field, text) deltas ready to forward."""
+        self._pending += chunk
+        return self._drain(final=False)
+
+    def _drain(self, final: bool) -> List[Tuple[str, str]]:
+        deltas = []
+        while self._pending:
+            if self._at_line_start:
+                marker = SECTION_MARKER_PATTERN.match(self._pending)
+                if marker and (final or marker.end() < len(self._pending)):
+                    # A repeated section is ignored: the first one wins, as in tokenize_sections
+                    self.current = None if marker.group(1) in self.sections else marker.group(1)
+                    if self.current:
+                        self.sections[self.current] = []
+                    self._pending = self._pending[marker.end():]
+                    self._at_line_start = False
+                    continue
+                if not final and (marker or PARTIAL_MARKER_PATTERN.fullmatch(self._pending)):
+                    # Wait for more text: the marker may not be complete yet (e.g. a trailing "**")
+                    break
+
+            newline = self._pending.find("\n")
+            if newline == -1:
+                text, self._pending = self._pending, ""
+                self._at_line_start = False
+            else:
+                text, self._pending = self._pending[:newline + 1], self._pending[newline + 1:]
+                self._at_line_start = True
+
+            if self.current:
+                self.sections[self.current].append(text)
+                deltas.append((SECTION_FIELDS[self.current], text))
+
+        return deltas
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flush any text still held back at the end of the stream."""
+        return self._drain(final=True)
+
+    def fields(self) -> Dict[str, str]:
+        """Section text keyed by blog field name."""
+        return {SECTION_FIELDS[marker]: "".join(pieces).strip() for marker, pieces in self.sections.items()}
+
 class AIBlogGenerator:
     def __init__(self):
         self.api_key = os.environ.get("EMERGENT_LLM_KEY")
         self.default_model = "gpt-4o-mini"
         self.default_provider = "openai"
+        self.system_prompt = self._get_system_prompt()
+        self.structured_output = STRUCTURED_OUTPUT
+        self.topic_template_hash = prompt_hash(self.system_prompt, TOPIC_PROMPT_TEMPLATE)
         
     def get_chat_client(self, model: str = None, provider: str = None):
-        """Get configured LLM chat client"""
+        """Get pooled LLM chat client for the provider/model"""
         model = model or self.default_model
         provider = provider or self.default_provider
         
-        chat = LlmChat(
-            api_key=self.api_key,
-            session_id=f"blog_generator_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-            system_message=self._get_system_prompt()
-        )
-        
-        return chat.with_model(provider, model)
+        return llm_client_pool.chat(provider, model, self.system_prompt, api_key=self.api_key)
     
     def _get_system_prompt(self) -> str:
         """Get the system prompt for blog generation"""
@@ -63,33 +200,198 @@ class AIBlogGenerator:
         tone: str = "informative",
         focus_areas: List[str] = None,
         model: str = None,
-        provider: str = None
+        provider: str = None,
+        use_cache: bool = True,
+        user_id: str = None
     ) -> Dict:
         """Generate a complete blog post using AI"""
         try:
-            chat = self.get_chat_client(model, provider)
             keywords = keywords or []
             focus_areas = focus_areas or []
             
             # Create the generation prompt
             prompt = self._create_generation_prompt(
-                topic, category, keywords, target_length, tone, focus_areas
+                topic, category, keywords, target_length, tone, focus_areas, structured=self.structured_output
             )
+            lookup = await self._lookup_cached_post(
+                prompt, topic, category, keywords, target_length, tone, focus_areas, model, provider, use_cache
+            )
+            if lookup["value"]:
+                return self._from_cache(lookup["value"], prompt)
             
-            user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
-            
-            # Parse the AI response into structured data
-            blog_data = self._parse_ai_response(response, topic, category, keywords)
-            blog_data["aiModel"] = f"{provider or self.default_provider}/{model or self.default_model}"
+            await ai_usage_tracker.check_budget(user_id)
+            chat = self.get_chat_client(model, provider)
+            async with self._track_usage(
+                "blog_post", model, provider, user_id, category=category, targetLength=target_length
+            ) as usage:
+                if self.structured_output:
+                    blog_data = await self._complete_structured(chat, prompt, topic, category, keywords, usage)
+                else:
+                    response = await chat.send_message(UserMessage(text=prompt), usage=usage)
+                    blog_data = self._parse_ai_response(response, topic, category, keywords)
+            blog_data["aiModel"] = self._model_name(model, provider)
             blog_data["generationPrompt"] = prompt
+            await self._cache_post(lookup, blog_data)
             
             return blog_data
             
+        except (AIBudgetExceededError, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Error generating blog post: {e}")
             raise Exception(f"Blog generation failed: {str(e)}")
     
+    def _model_name(self, model: str = None, provider: str = None) -> str:
+        return f"{provider or self.default_provider}/{model or self.default_model}"
+    
+    def _track_usage(self, operation: str, model: str = None, provider: str = None, user_id: str = None, **metadata):
+        return ai_usage_tracker.track(
+            operation, provider or self.default_provider, model or self.default_model, user_id, **metadata
+        )
+    
+    async def _lookup_cached_post(
+        self,
+        prompt: str,
+        topic: str,
+        category: str,
+        keywords: List[str],
+        target_length: int,
+        tone: str,
+        focus_areas: List[str],
+        model: str,
+        provider: str,
+        use_cache: bool
+    ) -> Dict:
+        """Find a cached generation for this exact prompt or, with embeddings enabled, a near-duplicate one."""
+        ai_model = self._model_name(model, provider)
+        lookup = {
+            "key": prompt_hash("blog_post", self.system_prompt, prompt, ai_model),
+            # A similar prompt only counts if these match exactly
+            "scope": {"category": category, "tone": tone, "targetLength": target_length, "aiModel": ai_model},
+            "embedding": None,
+            "value": None,
+            "enabled": use_cache
+        }
+        if not use_cache:
+            return lookup
+        
+        lookup["value"] = await ai_response_cache.get(lookup["key"])
+        if lookup["value"] is None:
+            similarity_text = "\n".join([topic, ", ".join(keywords), ", ".join(focus_areas)])
+            lookup["embedding"] = await ai_response_cache.embed(similarity_text, provider or self.default_provider)
+            if lookup["embedding"] is not None:
+                lookup["value"] = await ai_response_cache.find_similar("blog_post", lookup["scope"], lookup["embedding"])
+        return lookup
+    
+    async def _cache_post(self, lookup: Dict, blog_data: Dict):
+        if not lookup["enabled"]:
+            return
+        value = {k: v for k, v in blog_data.items() if k not in ("generatedAt", "generationPrompt")}
+        await ai_response_cache.set(
+            lookup["key"], "blog_post", value, GENERATION_CACHE_TTL_SECONDS,
+            scope=lookup["scope"], embedding=lookup["embedding"]
+        )
+    
+    def _from_cache(self, value: Dict, prompt: str) -> Dict:
+        return {**value, "generatedAt": datetime.utcnow(), "generationPrompt": prompt}
+    
+    def _replay_deltas(self, blog_data: Dict):
+        """Delta events for a post that was not streamed section by section."""
+        for field in SECTION_FIELDS.values():
+            text = blog_data.get(field)
+            if text:
+                yield "delta", (field, ", ".join(text) if isinstance(text, list) else text)
+    
+    async def _complete_structured(
+        self,
+        chat,
+        prompt: str,
+        topic: str,
+        category: str,
+        keywords: List[str],
+        usage=None
+    ) -> Dict:
+        """Request a JSON completion and validate it into blog data."""
+        response = await chat.send_message(UserMessage(text=prompt), response_format=BLOG_RESPONSE_FORMAT, usage=usage)
+        return self._parse_structured_response(response, topic, category, keywords)
+    
+    async def _stream_completion(self, chat, user_message, usage=None) -> AsyncIterator[str]:
+        """Yield completion text as the provider produces it."""
+        stream_message = getattr(chat, "stream_message", None)
+        if stream_message is None:
+            # Client build without streaming support: deliver the completion in one piece
+            yield await chat.send_message(user_message, usage=usage)
+            return
+
+        async for chunk in stream_message(user_message, usage=usage):
+            yield chunk
+
+    async def stream_blog_post(
+        self,
+        topic: str,
+        category: str,
+        keywords: List[str] = None,
+        target_length: int = 1500,
+        tone: str = "informative",
+        focus_areas: List[str] = None,
+        model: str = None,
+        provider: str = None,
+        use_cache: bool = True,
+        user_id: str = None
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """Generate a blog post, yielding ("delta", (field, text)) while streaming and ("done", blog_data) at the end.
+
+        Closing the iterator early stops the upstream completion.
+        """
+        keywords = keywords or []
+        focus_areas = focus_areas or []
+
+        prompt = self._create_generation_prompt(
+            topic, category, keywords, target_length, tone, focus_areas, structured=self.structured_output
+        )
+        lookup = await self._lookup_cached_post(
+            prompt, topic, category, keywords, target_length, tone, focus_areas, model, provider, use_cache
+        )
+        if lookup["value"]:
+            # Replay the cached post field by field so the editor preview fills in as usual
+            for event in self._replay_deltas(lookup["value"]):
+                yield event
+            yield "done", self._from_cache(lookup["value"], prompt)
+            return
+
+        await ai_usage_tracker.check_budget(user_id)
+        chat = self.get_chat_client(model, provider)
+        if self.structured_output:
+            # A JSON document cannot be split into sections until it is complete
+            async with self._track_usage(
+                "blog_post", model, provider, user_id, category=category, targetLength=target_length
+            ) as usage:
+                blog_data = await self._complete_structured(chat, prompt, topic, category, keywords, usage)
+            for event in self._replay_deltas(blog_data):
+                yield event
+            blog_data["aiModel"] = self._model_name(model, provider)
+            blog_data["generationPrompt"] = prompt
+            await self._cache_post(lookup, blog_data)
+            yield "done", blog_data
+            return
+
+        parser = StreamingSectionParser()
+
+        async with self._track_usage(
+            "blog_post_stream", model, provider, user_id, category=category, targetLength=target_length
+        ) as usage:
+            async for chunk in self._stream_completion(chat, UserMessage(text=prompt), usage):
+                for delta in parser.feed(chunk):
+                    yield "delta", delta
+            for delta in parser.finish():
+                yield "delta", delta
+
+            blog_data = self._build_blog_data(parser.fields(), topic, category, keywords)
+        blog_data["aiModel"] = self._model_name(model, provider)
+        blog_data["generationPrompt"] = prompt
+        await self._cache_post(lookup, blog_data)
+        yield "done", blog_data
+
     def _create_generation_prompt(
         self,
         topic: str,
@@ -97,14 +399,15 @@ class AIBlogGenerator:
         keywords: List[str],
         target_length: int,
         tone: str,
-        focus_areas: List[str]
+        focus_areas: List[str],
+        structured: bool = False
     ) -> str:
         """Create a detailed prompt for blog generation"""
         
         keyword_text = ", ".join(keywords) if keywords else "Kashmir tourism, travel guide"
         focus_text = ", ".join(focus_areas) if focus_areas else "local experiences, travel tips"
         
-        prompt = f"""Create a comprehensive blog post for G.M.B Travels Kashmir with the following specifications:
+        specification = f"""Create a comprehensive blog post for G.M.B Travels Kashmir with the following specifications:
 
 TOPIC: {topic}
 CATEGORY: {category}
@@ -112,7 +415,33 @@ TARGET LENGTH: {target_length} words
 TONE: {tone}
 KEYWORDS TO INCLUDE: {keyword_text}
 FOCUS AREAS: {focus_text}
-
+"""
+        reminders = f"""
+Remember to:
+- Write in {tone} tone
+- Include natural mentions of Kashmir destinations
+- Add practical travel advice
+- Maintain cultural sensitivity
+- Include seasonal travel tips where relevant
+- Mention G.M.B Travels Kashmir's local expertise naturally
+"""
+        
+        if structured:
+            return specification + f"""
+Respond with a single JSON object and nothing else, with these fields:
+- "title": an engaging, SEO-friendly title
+- "slug": a URL-friendly slug based on the title
+- "metaTitle": a 60-character SEO title
+- "metaDescription": a 160-character meta description
+- "excerpt": a compelling 200-word excerpt that summarizes the post
+- "content": the full blog post in markdown, exactly {target_length} words, with an engaging introduction, \
+subheadings, practical travel tips, local insights, subtle mentions of G.M.B Travels Kashmir services, \
+a call-to-action to book tours and an inspiring conclusion
+- "seoKeywords": an array of 8-10 relevant SEO keywords
+- "tags": an array of 5-6 relevant blog tags
+""" + reminders
+        
+        prompt = specification + f"""
 Please structure your response EXACTLY as follows:
 
 BLOG_TITLE: [Create an engaging, SEO-friendly title]
@@ -140,76 +469,51 @@ Make it exactly {target_length} words, engaging, and informative.]
 SEO_KEYWORDS: [List 8-10 relevant SEO keywords, comma-separated]
 
 SUGGESTED_TAGS: [List 5-6 relevant blog tags, comma-separated]
-
-Remember to:
-- Write in {tone} tone
-- Include natural mentions of Kashmir destinations
-- Add practical travel advice
-- Maintain cultural sensitivity
-- Include seasonal travel tips where relevant
-- Mention G.M.B Travels Kashmir's local expertise naturally
-"""
+""" + reminders
         
         return prompt
     
     def _parse_ai_response(self, response: str, topic: str, category: str, keywords: List[str]) -> Dict:
-        """Parse AI response into structured blog data"""
+        """Parse a labelled-section AI response into structured blog data"""
+        return self._build_blog_data(tokenize_sections(response), topic, category, keywords)
+    
+    def _parse_structured_response(self, response: str, topic: str, category: str, keywords: List[str]) -> Dict:
+        """Validate a JSON AI response against AIBlogContent and build blog data from it"""
         try:
-            # Extract different sections using regex
-            title = self._extract_section(response, r"BLOG_TITLE:\s*(.+?)(?=\n|$)")
-            slug = self._extract_section(response, r"BLOG_SLUG:\s*(.+?)(?=\n|$)")
-            meta_title = self._extract_section(response, r"META_TITLE:\s*(.+?)(?=\n|$)")
-            meta_description = self._extract_section(response, r"META_DESCRIPTION:\s*(.+?)(?=\n|$)")
-            excerpt = self._extract_section(response, r"EXCERPT:\s*(.+?)(?=BLOG_CONTENT:|$)", multiline=True)
-            content = self._extract_section(response, r"BLOG_CONTENT:\s*(.+?)(?=SEO_KEYWORDS:|$)", multiline=True)
-            seo_keywords = self._extract_section(response, r"SEO_KEYWORDS:\s*(.+?)(?=\n|$)")
-            tags = self._extract_section(response, r"SUGGESTED_TAGS:\s*(.+?)(?=\n|$)")
-            
-            # Process extracted data
-            seo_keywords_list = [k.strip() for k in seo_keywords.split(",")] if seo_keywords else keywords
-            tags_list = [t.strip() for t in tags.split(",")] if tags else []
-            
-            # Create slug if not provided
-            if not slug:
-                slug = self._create_slug(title or topic)
-            
-            return {
-                "title": title or f"Discover {topic} in Kashmir",
-                "slug": slug,
-                "content": content or "Content generation failed. Please try again.",
-                "excerpt": excerpt or f"Explore {topic} with G.M.B Travels Kashmir.",
-                "category": category,
-                "tags": tags_list,
-                "metaTitle": meta_title or title,
-                "metaDescription": meta_description or excerpt[:160] if excerpt else None,
-                "seoKeywords": seo_keywords_list,
-                "isAIGenerated": True,
-                "generatedAt": datetime.utcnow()
-            }
-            
-        except Exception as e:
-            logger.error(f"Error parsing AI response: {e}")
-            # Fallback response
-            slug = self._create_slug(topic)
-            return {
-                "title": f"Discover {topic} in Kashmir",
-                "slug": slug,
-                "content": response,  # Use raw response as fallback
-                "excerpt": f"Explore the beauty of {topic} in Kashmir with G.M.B Travels Kashmir.",
-                "category": category,
-                "tags": [category, "kashmir", "travel"],
-                "metaTitle": f"{topic} in Kashmir - Travel Guide",
-                "metaDescription": f"Discover {topic} in Kashmir. Complete travel guide with tips and insights.",
-                "seoKeywords": keywords + ["kashmir", topic.lower()],
-                "isAIGenerated": True,
-                "generatedAt": datetime.utcnow()
-            }
+            content = AIBlogContent.model_validate_json(JSON_FENCE_PATTERN.sub("", response))
+        except ValueError as e:
+            raise ValueError(f"AI response is not valid blog JSON: {e}")
+        return self._build_blog_data(content.model_dump(), topic, category, keywords)
     
-    def _extract_section(self, text: str, pattern: str, multiline: bool = False) -> str:
-        """Extract a section from the AI response using regex"""
-        flags = re.MULTILINE | re.DOTALL if multiline else re.MULTILINE
-        match = re.search(pattern, text, flags)
-        return match.group(1).strip() if match else ""
+    def _build_blog_data(self, sections: Dict, topic: str, category: str, keywords: List[str]) -> Dict:
+        """Turn section values (keyed by blog field) into structured blog data"""
+        content = sections.get("content") or ""
+        if not content.strip():
+            raise ValueError("AI response did not contain any blog content")
+        
+        title = _first_line(sections.get("title") or "")
+        meta_title = _first_line(sections.get("metaTitle") or "")
+        meta_description = WHITESPACE_PATTERN.sub(" ", sections.get("metaDescription") or "").strip()
+        excerpt = (sections.get("excerpt") or "").strip()
+        seo_keywords_list = _split_list(sections.get("seoKeywords")) or keywords
+        tags_list = _split_list(sections.get("tags"))
+        
+        # Normalize the suggested slug, or create one from the title
+        slug = self._create_slug(_first_line(sections.get("slug") or "") or title or topic)
+        
+        return {
+            "title": title or f"Discover {topic} in Kashmir",
+            "slug": slug,
+            "content": content.strip(),
+            "excerpt": excerpt or f"Explore {topic} with G.M.B Travels Kashmir.",
+            "category": category,
+            "tags": tags_list,
+            "metaTitle": meta_title or title,
+            "metaDescription": meta_description or (excerpt[:160] if excerpt else None),
+            "seoKeywords": seo_keywords_list,
+            "isAIGenerated": True,
+            "generatedAt": datetime.utcnow()
+        }
     
     def _create_slug(self, title: str) -> str:
         """Create a URL-friendly slug from title"""
@@ -217,39 +521,62 @@ Remember to:
             return f"kashmir-travel-{datetime.utcnow().strftime('%Y%m%d')}"
         
         # Convert to lowercase and replace spaces with hyphens
-        slug = re.sub(r'[^\w\s-]', '', title.lower())
-        slug = re.sub(r'[\s_-]+', '-', slug)
+        slug = SLUG_STRIP_PATTERN.sub('', title.lower())
+        slug = SLUG_SPACE_PATTERN.sub('-', slug)
         slug = slug.strip('-')
         
         return slug[:50]  # Limit slug length
     
-    async def generate_topic_suggestions(self, category: str, count: int = 5) -> List[str]:
-        """Generate topic suggestions for a given category"""
+    async def generate_topic_suggestions(
+        self,
+        category: str,
+        count: int = 5,
+        refresh: bool = False,
+        user_id: str = None,
+        fallback: bool = True
+    ) -> List[str]:
+        """Generate topic suggestions for a given category.
+        
+        Suggestions are cached per (template, category, count, model); pass
+        refresh=True to ask the model again and replace the cached list.
+        If the model cannot be used, a few static topics are returned, or
+        with fallback=False the error is raised.
+        """
+        cache_key = prompt_hash("topics", self.topic_template_hash, category, count, self._model_name())
+        if not refresh:
+            cached = await ai_response_cache.get(cache_key)
+            if cached:
+                return cached
+        
         try:
+            await ai_usage_tracker.check_budget(user_id)
             chat = self.get_chat_client()
             
-            prompt = f"""Generate {count} engaging blog post topics for Kashmir tourism in the {category} category.
-            
-            Focus on:
-            - Unique aspects of Kashmir
-            - Seasonal attractions
-            - Cultural experiences
-            - Adventure activities
-            - Local insights
-            - Photography opportunities
-            
-            Return only the topic titles, one per line, without numbers or bullets.
-            Make them specific, engaging, and SEO-friendly."""
-            
+            prompt = TOPIC_PROMPT_TEMPLATE.format(count=count, category=category)
             user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
+            async with self._track_usage("topics", user_id=user_id, category=category, count=count) as usage:
+                response = await chat.send_message(user_message, timeout=TOPIC_TIMEOUT_SECONDS, usage=usage)
             
             # Split response into individual topics
-            topics = [topic.strip() for topic in response.split('\n') if topic.strip()]
-            return topics[:count]
+            topics = [topic.strip() for topic in response.split('\n') if topic.strip()][:count]
+            if not topics:
+                raise ValueError("Empty topic response")
+            
+            await ai_response_cache.set(
+                cache_key, "topics", topics, TOPIC_CACHE_TTL_SECONDS,
+                scope={"category": category, "count": count}
+            )
+            return topics
             
+        except (CircuitOpenError, AIBudgetExceededError) as e:
+            if not fallback:
+                raise
+            logger.warning(f"Serving fallback topic suggestions: {e}")
+            return self._get_fallback_topics(category, count)
         except Exception as e:
             logger.error(f"Error generating topic suggestions: {e}")
+            if not fallback:
+                raise
             return self._get_fallback_topics(category, count)
     
     def _get_fallback_topics(self, category: str, count: int) -> List[str]:
@@ -308,7 +635,8 @@ Remember to:
         try:
             chat = self.get_chat_client()
             test_message = UserMessage(text="Say 'AI connection test successful' and nothing else.")
-            response = await chat.send_message(test_message)
+            async with self._track_usage("connection_test") as usage:
+                response = await chat.send_message(test_message, timeout=CONNECTION_TEST_TIMEOUT_SECONDS, usage=usage)
             return "successful" in response.lower()
         except Exception as e:
             logger.error(f"AI connection test failed: {e}")
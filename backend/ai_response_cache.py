@@ -0,0 +1,143 @@
+"""
+AI Response Cache for G.M.B Travels Kashmir
+Persists LLM results in MongoDB so repeated prompts skip the model call
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from database import get_database
+from llm_client import llm_client_pool
+
+logger = logging.getLogger(__name__)
+
+def prompt_hash(*parts: Any) -> str:
+    """Stable SHA-256 over prompt templates and parameters."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class AIResponseCache:
+    """MongoDB-backed cache for AI responses with a TTL per entry.
+
+    Exact lookups use a key built from the prompt template hash and the
+    request parameters. When an embedding model is configured
+    (AI_CACHE_EMBEDDING_MODEL, which requires an endpoint for the provider:
+    LLM_BASE_URL_<PROVIDER> or LLM_BASE_URL), entries can
+    also be found by cosine similarity to a new prompt, so near-duplicate
+    blog requests reuse an earlier generation.
+    """
+
+    def __init__(
+        self,
+        collection_name: str = "ai_response_cache",
+        embedding_model: Optional[str] = os.environ.get("AI_CACHE_EMBEDDING_MODEL"),
+        similarity_threshold: float = float(os.environ.get("AI_CACHE_SIMILARITY_THRESHOLD", "0.95")),
+        max_candidates: int = 200
+    ):
+        self.collection_name = collection_name
+        self.embedding_model = embedding_model
+        self.similarity_threshold = similarity_threshold
+        self.max_candidates = max_candidates
+
+    @property
+    def collection(self):
+        return get_database()[self.collection_name]
+
+    def similarity_enabled(self, provider: str) -> bool:
+        return bool(self.embedding_model and llm_client_pool.provider_base_url(provider))
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key if it has not expired."""
+        try:
+            entry = await self.collection.find_one(
+                {"_id": key, "expiresAt": {"$gt": datetime.utcnow()}},
+                {"value": 1}
+            )
+        except Exception as e:
+            logger.error(f"AI response cache lookup failed: {e}")
+            return None
+        return entry["value"] if entry else None
+
+    async def set(
+        self,
+        key: str,
+        kind: str,
+        value: Any,
+        ttl_seconds: float,
+        scope: Optional[Dict[str, Any]] = None,
+        embedding: Optional[List[float]] = None
+    ) -> None:
+        """Store value under key; scope holds the fields a similarity match must share."""
+        now = datetime.utcnow()
+        try:
+            await self.collection.replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "kind": kind,
+                    "scope": scope or {},
+                    "value": value,
+                    "embedding": embedding,
+                    "embeddingModel": self.embedding_model if embedding else None,
+                    "createdAt": now,
+                    "expiresAt": now + timedelta(seconds=ttl_seconds)
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"AI response cache write failed: {e}")
+
+    async def embed(self, text: str, provider: str) -> Optional[List[float]]:
+        """Embedding for text, or None when similarity lookup is unavailable."""
+        if not self.similarity_enabled(provider):
+            return None
+        try:
+            return await llm_client_pool.embed(provider, self.embedding_model, text)
+        except Exception as e:
+            logger.error(f"AI response cache embedding failed: {e}")
+            return None
+
+    async def find_similar(self, kind: str, scope: Dict[str, Any], embedding: List[float]) -> Optional[Any]:
+        """Most similar unexpired entry of this kind and scope above the threshold."""
+        query = {
+            "kind": kind,
+            "expiresAt": {"$gt": datetime.utcnow()},
+            "embeddingModel": self.embedding_model,
+            "embedding": {"$ne": None}
+        }
+        query.update({f"scope.{field}": value for field, value in scope.items()})
+
+        try:
+            candidates = await self.collection.find(
+                query, {"value": 1, "embedding": 1}
+            ).sort("createdAt", -1).to_list(self.max_candidates)
+        except Exception as e:
+            logger.error(f"AI response cache similarity lookup failed: {e}")
+            return None
+        if not candidates:
+            return None
+
+        target = np.asarray(embedding, dtype=np.float32)
+        matrix = np.asarray([c["embedding"] for c in candidates], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(target)
+        scores = matrix @ target / np.where(norms == 0, 1, norms)
+
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        logger.info(f"AI response cache similarity hit ({scores[best]:.3f}) for {kind}")
+        return candidates[best]["value"]
+
+    async def clear(self, kind: Optional[str] = None) -> int:
+        """Drop cached entries, optionally only one kind."""
+        result = await self.collection.delete_many({"kind": kind} if kind else {})
+        return result.deleted_count
+
+# Global instance
+ai_response_cache = AIResponseCache()
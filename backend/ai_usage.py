@@ -0,0 +1,202 @@
+"""
+AI Usage Tracking for G.M.B Travels Kashmir
+Records tokens, latency and estimated cost of every LLM call and enforces daily budgets
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from database import get_database
+from models import AIUsageRecord
+
+logger = logging.getLogger(__name__)
+
+# USD per million (prompt, completion) tokens; override or extend with AI_MODEL_PRICING (same JSON shape)
+DEFAULT_MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "claude-3-5-haiku-20241022": (0.80, 4.00),
+    "claude-3-5-sonnet-20241022": (3.00, 15.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+# Rough characters-per-token ratio for providers that do not report usage
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: Optional[str]) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+def record_tokens(
+    record: Optional[AIUsageRecord],
+    usage: Optional[dict],
+    prompt_text: str = "",
+    completion_text: str = ""
+) -> None:
+    """Add a provider's reported usage to record, estimating from the text if it reported none."""
+    if record is None:
+        return
+    if usage:
+        record.promptTokens += usage.get("prompt_tokens", 0)
+        record.completionTokens += usage.get("completion_tokens", 0)
+    else:
+        record.promptTokens += estimate_tokens(prompt_text)
+        record.completionTokens += estimate_tokens(completion_text)
+        record.tokensEstimated = True
+    record.totalTokens = record.promptTokens + record.completionTokens
+
+class AIBudgetExceededError(Exception):
+    """Raised before an LLM call once the configured daily budget is used up."""
+
+class AIUsageTracker:
+    def __init__(self):
+        self.pricing = dict(DEFAULT_MODEL_PRICING)
+        try:
+            self.pricing.update({
+                model: tuple(prices)
+                for model, prices in json.loads(os.environ.get("AI_MODEL_PRICING", "{}")).items()
+            })
+        except ValueError as e:
+            logger.error(f"Ignoring invalid AI_MODEL_PRICING: {e}")
+
+    @property
+    def collection(self):
+        return get_database().ai_usage
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        prices = self.pricing.get(model)
+        if prices is None:
+            return None
+        return round((prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000, 6)
+
+    async def check_budget(self, user_id: Optional[str] = None) -> None:
+        """Raise AIBudgetExceededError if today's spend has reached a configured limit."""
+        db = get_database()
+        settings = await db.blog_generation_settings.find_one(
+            {}, {"dailyBudgetUsd": 1, "dailyTokenBudget": 1, "userDailyBudgetUsd": 1}
+        )
+        if not settings:
+            return
+
+        daily_budget = settings.get("dailyBudgetUsd")
+        token_budget = settings.get("dailyTokenBudget")
+        user_budget = settings.get("userDailyBudgetUsd")
+        if daily_budget is None and token_budget is None and (user_budget is None or not user_id):
+            return
+
+        day = datetime.utcnow().strftime("%Y-%m-%d")
+        totals = await db.ai_usage_daily.find_one({"_id": day}) or {}
+        if daily_budget is not None and totals.get("costUsd", 0) >= daily_budget:
+            raise AIBudgetExceededError(f"Daily AI budget of ${daily_budget:.2f} has been used up")
+        if token_budget is not None and totals.get("totalTokens", 0) >= token_budget:
+            raise AIBudgetExceededError(f"Daily AI token budget of {token_budget} has been used up")
+
+        if user_budget is not None and user_id:
+            user_totals = await db.ai_usage_daily.find_one({"_id": f"{day}:{user_id}"}) or {}
+            if user_totals.get("costUsd", 0) >= user_budget:
+                raise AIBudgetExceededError(f"Your daily AI budget of ${user_budget:.2f} has been used up")
+
+    @asynccontextmanager
+    async def track(
+        self,
+        operation: str,
+        provider: str,
+        model: str,
+        user_id: Optional[str] = None,
+        **metadata
+    ) -> AsyncIterator[AIUsageRecord]:
+        """Time an LLM call and store its usage; the chat client fills in the token counts."""
+        record = AIUsageRecord(
+            operation=operation, provider=provider, model=model, userId=user_id, metadata=metadata
+        )
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record.success = False
+            record.error = str(e) or type(e).__name__
+            raise
+        finally:
+            record.latencyMs = round((time.perf_counter() - started) * 1000, 1)
+            record.costUsd = self.estimate_cost(model, record.promptTokens, record.completionTokens)
+            await self._save(record)
+
+    async def _save(self, record: AIUsageRecord) -> None:
+        db = get_database()
+        increments = {
+            "calls": 1,
+            "promptTokens": record.promptTokens,
+            "completionTokens": record.completionTokens,
+            "totalTokens": record.totalTokens,
+            "costUsd": record.costUsd or 0
+        }
+        daily_keys = [(record.day, None)]
+        if record.userId:
+            daily_keys.append((f"{record.day}:{record.userId}", record.userId))
+
+        try:
+            await db.ai_usage.insert_one(record.dict(by_alias=True))
+            # Running daily totals keep budget checks to a single lookup
+            for key, user_id in daily_keys:
+                await db.ai_usage_daily.update_one(
+                    {"_id": key},
+                    {"$inc": increments, "$set": {"day": record.day, "userId": user_id}},
+                    upsert=True
+                )
+        except Exception as e:
+            logger.error(f"Failed to record AI usage: {e}")
+
+    async def _aggregate(self, match: dict, group_key: str) -> list:
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": f"${group_key}",
+                "calls": {"$sum": 1},
+                "failures": {"$sum": {"$cond": ["$success", 0, 1]}},
+                "promptTokens": {"$sum": "$promptTokens"},
+                "completionTokens": {"$sum": "$completionTokens"},
+                "totalTokens": {"$sum": "$totalTokens"},
+                "costUsd": {"$sum": {"$ifNull": ["$costUsd", 0]}},
+                "avgLatencyMs": {"$avg": "$latencyMs"},
+                "maxLatencyMs": {"$max": "$latencyMs"},
+                "avgCompletionTokens": {"$avg": "$completionTokens"}
+            }},
+            {"$sort": {"costUsd": -1}}
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=None)
+
+    async def summary(self, days: int = 30, user_id: Optional[str] = None) -> dict:
+        """Usage totals per model, user and day over the last `days` days."""
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        match = {"day": {"$gte": since}}
+        if user_id:
+            match["userId"] = user_id
+
+        by_model, by_user, by_day = await asyncio.gather(
+            self._aggregate(match, "model"),
+            self._aggregate(match, "userId"),
+            self._aggregate(match, "day")
+        )
+        by_day.sort(key=lambda row: row["_id"])
+
+        return {
+            "since": since,
+            "byModel": by_model,
+            "byUser": by_user,
+            "byDay": by_day,
+            "totals": {
+                field: sum(row[field] for row in by_model)
+                for field in ("calls", "failures", "promptTokens", "completionTokens", "totalTokens", "costUsd")
+            }
+        }
+
+# Global instance
+ai_usage_tracker = AIUsageTracker()
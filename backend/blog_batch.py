@@ -0,0 +1,340 @@
+"""
+Bulk Blog Generation for G.M.B Travels Kashmir
+Generates a batch of AI blog posts in the background, e.g. a month of the editorial calendar
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
+
+from pymongo import ReturnDocument
+
+from circuit_breaker import CircuitOpenError
+from blog_service import build_ai_blog_post, generate_ai_blog_data, insert_blog_post, invalidate_blog_caches
+from database import get_database
+from models import AIBlogRequest, BlogBatchItem, BlogBatchJob, BlogBatchRequest, GenerationJobStatus
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_MARKERS = ("429", "rate limit", "rate_limit", "too many requests")
+
+def is_rate_limited(error: Exception) -> bool:
+    """Whether an AI provider error means we were throttled and should back off."""
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+def is_retryable(error: Exception) -> bool:
+    """Throttling, or a provider circuit opened by it: both clear up if we wait."""
+    return isinstance(error, CircuitOpenError) or is_rate_limited(error)
+
+class BlogBatchGenerator:
+    def __init__(
+        self,
+        concurrency: int = int(os.environ.get("BLOG_BATCH_CONCURRENCY", "3")),
+        max_retries: int = 5,
+        backoff_base: float = 2,
+        backoff_cap: float = 60,
+        poll_interval: float = 60,
+        stale_after: timedelta = timedelta(minutes=10)
+    ):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def collection(self):
+        return get_database().blog_generation_batches
+
+    async def submit(self, batch_request: BlogBatchRequest, user_id: Optional[str] = None) -> BlogBatchJob:
+        """Store the batch and start generating it in the background."""
+        job = BlogBatchJob(batch=batch_request, createdBy=user_id)
+        await self.collection.insert_one(job.dict(by_alias=True))
+        self._spawn(self._run(job.id))
+        return job
+
+    async def get(self, batch_id: str) -> Optional[BlogBatchJob]:
+        batch = await self.collection.find_one({"_id": batch_id})
+        return BlogBatchJob(**batch) if batch else None
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter, so throttled workers do not retry in lockstep."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _suggest_topics(self, batch_request: BlogBatchRequest) -> List[str]:
+        """AI topic suggestions for the batch, retried like posts while the provider throttles us.
+
+        There is no static fallback here: a few canned topics would quietly
+        shrink the batch, so a failure fails the batch instead.
+        """
+        from ai_blog_generator import ai_blog_generator
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await ai_blog_generator.generate_topic_suggestions(
+                    batch_request.category.value, batch_request.count, refresh=True, fallback=False
+                )
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                if isinstance(e, CircuitOpenError):
+                    delay = max(delay, e.retry_after)
+                logger.info(f"Topic suggestions for batch rate limited, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _plan(self, batch_request: BlogBatchRequest) -> Tuple[List[BlogBatchItem], Optional[str]]:
+        """Expand the batch into one item per post, asking the AI for topics if needed.
+
+        Also returns a warning when the AI suggested fewer topics than requested.
+        """
+        requests = list(batch_request.requests)
+        warning = None
+
+        if batch_request.category and batch_request.count:
+            topics = await self._suggest_topics(batch_request)
+            if len(topics) < batch_request.count:
+                warning = f"Only {len(topics)} of {batch_request.count} requested topics were suggested"
+                logger.warning(f"Blog batch planning: {warning}")
+            requests.extend(
+                AIBlogRequest(
+                    topic=topic,
+                    category=batch_request.category,
+                    targetLength=batch_request.targetLength,
+                    tone=batch_request.tone
+                )
+                for topic in topics
+            )
+
+        items = []
+        for position, request in enumerate(requests):
+            scheduled_for = None
+            if batch_request.scheduleStart:
+                scheduled_for = batch_request.scheduleStart + timedelta(days=position * batch_request.scheduleIntervalDays)
+            items.append(BlogBatchItem(request=request, scheduledFor=scheduled_for))
+        return items, warning
+
+    async def _set_item(self, batch_id: str, index: int, **fields):
+        update = {f"items.{index}.{field}": value for field, value in fields.items()}
+        update["updatedAt"] = datetime.utcnow()
+        await self.collection.update_one({"_id": batch_id}, {"$set": update})
+
+    async def _generate_item(
+        self,
+        batch: BlogBatchJob,
+        index: int,
+        semaphore: asyncio.Semaphore
+    ) -> bool:
+        """Generate and store one post, backing off and retrying while the provider rate-limits us.
+
+        The post is inserted and its item marked completed straight away, so
+        an interrupted batch keeps every post it has already paid for.
+        """
+        item = batch.items[index]
+
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                item.attempts += 1
+                await self._set_item(
+                    batch.id, index,
+                    status=GenerationJobStatus.running.value, attempts=item.attempts
+                )
+                try:
+                    blog_data = await generate_ai_blog_data(item.request, user_id=batch.createdBy)
+                    break
+                except Exception as e:
+                    if is_retryable(e) and attempt < self.max_retries:
+                        delay = self.backoff_delay(attempt)
+                        if isinstance(e, CircuitOpenError):
+                            # Wait until the breaker lets calls through again
+                            delay = max(delay, e.retry_after)
+                        logger.info(f"Batch {batch.id} item {index} rate limited, retrying in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+                        continue
+
+                    logger.error(f"Batch {batch.id} item {index} failed: {e}")
+                    item.status = GenerationJobStatus.failed
+                    await self._set_item(batch.id, index, status=GenerationJobStatus.failed.value, error=str(e))
+                    return False
+
+            blog = build_ai_blog_post(blog_data, author_id=batch.createdBy, scheduledFor=item.scheduledFor)
+            try:
+                # Record the post id first: a resumed batch finds the post instead of generating it again
+                await self._set_item(batch.id, index, postId=blog.id)
+                blog = await insert_blog_post(get_database().blog_posts, blog)
+            except Exception as e:
+                logger.error(f"Batch {batch.id} item {index} could not be stored: {e}")
+                item.status = GenerationJobStatus.failed
+                await self._set_item(batch.id, index, status=GenerationJobStatus.failed.value, error=str(e))
+                return False
+            item.status, item.postId, item.postSlug = GenerationJobStatus.completed, blog.id, blog.slug
+            await self._set_item(
+                batch.id, index,
+                status=GenerationJobStatus.completed.value, postSlug=blog.slug, error=None
+            )
+            return True
+
+    async def _recover_stored_items(self, batch: BlogBatchJob) -> None:
+        """Mark items completed whose post was stored before the batch was interrupted."""
+        recorded = {
+            item.postId: index for index, item in enumerate(batch.items)
+            if item.postId and item.status != GenerationJobStatus.completed
+        }
+        if not recorded:
+            return
+        stored = get_database().blog_posts.find({"_id": {"$in": list(recorded)}}, {"slug": 1})
+        async for post in stored:
+            index = recorded[post["_id"]]
+            batch.items[index].status = GenerationJobStatus.completed
+            batch.items[index].postSlug = post["slug"]
+            await self._set_item(
+                batch.id, index,
+                status=GenerationJobStatus.completed.value, postSlug=post["slug"], error=None
+            )
+
+    def _claimable(self, now: datetime) -> dict:
+        """Queued batches, or running ones whose worker stopped sending heartbeats."""
+        return {
+            "$or": [
+                {"status": GenerationJobStatus.queued.value},
+                {"status": GenerationJobStatus.running.value, "updatedAt": {"$lt": now - self.stale_after}}
+            ]
+        }
+
+    async def _claim(self, batch_id: str) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"_id": batch_id, **self._claimable(now)},
+            {"$set": {
+                "status": GenerationJobStatus.running.value,
+                "workerId": self.worker_id,
+                "startedAt": now,
+                "updatedAt": now
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _run(self, batch_id: str):
+        batch_doc = await self._claim(batch_id)
+        if not batch_doc:
+            # Another worker picked it up
+            return
+
+        batch = BlogBatchJob(**batch_doc)
+        heartbeat = asyncio.create_task(self._heartbeat(batch.id))
+        try:
+            if not batch.items:
+                batch.items, batch.error = await self._plan(batch.batch)
+                await self.collection.update_one(
+                    {"_id": batch.id},
+                    {"$set": {
+                        "items": [item.dict() for item in batch.items],
+                        "error": batch.error,
+                        "updatedAt": datetime.utcnow()
+                    }}
+                )
+
+            # Items finished before an interruption are not generated again
+            await self._recover_stored_items(batch)
+            pending = [
+                index for index, item in enumerate(batch.items)
+                if item.status != GenerationJobStatus.completed
+            ]
+            semaphore = asyncio.Semaphore(self.concurrency)
+            stored = await asyncio.gather(*(self._generate_item(batch, index, semaphore) for index in pending))
+            if any(stored):
+                invalidate_blog_caches()
+
+            completed = sum(item.status == GenerationJobStatus.completed for item in batch.items)
+            now = datetime.utcnow()
+            await self.collection.update_one({"_id": batch.id}, {"$set": {
+                "status": (GenerationJobStatus.completed if completed else GenerationJobStatus.failed).value,
+                "completedItems": completed,
+                "failedItems": len(batch.items) - completed,
+                "completedAt": now,
+                "updatedAt": now
+            }})
+            logger.info(f"Blog batch {batch.id} finished: {completed}/{len(batch.items)} posts created")
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Blog batch {batch.id} failed: {e}")
+            now = datetime.utcnow()
+            await self.collection.update_one(
+                {"_id": batch.id},
+                {"$set": {
+                    "status": GenerationJobStatus.failed.value,
+                    "error": str(e),
+                    "completedAt": now,
+                    "updatedAt": now
+                }}
+            )
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, batch_id: str):
+        """Keep updatedAt fresh while this worker runs the batch, so it is not reclaimed."""
+        while True:
+            await asyncio.sleep(self.stale_after.total_seconds() / 3)
+            try:
+                await self.collection.update_one(
+                    {"_id": batch_id, "workerId": self.worker_id, "status": GenerationJobStatus.running.value},
+                    {"$set": {"updatedAt": datetime.utcnow()}}
+                )
+            except Exception as e:
+                logger.error(f"Blog batch {batch_id} heartbeat failed: {e}")
+
+    async def _resume_claimable(self):
+        try:
+            claimable = await self.collection.find(
+                self._claimable(datetime.utcnow()), {"_id": 1}
+            ).sort("createdAt", 1).to_list(length=None)
+        except Exception as e:
+            logger.error(f"Failed to resume queued blog batches: {e}")
+            return
+
+        for batch in claimable:
+            self._spawn(self._run(batch["_id"]))
+
+    async def _watch(self):
+        """Pick up batches queued elsewhere or left running by a worker that died."""
+        while True:
+            await self._resume_claimable()
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Resume batches that were queued or interrupted by a restart, and keep reclaiming stale ones."""
+        self._spawn(self._watch())
+
+    async def stop(self):
+        """Cancel running batches and queue them again for the next start."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            await self.collection.update_many(
+                {"workerId": self.worker_id, "status": GenerationJobStatus.running.value},
+                {"$set": {"status": GenerationJobStatus.queued.value, "updatedAt": datetime.utcnow()}}
+            )
+        except Exception as e:
+            logger.error(f"Failed to requeue interrupted blog batches: {e}")
+
+# Global instance
+blog_batch_generator = BlogBatchGenerator()
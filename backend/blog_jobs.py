@@ -0,0 +1,143 @@
+"""
+Blog Generation Job Queue for G.M.B Travels Kashmir
+Runs AI blog generation outside the HTTP request using a MongoDB-backed queue
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+
+from blog_service import create_ai_blog_post
+from database import get_database
+from models import AIBlogRequest, BlogGenerationJob, GenerationJobStatus
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_JOB_STATUSES = {GenerationJobStatus.completed.value, GenerationJobStatus.failed.value}
+
+class BlogGenerationQueue:
+    def __init__(
+        self,
+        concurrency: int = int(os.environ.get("BLOG_GENERATION_CONCURRENCY", "3")),
+        poll_interval: float = 5,
+        stale_after: timedelta = timedelta(minutes=10),
+        max_attempts: int = 3
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake_event = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def collection(self):
+        return get_database().blog_generation_jobs
+
+    async def submit(self, request: AIBlogRequest, user_id: Optional[str] = None) -> BlogGenerationJob:
+        """Queue a generation request and return the job immediately."""
+        job = BlogGenerationJob(request=request, createdBy=user_id)
+        await self.collection.insert_one(job.dict(by_alias=True))
+        self._wake_event.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[BlogGenerationJob]:
+        job = await self.collection.find_one({"_id": job_id})
+        return BlogGenerationJob(**job) if job else None
+
+    async def _claim(self) -> Optional[dict]:
+        """Atomically take the oldest queued job, or one whose worker died mid-run."""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": GenerationJobStatus.queued.value},
+                    {"status": GenerationJobStatus.running.value, "startedAt": {"$lt": now - self.stale_after}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": GenerationJobStatus.running.value,
+                    "workerId": self.worker_id,
+                    "startedAt": now,
+                    "updatedAt": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("createdAt", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _finish(self, job_id: str, **fields):
+        fields.update({"completedAt": datetime.utcnow(), "updatedAt": datetime.utcnow()})
+        await self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    async def _process(self, job_doc: dict):
+        job = BlogGenerationJob(**job_doc)
+
+        if job.attempts > self.max_attempts:
+            await self._finish(job.id, status=GenerationJobStatus.failed.value, error="Too many attempts")
+            return
+
+        try:
+            blog = await create_ai_blog_post(job.request, author_id=job.createdBy)
+            await self._finish(
+                job.id,
+                status=GenerationJobStatus.completed.value,
+                postId=blog.id,
+                postSlug=blog.slug,
+                error=None
+            )
+            logger.info(f"Blog generation job {job.id} completed: {blog.slug}")
+        except Exception as e:
+            logger.error(f"Blog generation job {job.id} failed: {e}")
+            await self._finish(job.id, status=GenerationJobStatus.failed.value, error=str(e))
+
+    async def _worker(self):
+        while True:
+            try:
+                job_doc = await self._claim()
+            except Exception as e:
+                logger.error(f"Failed to claim blog generation job: {e}")
+                job_doc = None
+
+            if job_doc:
+                await self._process(job_doc)
+                continue
+
+            # Idle: wait for a local submit, or poll for jobs queued by other workers
+            self._wake_event.clear()
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the worker tasks; at most `concurrency` generations run at once."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Cancel the workers and put their interrupted jobs back on the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        try:
+            await self.collection.update_many(
+                {"workerId": self.worker_id, "status": GenerationJobStatus.running.value},
+                {"$set": {"status": GenerationJobStatus.queued.value, "updatedAt": datetime.utcnow()}}
+            )
+        except Exception as e:
+            logger.error(f"Failed to requeue interrupted blog generation jobs: {e}")
+
+# Global instance
+blog_generation_queue = BlogGenerationQueue()
@@ -0,0 +1,97 @@
+"""
+Blog Content Renderer for G.M.B Travels Kashmir
+Converts the markdown-style text written by editors and the AI generator
+into sanitized HTML plus a table of contents
+"""
+
+import html
+import re
+from typing import Dict, List
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)\s*#*$")
+UNORDERED_ITEM_PATTERN = re.compile(r"^\s*[-*+]\s+(.+)$")
+ORDERED_ITEM_PATTERN = re.compile(r"^\s*\d+[.)]\s+(.+)$")
+BOLD_PATTERN = re.compile(r"\*\*(.+?)\*\*")
+ITALIC_PATTERN = re.compile(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])")
+LINK_PATTERN = re.compile(r"\[([^\]]+)\]\((https?://[^\s)]+)\)")
+ANCHOR_STRIP_PATTERN = re.compile(r"[^\w\s-]")
+ANCHOR_SPACE_PATTERN = re.compile(r"[\s_-]+")
+
+def _render_inline(text: str) -> str:
+    """Escape raw text, then apply bold, italic and link markup."""
+    escaped = html.escape(text, quote=True)
+    escaped = LINK_PATTERN.sub(r'<a href="\2" rel="noopener noreferrer">\1</a>', escaped)
+    escaped = BOLD_PATTERN.sub(r"<strong>\1</strong>", escaped)
+    return ITALIC_PATTERN.sub(r"<em>\1</em>", escaped)
+
+def _anchor_id(title: str, used: Dict[str, int]) -> str:
+    """Create a unique, URL-friendly anchor id for a heading."""
+    anchor = ANCHOR_STRIP_PATTERN.sub("", title.lower())
+    anchor = ANCHOR_SPACE_PATTERN.sub("-", anchor).strip("-") or "section"
+
+    count = used.get(anchor, 0)
+    used[anchor] = count + 1
+    return anchor if count == 0 else f"{anchor}-{count + 1}"
+
+def render_blog_content(content: str) -> Dict:
+    """Render blog content to sanitized HTML and collect a table of contents.
+
+    Any HTML in the source is escaped, so the output is safe to inject
+    into the page as-is.
+    """
+    html_parts: List[str] = []
+    toc: List[Dict] = []
+    used_anchors: Dict[str, int] = {}
+    paragraph: List[str] = []
+    list_tag = None
+
+    def close_paragraph():
+        if paragraph:
+            html_parts.append(f"<p>{_render_inline(' '.join(paragraph))}</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            html_parts.append(f"</{list_tag}>")
+            list_tag = None
+
+    for raw_line in (content or "").splitlines():
+        line = raw_line.strip()
+
+        if not line:
+            close_paragraph()
+            close_list()
+            continue
+
+        heading = HEADING_PATTERN.match(line)
+        if heading:
+            close_paragraph()
+            close_list()
+            level = len(heading.group(1))
+            title = heading.group(2)
+            anchor = _anchor_id(title, used_anchors)
+            html_parts.append(f'<h{level} id="{anchor}">{_render_inline(title)}</h{level}>')
+            toc.append({"id": anchor, "title": title, "level": level})
+            continue
+
+        unordered = UNORDERED_ITEM_PATTERN.match(raw_line)
+        ordered = None if unordered else ORDERED_ITEM_PATTERN.match(raw_line)
+        if unordered or ordered:
+            close_paragraph()
+            tag = "ul" if unordered else "ol"
+            if list_tag != tag:
+                close_list()
+                html_parts.append(f"<{tag}>")
+                list_tag = tag
+            item = (unordered or ordered).group(1)
+            html_parts.append(f"<li>{_render_inline(item)}</li>")
+            continue
+
+        close_list()
+        paragraph.append(line)
+
+    close_paragraph()
+    close_list()
+
+    return {"html": "\n".join(html_parts), "toc": toc}
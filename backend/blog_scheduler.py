@@ -0,0 +1,224 @@
+"""
+Blog Scheduler for G.M.B Travels Kashmir
+Publishes approved posts when their scheduledFor time passes and runs
+periodic AI generation according to BlogGenerationSettings
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from blog_service import create_ai_blog_post, invalidate_blog_caches, render_blog_fields
+from database import get_database
+from models import AIBlogRequest, BlogStatus
+
+logger = logging.getLogger(__name__)
+
+GENERATION_INTERVALS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "bi-weekly": timedelta(weeks=2),
+    "monthly": timedelta(days=30),
+}
+
+class BlogScheduler:
+    def __init__(self, lease_name: str = "blog_scheduler", lease_seconds: int = 60):
+        self.lease_name = lease_name
+        self.lease_seconds = lease_seconds
+        # Renew well before the lease runs out so leadership does not flap
+        self.renew_interval = lease_seconds / 3
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def acquire_lease(self) -> bool:
+        """Take or renew the scheduler lease; only the holder runs scheduled work."""
+        now = datetime.utcnow()
+        try:
+            lease = await get_database().scheduler_leases.find_one_and_update(
+                {
+                    "_id": self.lease_name,
+                    "$or": [{"owner": self.owner}, {"expiresAt": {"$lte": now}}]
+                },
+                {"$set": {"owner": self.owner, "expiresAt": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return lease is not None and lease["owner"] == self.owner
+        except DuplicateKeyError:
+            # Another worker holds an unexpired lease
+            return False
+
+    async def release_lease(self):
+        """Give up the lease so another worker can take over immediately."""
+        await get_database().scheduler_leases.delete_one({"_id": self.lease_name, "owner": self.owner})
+
+    def wake(self):
+        """Re-evaluate the schedule now, e.g. after a post is approved or rescheduled."""
+        self._wake_event.set()
+
+    async def publish_due_posts(self) -> int:
+        """Publish approved posts whose scheduledFor time has passed."""
+        blog_collection = get_database().blog_posts
+        now = datetime.utcnow()
+
+        due_cursor = blog_collection.find(
+            {"status": BlogStatus.approved.value, "scheduledFor": {"$lte": now}},
+            {"slug": 1, "content": 1, "publishedAt": 1}
+        )
+        published = 0
+
+        async for blog in due_cursor:
+            update_data = {
+                "status": BlogStatus.published.value,
+                "publishedAt": blog.get("publishedAt") or now,
+                "updatedAt": now,
+                **render_blog_fields(blog.get("content"))
+            }
+            # Guard on status so a post edited in the meantime is not overwritten
+            result = await blog_collection.update_one(
+                {"_id": blog["_id"], "status": BlogStatus.approved.value},
+                {"$set": update_data}
+            )
+            if result.modified_count:
+                invalidate_blog_caches(blog["slug"])
+                published += 1
+
+        if published:
+            logger.info(f"Published {published} scheduled blog post(s)")
+        return published
+
+    async def next_publish_time(self) -> Optional[datetime]:
+        """Earliest scheduledFor among approved posts (served by the status/scheduledFor index)."""
+        blog = await get_database().blog_posts.find_one(
+            {"status": BlogStatus.approved.value, "scheduledFor": {"$ne": None}},
+            {"scheduledFor": 1},
+            sort=[("scheduledFor", 1)]
+        )
+        return blog["scheduledFor"] if blog else None
+
+    def _next_generation_time(self, settings: dict) -> Optional[datetime]:
+        if not settings or not settings.get("isAutoGenerationEnabled"):
+            return None
+        if settings.get("nextScheduled"):
+            return settings["nextScheduled"]
+        if settings.get("lastGenerated"):
+            interval = GENERATION_INTERVALS.get(settings.get("generationFrequency"), GENERATION_INTERVALS["weekly"])
+            return settings["lastGenerated"] + interval
+        return datetime.utcnow()
+
+    async def run_due_generation(self) -> Optional[datetime]:
+        """Generate a post if auto-generation is due; returns the next generation time."""
+        db = get_database()
+        settings = await db.blog_generation_settings.find_one({})
+        next_run = self._next_generation_time(settings)
+
+        if next_run is None or next_run > datetime.utcnow():
+            return next_run
+
+        now = datetime.utcnow()
+        interval = GENERATION_INTERVALS.get(settings.get("generationFrequency"), GENERATION_INTERVALS["weekly"])
+
+        # Advance the schedule before generating so a failure is not retried in a tight loop
+        await db.blog_generation_settings.update_one(
+            {"_id": settings["_id"]},
+            {"$set": {"nextScheduled": now + interval, "updatedAt": now}}
+        )
+
+        try:
+            await self._generate_post(settings)
+            await db.blog_generation_settings.update_one(
+                {"_id": settings["_id"]},
+                {"$set": {"lastGenerated": now}}
+            )
+        except Exception as e:
+            logger.error(f"Scheduled blog generation failed: {e}")
+
+        return now + interval
+
+    async def _generate_post(self, settings: dict):
+        from ai_blog_generator import ai_blog_generator
+
+        categories = settings.get("preferredCategories") or ["destinations"]
+        generated_count = await get_database().blog_posts.count_documents({"isAIGenerated": True})
+        category = categories[generated_count % len(categories)]
+
+        # Fresh suggestions each run; a cached topic would produce the same post every time
+        topics = await ai_blog_generator.generate_topic_suggestions(category, 1, refresh=True)
+        request = AIBlogRequest(
+            topic=topics[0],
+            category=category,
+            targetLength=settings.get("defaultLength", 1500),
+            tone=settings.get("defaultTone", "informative")
+        )
+
+        auto_approve = settings.get("autoApprovalEnabled")
+        blog = await create_ai_blog_post(
+            request,
+            status=BlogStatus.approved if auto_approve else BlogStatus.pending_approval,
+            model=settings.get("aiModel"),
+            provider=settings.get("aiProvider"),
+            # Auto-approved posts go out through the normal scheduled publish path
+            scheduledFor=datetime.utcnow() if auto_approve else None
+        )
+        logger.info(f"Scheduled generation created blog post {blog.slug} ({blog.status.value})")
+
+    async def run_once(self) -> float:
+        """Run all due work and return how many seconds to sleep before the next check."""
+        if not await self.acquire_lease():
+            return self.lease_seconds
+
+        await self.publish_due_posts()
+        next_generation = await self.run_due_generation()
+        next_publish = await self.next_publish_time()
+
+        now = datetime.utcnow()
+        sleep_for = self.renew_interval
+        for due in (next_publish, next_generation):
+            if due is not None:
+                sleep_for = min(sleep_for, max((due - now).total_seconds(), 0))
+        return sleep_for
+
+    async def _run(self):
+        while True:
+            # Cleared before running so a wake() during run_once is not lost
+            self._wake_event.clear()
+            try:
+                sleep_for = await self.run_once()
+            except Exception as e:
+                logger.error(f"Blog scheduler error: {e}")
+                sleep_for = self.renew_interval
+
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=sleep_for)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the scheduler loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the scheduler loop and release the lease."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.release_lease()
+        except Exception as e:
+            logger.error(f"Failed to release blog scheduler lease: {e}")
+
+# Global instance
+blog_scheduler = BlogScheduler()
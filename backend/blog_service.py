@@ -0,0 +1,138 @@
+"""
+Blog Service for G.M.B Travels Kashmir
+Shared blog helpers used by the API endpoints and the background scheduler
+"""
+
+import logging
+import re
+from typing import Optional
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from blog_renderer import render_blog_content
+from cache import TTLCache
+from database import get_database
+from models import AIBlogRequest, BlogPost, BlogStatus
+
+logger = logging.getLogger(__name__)
+
+# Published listings keyed by (category, tag, limit); cleared on any blog write
+blog_listing_cache = TTLCache(ttl_seconds=300, max_entries=256)
+
+# Published posts keyed by slug, with HTML and table of contents pre-rendered
+blog_post_cache = TTLCache(ttl_seconds=600, max_entries=500)
+
+def count_words(content: Optional[str]) -> int:
+    """Count words in blog content for read-time estimates."""
+    return len(content.split()) if content else 0
+
+def render_blog_fields(content: Optional[str]) -> dict:
+    """Pre-render blog content into the stored HTML and table of contents fields."""
+    rendered = render_blog_content(content or "")
+    return {"contentHtml": rendered["html"], "tableOfContents": rendered["toc"]}
+
+async def next_free_slug(blog_collection, base_slug: str) -> str:
+    """Pick the next unused `base-N` slug with a single prefix-anchored query."""
+    pattern = f"^{re.escape(base_slug)}(-[0-9]+)?$"
+    taken_cursor = blog_collection.find({"slug": {"$regex": pattern}}, {"slug": 1, "_id": 0})
+    taken = await taken_cursor.to_list(length=None)
+
+    if not taken:
+        return base_slug
+
+    suffixes = [
+        int(doc["slug"][len(base_slug) + 1:]) if doc["slug"] != base_slug else 0
+        for doc in taken
+    ]
+    return f"{base_slug}-{max(suffixes) + 1}"
+
+def render_if_published(blog: BlogPost) -> BlogPost:
+    """Render the HTML of a post stored as published, as update and publish do."""
+    if blog.status == BlogStatus.published and blog.contentHtml is None:
+        rendered = render_blog_fields(blog.content)
+        blog.contentHtml, blog.tableOfContents = rendered["contentHtml"], rendered["tableOfContents"]
+    return blog
+
+async def insert_blog_post(blog_collection, blog: BlogPost, max_attempts: int = 5) -> BlogPost:
+    """Insert a blog post under a unique slug, retrying if a concurrent insert takes it."""
+    render_if_published(blog)
+    base_slug = blog.slug
+
+    for _ in range(max_attempts):
+        blog.slug = await next_free_slug(blog_collection, base_slug)
+        try:
+            await blog_collection.insert_one(blog.dict(by_alias=True))
+            return blog
+        except DuplicateKeyError:
+            logger.info(f"Slug {blog.slug} was taken concurrently, retrying")
+
+    raise HTTPException(status_code=409, detail="Could not allocate a unique slug for this blog post")
+
+def invalidate_blog_caches(slug: Optional[str] = None):
+    """Drop cached listings and, if given, the cached post for slug."""
+    blog_listing_cache.clear()
+    if slug:
+        blog_post_cache.invalidate(slug)
+
+async def create_ai_blog_post(
+    request: AIBlogRequest,
+    author_id: Optional[str] = None,
+    status: BlogStatus = BlogStatus.pending_approval,
+    model: Optional[str] = None,
+    provider: Optional[str] = None,
+    **overrides
+) -> BlogPost:
+    """Generate a blog post with AI and store it under a unique slug."""
+    blog_data = await generate_ai_blog_data(request, model=model, provider=provider, user_id=author_id)
+    return await store_ai_blog_post(blog_data, author_id=author_id, status=status, **overrides)
+
+async def generate_ai_blog_data(
+    request: AIBlogRequest,
+    model: Optional[str] = None,
+    provider: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> dict:
+    """Run the AI generator for a request and return the raw blog data."""
+    from ai_blog_generator import ai_blog_generator
+
+    return await ai_blog_generator.generate_blog_post(
+        topic=request.topic,
+        category=request.category.value,
+        keywords=request.keywords,
+        target_length=request.targetLength,
+        tone=request.tone,
+        focus_areas=request.focusAreas,
+        model=model,
+        provider=provider,
+        use_cache=request.useCache,
+        user_id=user_id
+    )
+
+async def store_ai_blog_post(
+    blog_data: dict,
+    author_id: Optional[str] = None,
+    status: BlogStatus = BlogStatus.pending_approval,
+    **overrides
+) -> BlogPost:
+    """Store AI-generated blog data as a new post under a unique slug."""
+    blog = build_ai_blog_post(blog_data, author_id=author_id, status=status, **overrides)
+
+    # Suffixes the generated slug with -N if it is already taken
+    return await insert_blog_post(get_database().blog_posts, blog)
+
+def build_ai_blog_post(
+    blog_data: dict,
+    author_id: Optional[str] = None,
+    status: BlogStatus = BlogStatus.pending_approval,
+    **overrides
+) -> BlogPost:
+    """Build a BlogPost from AI-generated blog data without storing it."""
+    return BlogPost(**{
+        **blog_data,
+        "status": status,
+        "authorId": author_id,
+        "isAIGenerated": True,
+        "wordCount": count_words(blog_data.get("content")),
+        **overrides
+    })
@@ -0,0 +1,136 @@
+"""
+Circuit Breaker for G.M.B Travels Kashmir
+Stops calling a failing upstream service for a while instead of letting requests pile up
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class CircuitState(str, Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream service while the circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Classic closed / open / half-open breaker for one upstream service.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail fast for `reset_timeout` seconds. Then a single probe call
+    is let through (half-open): success closes the circuit, failure opens
+    it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        is_failure: Callable[[BaseException], bool] = lambda error: True
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self.state = CircuitState.closed
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.total_rejections = 0
+        self.last_error: Optional[str] = None
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    def _retry_after(self) -> float:
+        return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0)
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not go through."""
+        if self.state == CircuitState.open and self._retry_after() == 0:
+            self.state = CircuitState.half_open
+            logger.info(f"Circuit {self.name} half-open, probing")
+
+        if self.state == CircuitState.open or (self.state == CircuitState.half_open and self._probe_in_flight):
+            self.total_rejections += 1
+            raise CircuitOpenError(self.name, self._retry_after() if self._opened_at else 0)
+
+        if self.state == CircuitState.half_open:
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state != CircuitState.closed:
+            logger.info(f"Circuit {self.name} closed")
+        self.state = CircuitState.closed
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self, error: BaseException) -> None:
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        self.last_error = str(error) or type(error).__name__
+        self._probe_in_flight = False
+
+        if self.state == CircuitState.half_open or self.consecutive_failures >= self.failure_threshold:
+            if self.state != CircuitState.open:
+                logger.warning(f"Circuit {self.name} opened after {self.consecutive_failures} failure(s): {self.last_error}")
+            self.state = CircuitState.open
+            self._opened_at = time.monotonic()
+
+    def record_error(self, error: BaseException) -> None:
+        """Record an exception from the service, counting it only if it means the service is unhealthy."""
+        if isinstance(error, asyncio.TimeoutError) or self.is_failure(error):
+            self.record_failure(error)
+        else:
+            # The service answered (e.g. rejected a bad request), so it is up
+            self.record_success()
+
+    def record_cancelled(self) -> None:
+        """A call was abandoned by the caller; let another probe through."""
+        self._probe_in_flight = False
+
+    async def call(self, operation: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """Run operation through the breaker, counting a timeout as a failure."""
+        self.before_call()
+        try:
+            result = await asyncio.wait_for(operation(), timeout=timeout)
+        except asyncio.CancelledError:
+            self.record_cancelled()
+            raise
+        except asyncio.TimeoutError:
+            error = asyncio.TimeoutError(f"{self.name} did not respond within {timeout:g}s")
+            self.record_failure(error)
+            raise error from None
+        except Exception as e:
+            self.record_error(e)
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> dict:
+        """Current state for health checks."""
+        retry_at = None
+        if self.state == CircuitState.open:
+            retry_at = datetime.utcnow() + timedelta(seconds=self._retry_after())
+        return {
+            "state": self.state.value,
+            "consecutiveFailures": self.consecutive_failures,
+            "totalFailures": self.total_failures,
+            "totalRejections": self.total_rejections,
+            "lastError": self.last_error,
+            "retryAt": retry_at
+        }
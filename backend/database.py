@@ -72,6 +72,10 @@ async def create_indexes():
         # Create indexes for gallery images
         await db.gallery_images.create_index([("category", 1)])
         await db.gallery_images.create_index([("isActive", 1)])
+        # Gallery pages sort on (createdAt, _id); each filter combination gets an index ending in that sort
+        await db.gallery_images.create_index([("isActive", 1), ("createdAt", -1), ("_id", -1)])
+        await db.gallery_images.create_index([("isActive", 1), ("category", 1), ("createdAt", -1), ("_id", -1)])
+        await db.gallery_images.create_index([("isActive", 1), ("tags", 1), ("createdAt", -1), ("_id", -1)])
         
         # Create unique index for admin usernames
         await db.admins.create_index([("username", 1)], unique=True)
@@ -88,6 +92,7 @@ async def create_indexes():
         await db.popups.create_index([("startDate", 1)])
         await db.popups.create_index([("endDate", 1)])
         await db.popups.create_index([("createdAt", -1)])
+        await db.popups.create_index([("isActive", 1), ("endDate", 1), ("startDate", 1)])
         
         # Create indexes for site settings
         await db.site_settings.create_index([("isActive", 1)])
@@ -98,6 +103,48 @@ async def create_indexes():
         await db.vehicles.create_index([("sortOrder", 1)])
         await db.vehicles.create_index([("createdAt", -1)])
         
+        # Create indexes for blog posts (published listings by category/tag)
+        await db.blog_posts.create_index([("status", 1), ("publishedAt", -1)])
+        await db.blog_posts.create_index([("status", 1), ("category", 1), ("publishedAt", -1)])
+        await db.blog_posts.create_index([("status", 1), ("tags", 1), ("publishedAt", -1)])
+        await db.blog_posts.create_index([("createdAt", -1)])
+        try:
+            await db.blog_posts.create_index([("slug", 1)], unique=True)
+        except Exception as e:
+            # Duplicate legacy slugs must not stop the remaining indexes from being created
+            logger.error(f"Failed to create unique blog slug index, check for duplicate slugs: {e}")
+        await db.blog_posts.create_index([("status", 1), ("scheduledFor", 1)])
+        
+        # Create indexes for AI blog generation jobs
+        await db.blog_generation_jobs.create_index([("status", 1), ("createdAt", 1)])
+        await db.blog_generation_jobs.create_index([("createdAt", -1)])
+        
+        await db.blog_generation_batches.create_index([("status", 1), ("createdAt", 1)])
+        await db.blog_generation_batches.create_index([("createdAt", -1)])
+        
+        # Create indexes for AI usage accounting
+        await db.ai_usage.create_index([("day", 1), ("model", 1)])
+        await db.ai_usage.create_index([("userId", 1), ("day", 1)])
+        await db.ai_usage.create_index([("createdAt", -1)])
+        
+        # Create indexes for the AI response cache (expired entries are removed by MongoDB)
+        await db.ai_response_cache.create_index([("expiresAt", 1)], expireAfterSeconds=0)
+        await db.ai_response_cache.create_index([("kind", 1), ("scope.category", 1), ("createdAt", -1)])
+        
+        # Create indexes for content-addressed uploads
+        await db.upload_blobs.create_index([("refCount", 1), ("lastUploadedAt", 1)])
+        
+        # Create indexes for pricing rules
+        await db.pricing_rules.create_index([("isActive", 1)])
+        
+        # Create indexes for package departures and seat holds (hold documents are removed a day after expiring)
+        await db.package_departures.create_index([("packageId", 1), ("date", 1)])
+        await db.package_seat_holds.create_index([("expiresAt", 1)], expireAfterSeconds=24 * 3600)
+        await db.package_seat_holds.create_index([("status", 1), ("expiresAt", 1)])
+        
+        # Create index for the per-day cab fleet claims
+        await db.fleet_days.create_index([("date", 1)])
+        
         # Create indexes for WhatsApp CRM
         await db.whatsapp_messages.create_index([("clientId", 1)])
         await db.whatsapp_messages.create_index([("phoneNumber", 1)])
@@ -200,6 +247,12 @@ async def create_default_admin():
         if existing_vehicles == 0:
             await create_default_vehicles()
         
+        # Create default pricing rules
+        existing_pricing_rules = await db.pricing_rules.count_documents({})
+        
+        if existing_pricing_rules == 0:
+            await create_default_pricing_rules()
+        
     except Exception as e:
         logger.error(f"Failed to create default admin and team members: {e}")
 
@@ -336,4 +389,34 @@ async def create_default_vehicles():
         logger.info("Default vehicles created successfully")
         
     except Exception as e:
-        logger.error(f"Failed to create default vehicles: {e}")
\ No newline at end of file
+        logger.error(f"Failed to create default vehicles: {e}")
+
+async def create_default_pricing_rules():
+    """Create default season, group size, child age and demand pricing rules."""
+    try:
+        from models import PricingRule, PricingRuleKind
+        
+        db = Database.db
+        
+        default_rules = [
+            PricingRule(name="Summer peak", kind=PricingRuleKind.season, startDay="04-01", endDay="06-30", multiplier=1.25),
+            PricingRule(name="Monsoon off-season", kind=PricingRuleKind.season, startDay="07-15", endDay="08-31", multiplier=0.9),
+            PricingRule(name="Autumn colours", kind=PricingRuleKind.season, startDay="10-01", endDay="11-15", multiplier=1.1),
+            PricingRule(name="Winter snow and holidays", kind=PricingRuleKind.season, startDay="12-20", endDay="01-10", multiplier=1.2),
+            PricingRule(name="Solo traveller", kind=PricingRuleKind.pax, minPax=1, maxPax=1, multiplier=1.4),
+            PricingRule(name="Small group", kind=PricingRuleKind.pax, minPax=4, maxPax=7, multiplier=0.95),
+            PricingRule(name="Large group", kind=PricingRuleKind.pax, minPax=8, multiplier=0.9),
+            PricingRule(name="Infants", kind=PricingRuleKind.age, minAge=0, maxAge=4, multiplier=0.0),
+            PricingRule(name="Children 5-12 years", kind=PricingRuleKind.age, minAge=5, maxAge=12, multiplier=0.5),
+            PricingRule(name="Half of seats booked", kind=PricingRuleKind.demand, maxAvailableShare=0.5, multiplier=1.05),
+            PricingRule(name="Last quarter of seats", kind=PricingRuleKind.demand, maxAvailableShare=0.25, multiplier=1.15),
+            PricingRule(name="Last few seats", kind=PricingRuleKind.demand, maxAvailableShare=0.1, multiplier=1.3)
+        ]
+        
+        for rule in default_rules:
+            await db.pricing_rules.insert_one(rule.dict(by_alias=True))
+        
+        logger.info("Default pricing rules created successfully")
+        
+    except Exception as e:
+        logger.error(f"Failed to create default pricing rules: {e}")
@@ -0,0 +1,256 @@
+"""
+Cab Fare Engine for G.M.B Travels Kashmir
+Estimates cab fares from a precomputed Kashmir road distance/time matrix and per-vehicle rates
+"""
+
+import asyncio
+import logging
+import math
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from database import get_database
+from models import TripType
+
+logger = logging.getLogger(__name__)
+
+# Pickup and drop points: key -> (display name, phrases customers type for it)
+LOCATIONS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "srinagar": ("Srinagar", ("srinagar", "lal chowk", "dal lake", "dal gate", "boulevard", "rajbagh", "nigeen")),
+    "srinagar_airport": ("Srinagar Airport", ("srinagar airport", "sxr", "airport", "budgam airport")),
+    "tangmarg": ("Tangmarg", ("tangmarg",)),
+    "gulmarg": ("Gulmarg", ("gulmarg", "gondola")),
+    "sonamarg": ("Sonamarg", ("sonamarg", "thajiwas")),
+    "anantnag": ("Anantnag", ("anantnag", "khanabal")),
+    "pahalgam": ("Pahalgam", ("pahalgam",)),
+    "aru_valley": ("Aru Valley", ("aru valley", "aru")),
+    "betaab_valley": ("Betaab Valley", ("betaab valley", "betaab", "betab")),
+    "kokernag": ("Kokernag", ("kokernag",)),
+    "doodhpathri": ("Doodhpathri", ("doodhpathri", "dudhpathri")),
+    "yusmarg": ("Yusmarg", ("yusmarg",)),
+    "jammu": ("Jammu", ("jammu", "jammu tawi", "jammu airport")),
+}
+
+# Direct road segments: (from, to, km, minutes). Every other pair goes over the shortest chain of these.
+ROAD_SEGMENTS: Tuple[Tuple[str, str, float, float], ...] = (
+    ("srinagar", "srinagar_airport", 14, 35),
+    ("srinagar", "tangmarg", 38, 75),
+    ("tangmarg", "gulmarg", 13, 30),
+    ("srinagar", "sonamarg", 80, 150),
+    ("srinagar", "anantnag", 55, 90),
+    ("anantnag", "pahalgam", 45, 75),
+    ("pahalgam", "aru_valley", 12, 30),
+    ("pahalgam", "betaab_valley", 15, 35),
+    ("anantnag", "kokernag", 25, 45),
+    ("srinagar", "doodhpathri", 42, 90),
+    ("srinagar", "yusmarg", 47, 90),
+    ("anantnag", "jammu", 200, 330),
+)
+
+# Billing rules
+ONEWAY_RETURN_FACTOR = 0.5  # one-way trips pay for half of the empty return run
+MIN_TRIP_KM = 40  # smallest chargeable one-way trip
+MIN_KM_PER_DAY = 150  # round trips are charged at least this much per day
+LOCAL_KM_PER_DAY = 80  # local sightseeing day (typically 8 hours / 80 km)
+MAX_DRIVING_MINUTES_PER_DAY = 10 * 60
+DRIVER_ALLOWANCE_PER_NIGHT = 500.0
+FARE_ROUNDING = 10  # quotes are rounded up to the next multiple of this
+
+def build_route_matrix(
+    locations: List[str], segments: Tuple[Tuple[str, str, float, float], ...]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """All-pairs shortest road distance (km) and the driving time (minutes) along those routes.
+
+    Floyd-Warshall over the segment graph, one NumPy broadcast per
+    intermediate stop; runs once at import.
+    """
+    index = {key: i for i, key in enumerate(locations)}
+    size = len(locations)
+    distance = np.full((size, size), np.inf)
+    duration = np.full((size, size), np.inf)
+    np.fill_diagonal(distance, 0)
+    np.fill_diagonal(duration, 0)
+    for start, end, km, minutes in segments:
+        i, j = index[start], index[end]
+        distance[i, j] = distance[j, i] = km
+        duration[i, j] = duration[j, i] = minutes
+
+    for k in range(size):
+        via_distance = distance[:, k, None] + distance[None, k, :]
+        shorter = via_distance < distance
+        distance = np.where(shorter, via_distance, distance)
+        duration = np.where(shorter, duration[:, k, None] + duration[None, k, :], duration)
+
+    if np.isinf(distance).any():
+        raise ValueError("Road segments do not connect every location")
+    return distance, duration
+
+LOCATION_KEYS: List[str] = list(LOCATIONS)
+DISTANCE_KM, DURATION_MINUTES = build_route_matrix(LOCATION_KEYS, ROAD_SEGMENTS)
+
+# Longest phrase first, so "srinagar airport" wins over "srinagar"
+_ALIASES: List[Tuple[str, int]] = sorted(
+    ((alias, i) for i, key in enumerate(LOCATION_KEYS) for alias in LOCATIONS[key][1]),
+    key=lambda item: len(item[0]),
+    reverse=True
+)
+
+def resolve_location(text: str) -> Optional[int]:
+    """Matrix index of the known place a free-text location refers to, if any."""
+    normalized = f" {' '.join(re.findall(r'[a-z0-9]+', (text or '').lower()))} "
+    for alias, i in _ALIASES:
+        if f" {alias} " in normalized:
+            return i
+    return None
+
+def parse_capacity(capacity: str) -> int:
+    """Largest passenger count in a capacity label such as "12-16 Passengers"."""
+    numbers = [int(n) for n in re.findall(r"\d+", capacity or "")]
+    return max(numbers) if numbers else 0
+
+def trip_days(trip_type: TripType, pickup_date: Optional[datetime], return_date: Optional[datetime], minutes: float) -> int:
+    """Days the vehicle is booked for: the calendar span, or longer if the driving needs it."""
+    days = 1
+    if trip_type != TripType.oneway and pickup_date and return_date:
+        days = max((return_date.date() - pickup_date.date()).days + 1, 1)
+    return max(days, math.ceil(minutes / MAX_DRIVING_MINUTES_PER_DAY))
+
+class FareEngine:
+    """Fare quotes for every active vehicle at once.
+
+    Vehicle rates are loaded into NumPy arrays (per-km and per-day rate,
+    passenger capacity), so a quote is a matrix lookup plus a few vector
+    operations over the fleet. They are reloaded after `max_age`, which
+    bounds staleness for vehicle edits made on another worker; edits on
+    this worker call invalidate().
+    """
+
+    def __init__(self, max_age: timedelta = timedelta(minutes=5)):
+        self.max_age = max_age
+        self._expires_at: Optional[datetime] = None
+        self._generation = 0
+        self._vehicles: Optional[List[dict]] = None
+        self._per_km = np.zeros(0)
+        self._per_day = np.zeros(0)
+        self._capacity = np.zeros(0, dtype=int)
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._expires_at = None
+
+    def _expired(self) -> bool:
+        return self._expires_at is None or self._expires_at <= datetime.utcnow()
+
+    async def _load(self) -> None:
+        generation = self._generation
+        expires_at = datetime.utcnow() + self.max_age
+        vehicles = await get_database().vehicles.find(
+            {"isActive": True},
+            {"vehicleType": 1, "name": 1, "capacity": 1, "price": 1, "priceUnit": 1}
+        ).sort("sortOrder", 1).to_list(length=None)
+
+        per_day = np.array(["day" in (v.get("priceUnit") or "").lower() for v in vehicles], dtype=bool)
+        prices = np.array([float(v.get("price") or 0) for v in vehicles])
+        self._per_km = np.where(per_day, 0.0, prices)
+        self._per_day = np.where(per_day, prices, 0.0)
+        self._capacity = np.array([parse_capacity(v.get("capacity")) for v in vehicles], dtype=int)
+        self._vehicles = vehicles
+        # Invalidated while loading: the rates may predate the edit, so load again next time
+        self._expires_at = expires_at if generation == self._generation else None
+
+    async def _rates(self) -> List[dict]:
+        if self._expired():
+            async with self._lock:
+                if self._expired():
+                    await self._load()
+        return self._vehicles
+
+    def route(self, trip_type: TripType, pickup: str, drop: str = "") -> Tuple[Optional[int], Optional[int], float, float]:
+        """(pickup index, drop index, km, minutes) for the driven route, raising ValueError for unknown places."""
+        start = resolve_location(pickup)
+        end = resolve_location(drop) if drop else None
+        if trip_type == TripType.local and not drop:
+            # Sightseeing around the pickup point, billed by the day
+            return start, None, 0.0, 0.0
+        if start is None:
+            raise ValueError(f"Unknown pickup location: {pickup}")
+        if end is None:
+            raise ValueError(f"Unknown drop location: {drop}")
+
+        km, minutes = float(DISTANCE_KM[start, end]), float(DURATION_MINUTES[start, end])
+        if trip_type != TripType.oneway:
+            km, minutes = 2 * km, 2 * minutes
+        return start, end, km, minutes
+
+    async def quote(
+        self,
+        trip_type: TripType,
+        pickup: str,
+        drop: str = "",
+        pickup_date: Optional[datetime] = None,
+        return_date: Optional[datetime] = None,
+        passengers: Optional[int] = None
+    ) -> dict:
+        """Fare for every active vehicle, cheapest first among those that fit the party."""
+        vehicles = await self._rates()
+        start, end, km, minutes = self.route(trip_type, pickup, drop)
+        days = trip_days(trip_type, pickup_date, return_date, minutes)
+
+        if trip_type == TripType.oneway:
+            billable_km = max(km * (1 + ONEWAY_RETURN_FACTOR), MIN_TRIP_KM)
+        else:
+            billable_km = max(km, days * (MIN_KM_PER_DAY if trip_type == TripType.roundtrip else LOCAL_KM_PER_DAY))
+
+        fares = self._per_km * billable_km + self._per_day * days + DRIVER_ALLOWANCE_PER_NIGHT * (days - 1)
+        fares = np.ceil(fares / FARE_ROUNDING) * FARE_ROUNDING
+        fits = self._capacity >= (passengers or 0)
+        order = np.lexsort((fares, ~fits))
+
+        return {
+            "pickup": LOCATIONS[LOCATION_KEYS[start]][0] if start is not None else pickup,
+            "drop": LOCATIONS[LOCATION_KEYS[end]][0] if end is not None else drop,
+            "tripType": trip_type,
+            "distanceKm": round(km, 1),
+            "durationMinutes": round(minutes),
+            "billableKm": round(billable_km, 1),
+            "days": days,
+            "fares": [
+                {
+                    "vehicleId": vehicles[i]["_id"],
+                    "vehicleType": vehicles[i].get("vehicleType"),
+                    "name": vehicles[i].get("name"),
+                    "fare": float(fares[i]),
+                    "fitsPassengers": bool(fits[i]),
+                }
+                for i in order
+            ]
+        }
+
+    async def estimate(
+        self,
+        vehicle: str,
+        trip_type: TripType,
+        pickup: str,
+        drop: str = "",
+        pickup_date: Optional[datetime] = None,
+        return_date: Optional[datetime] = None
+    ) -> Optional[float]:
+        """Fare for one vehicle, given by id or vehicle type, or None if the trip cannot be priced."""
+        try:
+            quote = await self.quote(trip_type, pickup, drop, pickup_date, return_date)
+        except ValueError:
+            return None
+        for fare in quote["fares"]:
+            if vehicle in (fare["vehicleId"], fare["vehicleType"]):
+                return fare["fare"]
+        return None
+
+    def locations(self) -> List[dict]:
+        return [{"key": key, "name": LOCATIONS[key][0]} for key in LOCATION_KEYS]
+
+# Global instance
+fare_engine = FareEngine()
@@ -0,0 +1,357 @@
+"""
+Fleet Availability for G.M.B Travels Kashmir
+Tracks how many vehicles of each type are booked per day and reserves cabs without overbooking
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import get_database
+from models import BookingStatus, CabBooking, TripType, VehicleType
+
+logger = logging.getLogger(__name__)
+
+# Days are counted from HORIZON_START; 2**14 days covers bookings into the 2060s
+HORIZON_START = date(2020, 1, 1)
+HORIZON_DAYS = 2 ** 14
+# Bookings in these states hold a vehicle
+HOLDING_STATUSES = (BookingStatus.pending.value, BookingStatus.confirmed.value)
+RECONCILE_INTERVAL_SECONDS = 300
+
+class FleetUnavailableError(Exception):
+    """Raised when no vehicle of the requested type is free for every day of a booking."""
+
+class DayCountTree:
+    """Segment tree over day numbers holding the number of bookings on each day.
+
+    add() puts a booking on a range of days and max_count() reads the
+    busiest day in a range, both in O(log n). Range additions stay on the
+    nodes they cover instead of being pushed down, so each node's value
+    is the max over its subtree including its own pending addition.
+    """
+
+    def __init__(self, size: int = HORIZON_DAYS):
+        # Midpoint splits only fit a 2 * size node array when size is a power of two
+        self.size = 1 << max(size - 1, 0).bit_length()
+        self._max = [0] * (2 * self.size)
+        self._added = [0] * (2 * self.size)
+
+    def add(self, start: int, end: int, value: int = 1) -> None:
+        self._add(1, 0, self.size - 1, start, end, value)
+
+    def max_count(self, start: int, end: int) -> int:
+        return self._query(1, 0, self.size - 1, start, end)
+
+    def _add(self, node: int, low: int, high: int, start: int, end: int, value: int) -> None:
+        if end < low or high < start:
+            return
+        if start <= low and high <= end:
+            self._max[node] += value
+            self._added[node] += value
+            return
+        mid = (low + high) // 2
+        self._add(2 * node, low, mid, start, end, value)
+        self._add(2 * node + 1, mid + 1, high, start, end, value)
+        self._max[node] = max(self._max[2 * node], self._max[2 * node + 1]) + self._added[node]
+
+    def _query(self, node: int, low: int, high: int, start: int, end: int) -> int:
+        if end < low or high < start:
+            return 0
+        if start <= low and high <= end:
+            return self._max[node]
+        mid = (low + high) // 2
+        return max(
+            self._query(2 * node, low, mid, start, end),
+            self._query(2 * node + 1, mid + 1, high, start, end)
+        ) + self._added[node]
+
+def day_number(value: datetime) -> int:
+    day = (value.date() if isinstance(value, datetime) else value) - HORIZON_START
+    if not 0 <= day.days < HORIZON_DAYS:
+        raise ValueError(f"Date {value:%Y-%m-%d} is outside the booking calendar")
+    return day.days
+
+def booked_days(trip_type: str, pickup_date: datetime, return_date: Optional[datetime]) -> Tuple[int, int]:
+    """First and last day number a booking holds its vehicle; one-way trips release it the same day."""
+    start = day_number(pickup_date)
+    if trip_type == TripType.oneway or return_date is None:
+        return start, start
+    return start, max(day_number(return_date), start)
+
+def day_date(day: int) -> datetime:
+    return datetime.combine(HORIZON_START + timedelta(days=day), datetime.min.time())
+
+def fleet_day_id(vehicle_type: str, day: int) -> str:
+    return f"{vehicle_type}:{HORIZON_START + timedelta(days=day):%Y-%m-%d}"
+
+class FleetAvailability:
+    """Vehicles free per type and day, for checking and reserving cab bookings.
+
+    The fleet size of each VehicleType is the sum of `fleetSize` over its
+    active vehicles. Each type and day has a fleet_days document listing
+    the bookings that hold a vehicle that day as `claims`. reserve()
+    claims every day of a booking with a conditional update that only
+    matches while the list is shorter than the fleet, so bookings from
+    any number of API processes cannot overbook, and gives back the days
+    it took if a later one is full.
+
+    Bookings leave a holding status outside of reserve(), so a
+    background loop reconciles the claims with cab_bookings every
+    `interval`: claims of bookings that no longer hold a vehicle (or of
+    reservations whose booking was never saved) are dropped, and missing
+    ones added. availability() reads one DayCountTree per type built
+    from the claims, cached for `max_age`.
+    """
+
+    def __init__(
+        self,
+        interval: float = RECONCILE_INTERVAL_SECONDS,
+        max_age: timedelta = timedelta(seconds=30),
+        claim_grace: timedelta = timedelta(minutes=5)
+    ):
+        self.interval = interval
+        self.max_age = max_age
+        self.claim_grace = claim_grace
+        self._trees: Dict[str, DayCountTree] = {}
+        self._inventory: Dict[str, int] = {}
+        self._expires_at: Optional[datetime] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def days(self):
+        return get_database().fleet_days
+
+    def invalidate(self) -> None:
+        """Reload fleet sizes and booked days on next availability(), after a vehicle or booking changes."""
+        self._generation += 1
+        self._expires_at = None
+
+    async def _vehicles(self) -> List[dict]:
+        return await get_database().vehicles.find(
+            {}, {"vehicleType": 1, "fleetSize": 1, "isActive": 1}
+        ).to_list(length=None)
+
+    @staticmethod
+    def _fleet_sizes(vehicles: List[dict]) -> Dict[str, int]:
+        inventory = {vehicle_type.value: 0 for vehicle_type in VehicleType}
+        for vehicle in vehicles:
+            if vehicle.get("isActive", True):
+                inventory[vehicle["vehicleType"]] = inventory.get(vehicle["vehicleType"], 0) + vehicle.get("fleetSize", 1)
+        return inventory
+
+    async def _load(self) -> None:
+        generation = self._generation
+        expires_at = datetime.utcnow() + self.max_age
+        inventory = self._fleet_sizes(await self._vehicles())
+        trees: Dict[str, DayCountTree] = {}
+        booked = self.days.aggregate([
+            {"$match": {"date": {"$gte": datetime.combine(date.today(), datetime.min.time())}}},
+            {"$project": {"vehicleType": 1, "date": 1, "booked": {"$size": "$claims"}}}
+        ])
+        async for day in booked:
+            try:
+                n = day_number(day["date"])
+            except ValueError:
+                continue
+            trees.setdefault(day["vehicleType"], DayCountTree()).add(n, n, day["booked"])
+        self._inventory, self._trees = inventory, trees
+        # Invalidated while loading: the counts may predate the change, so load again next time
+        self._expires_at = expires_at if generation == self._generation else None
+
+    async def _ensure_loaded(self) -> None:
+        if self._expires_at is None or self._expires_at <= datetime.utcnow():
+            async with self._lock:
+                if self._expires_at is None or self._expires_at <= datetime.utcnow():
+                    await self._load()
+
+    def _free(self, vehicle_type: str, start: int, end: int) -> int:
+        tree = self._trees.get(vehicle_type)
+        booked = tree.max_count(start, end) if tree else 0
+        return max(self._inventory.get(vehicle_type, 0) - booked, 0)
+
+    async def availability(self, start_date: datetime, end_date: datetime) -> List[dict]:
+        """Vehicles free on every day from start_date to end_date, per vehicle type.
+
+        Read from a cache up to `max_age` old; reserve() is what enforces the fleet size.
+        """
+        start, end = day_number(start_date), day_number(end_date)
+        if end < start:
+            raise ValueError("End date is before start date")
+        await self._ensure_loaded()
+        return [
+            {"vehicleType": vehicle_type, "fleetSize": size, "available": self._free(vehicle_type, start, end)}
+            for vehicle_type, size in self._inventory.items()
+        ]
+
+    async def _fleet_size(self, vehicle: str) -> Tuple[str, int]:
+        """(VehicleType value, current fleet size) for a vehicle id or type name; raises ValueError if unknown."""
+        vehicles = await self._vehicles()
+        inventory = self._fleet_sizes(vehicles)
+        vehicle_type = vehicle if vehicle in inventory else next(
+            (v["vehicleType"] for v in vehicles if v["_id"] == vehicle), None
+        )
+        if vehicle_type is None:
+            raise ValueError(f"Unknown vehicle: {vehicle}")
+        return vehicle_type, inventory[vehicle_type]
+
+    async def _claim(self, vehicle_type: str, day: int, fleet_size: int, booking_id: str) -> bool:
+        """Add booking_id to the day's claims if fewer than fleet_size vehicles are taken."""
+        if fleet_size < 1:
+            return False
+        for _ in range(2):
+            try:
+                await self.days.update_one(
+                    {"_id": fleet_day_id(vehicle_type, day), f"claims.{fleet_size - 1}": {"$exists": False}},
+                    {
+                        "$push": {"claims": {"bookingId": booking_id, "at": datetime.utcnow()}},
+                        "$setOnInsert": {"vehicleType": vehicle_type, "date": day_date(day)}
+                    },
+                    upsert=True
+                )
+                return True
+            except DuplicateKeyError:
+                # The day is full, or its document was created by a concurrent request: check once more
+                continue
+        return False
+
+    async def release(self, vehicle_type: str, start: int, end: int, booking_id: str) -> None:
+        """Give back the days a booking claimed."""
+        await self.days.update_many(
+            {"_id": {"$in": [fleet_day_id(vehicle_type, day) for day in range(start, end + 1)]}},
+            {"$pull": {"claims": {"bookingId": booking_id}}}
+        )
+        self.invalidate()
+
+    async def reserve(self, cab_booking: CabBooking) -> None:
+        """Insert cab_booking if its vehicle type has a vehicle free for all of its days.
+
+        Raises FleetUnavailableError when fully booked and ValueError for
+        an unknown vehicle or dates outside the calendar.
+        """
+        vehicle_type, fleet_size = await self._fleet_size(cab_booking.vehicleType)
+        start, end = booked_days(cab_booking.tripType, cab_booking.pickupDate, cab_booking.returnDate)
+
+        claimed = start
+        try:
+            for day in range(start, end + 1):
+                if not await self._claim(vehicle_type, day, fleet_size, cab_booking.id):
+                    raise FleetUnavailableError(
+                        f"No {vehicle_type.replace('_', ' ')} is available from "
+                        f"{HORIZON_START + timedelta(days=start):%Y-%m-%d} to {HORIZON_START + timedelta(days=end):%Y-%m-%d}"
+                    )
+                claimed = day + 1
+            await get_database().cab_bookings.insert_one(cab_booking.dict(by_alias=True))
+        except BaseException:
+            if claimed > start:
+                await self.release(vehicle_type, start, claimed - 1, cab_booking.id)
+            raise
+        self.invalidate()
+
+    def _claimed_days(self, booking: dict, vehicle_types: Dict[str, str], today: int) -> List[str]:
+        """fleet_days ids a booking should hold from today on; none unless its status holds a vehicle."""
+        if booking.get("status") not in HOLDING_STATUSES:
+            return []
+        vehicle_type = vehicle_types.get(booking["vehicleType"], booking["vehicleType"])
+        try:
+            start, end = booked_days(booking["tripType"], booking["pickupDate"], booking.get("returnDate"))
+        except ValueError:
+            return []
+        return [fleet_day_id(vehicle_type, day) for day in range(max(start, today), end + 1)]
+
+    async def reconcile(self) -> int:
+        """Bring the claims from today on in line with cab_bookings; returns how many claims changed."""
+        db = get_database()
+        now = datetime.utcnow()
+        today = day_number(date.today())
+        vehicle_types = {vehicle["_id"]: vehicle["vehicleType"] for vehicle in await self._vehicles()}
+        fields = {"vehicleType": 1, "tripType": 1, "pickupDate": 1, "returnDate": 1, "status": 1}
+
+        wanted: Dict[str, Set[str]] = {}
+        holding = db.cab_bookings.find(
+            {
+                "status": {"$in": list(HOLDING_STATUSES)},
+                "$or": [{"pickupDate": {"$gte": day_date(today)}}, {"returnDate": {"$gte": day_date(today)}}]
+            },
+            fields
+        )
+        async for booking in holding:
+            for day_id in self._claimed_days(booking, vehicle_types, today):
+                wanted.setdefault(day_id, set()).add(booking["_id"])
+
+        days = await self.days.find({"date": {"$gte": day_date(today)}}).to_list(length=None)
+        claimed = {day["_id"]: {claim["bookingId"]: claim["at"] for claim in day.get("claims", [])} for day in days}
+
+        # Claims without a wanted booking are checked against the booking as it is now, since it
+        # may have been reserved after the query above; unsaved ones get claim_grace to appear
+        unexpected = {booking_id for day_id, claims in claimed.items() for booking_id in claims if booking_id not in wanted.get(day_id, ())}
+        current = {
+            booking["_id"]: set(self._claimed_days(booking, vehicle_types, today))
+            async for booking in db.cab_bookings.find({"_id": {"$in": list(unexpected)}}, fields)
+        }
+        ops = []
+        changed = 0
+        for day_id, claims in claimed.items():
+            stale = [
+                booking_id for booking_id, at in claims.items()
+                if booking_id not in wanted.get(day_id, ())
+                and (day_id not in current[booking_id] if booking_id in current else at <= now - self.claim_grace)
+            ]
+            if stale:
+                ops.append(UpdateOne({"_id": day_id}, {"$pull": {"claims": {"bookingId": {"$in": stale}}}}))
+                changed += len(stale)
+
+        for day_id, booking_ids in wanted.items():
+            missing = booking_ids - claimed.get(day_id, {}).keys()
+            if not missing:
+                continue
+            vehicle_type, day = day_id.rsplit(":", 1)
+            ops.append(UpdateOne(
+                {"_id": day_id},
+                {"$setOnInsert": {"vehicleType": vehicle_type, "date": datetime.strptime(day, "%Y-%m-%d"), "claims": []}},
+                upsert=True
+            ))
+            # Booked before the claims existed or changed by hand: recorded even if that overbooks the day
+            ops.extend(
+                UpdateOne({"_id": day_id, "claims.bookingId": {"$ne": booking_id}}, {"$push": {"claims": {"bookingId": booking_id, "at": now}}})
+                for booking_id in missing
+            )
+            changed += len(missing)
+
+        if ops:
+            await self.days.bulk_write(ops)
+            self.invalidate()
+        return changed
+
+    async def _run(self):
+        while True:
+            try:
+                changed = await self.reconcile()
+                if changed:
+                    logger.info(f"Reconciled {changed} fleet day claims with cab bookings")
+            except Exception as e:
+                logger.error(f"Reconciling fleet days failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start the loop that reconciles fleet day claims with cab bookings."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+fleet_availability = FleetAvailability()
@@ -0,0 +1,309 @@
+"""
+Responsive Image Derivatives for G.M.B Travels Kashmir
+Resizes gallery, package and vehicle images into WebP/AVIF variants in a background worker pool
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from PIL import Image, ImageOps, features
+
+from database import get_database
+from image_uploads import DERIVATIVE_DIR, INCOMING_DIR, UPLOAD_DIR, detect_image_type
+from models import ResponsiveImage
+from storage import storage
+from upload_serving import IMMUTABLE_CACHE_CONTROL
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_WIDTHS: Tuple[int, ...] = (320, 640, 1024, 1600)
+REMOTE_SOURCE_DIR = UPLOAD_DIR / "remote"
+# Encoder settings per format, roughly equal visual quality
+FORMAT_OPTIONS: Dict[str, dict] = {
+    "avif": {"quality": 55, "speed": 6},
+    "webp": {"quality": 80, "method": 4},
+}
+MAX_REMOTE_IMAGE_BYTES = 20 * 1024 * 1024
+
+# Image URL fields of each collection that gets a responsiveImages list
+IMAGE_FIELDS: Dict[str, Callable[[dict], List[str]]] = {
+    "gallery_images": lambda doc: [doc.get("imageUrl")],
+    "vehicles": lambda doc: [doc.get("image")],
+    "packages": lambda doc: [doc.get("image"), *doc.get("images", [])],
+}
+IMAGE_PROJECTIONS: Dict[str, Tuple[str, ...]] = {
+    "gallery_images": ("imageUrl",),
+    "vehicles": ("image",),
+    "packages": ("image", "images"),
+}
+
+def available_formats() -> List[str]:
+    """Derivative formats to produce, best compression first, limited to what Pillow can encode."""
+    requested = os.environ.get("IMAGE_DERIVATIVE_FORMATS", "avif,webp").split(",")
+    return [fmt.strip() for fmt in requested if fmt.strip() in FORMAT_OPTIONS and features.check(fmt.strip())]
+
+def target_widths(width: int, widths: Tuple[int, ...] = DERIVATIVE_WIDTHS) -> List[int]:
+    """Widths to resize to; never upscales, and keeps the original width when it is below the largest."""
+    targets = [w for w in widths if w < width]
+    if width <= widths[-1]:
+        targets.append(width)
+    return targets or [widths[-1]]
+
+def build_derivatives(source_path: str, output_stem: str, formats: List[str]) -> dict:
+    """Resize one image into every target width and format.
+
+    Runs in a worker process. output_stem is the path relative to the
+    uploads directory without extension; files that already exist are
+    kept, so re-running for the same source is cheap.
+    """
+    with Image.open(source_path) as opened:
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    width, height = image.size
+
+    variants = []
+    for target_width in target_widths(width):
+        target_height = max(round(height * target_width / width), 1)
+        resized = None
+        for fmt in formats:
+            relative_path = f"{output_stem}-{target_width}w.{fmt}"
+            path = UPLOAD_DIR / relative_path
+            if not path.exists():
+                if resized is None:
+                    resized = image if target_width == width else image.resize(
+                        (target_width, target_height), Image.Resampling.LANCZOS
+                    )
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Unique temporary name: the same source can be processed by two workers at once
+                partial_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+                resized.save(partial_path, format=fmt.upper(), **FORMAT_OPTIONS[fmt])
+                os.replace(partial_path, path)
+            variants.append({
+                "format": fmt,
+                "width": target_width,
+                "height": target_height,
+                "path": relative_path,
+                "size": path.stat().st_size,
+            })
+
+    return {"width": width, "height": height, "variants": variants}
+
+class ImageDerivativeWorker:
+    """Background pool that attaches responsive variants to image documents.
+
+    Documents are queued by collection and id after they are created or
+    their images change. CPU-bound resizing and encoding run in a process
+    pool; the event loop only resolves sources, hands the variants to the
+    storage backend and writes the resulting responsiveImages list back to
+    the document. Remote images (such as seeded Unsplash URLs) are
+    downloaded once into uploads/remote.
+    """
+
+    def __init__(
+        self,
+        workers: int = int(os.environ.get("IMAGE_DERIVATIVE_WORKERS", "2")),
+        fetch_remote: bool = os.environ.get("IMAGE_DERIVATIVE_FETCH_REMOTE", "true").lower() == "true"
+    ):
+        self.workers = workers
+        self.fetch_remote = fetch_remote
+        self.formats = available_formats()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._queued: Set[Tuple[str, str]] = set()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+        self._http: Optional[httpx.AsyncClient] = None
+        self._listeners: Dict[str, List[Callable[[], None]]] = {}
+
+    def add_listener(self, collection_name: str, callback: Callable[[], None]) -> None:
+        """Call callback whenever documents of collection_name get new variants (e.g. to drop a cache)."""
+        self._listeners.setdefault(collection_name, []).append(callback)
+
+    def enqueue(self, collection_name: str, doc_id: str) -> None:
+        """Schedule variants for a document's images; duplicates already waiting are dropped."""
+        key = (collection_name, doc_id)
+        if key not in self._queued:
+            self._queued.add(key)
+            self._queue.put_nowait(key)
+
+    def srcset(self, derivatives: dict) -> Dict[str, str]:
+        """Format → srcset attribute value."""
+        entries: Dict[str, List[str]] = {}
+        for variant in derivatives["variants"]:
+            entries.setdefault(variant["format"], []).append(f"{storage.url(variant['path'])} {variant['width']}w")
+        return {fmt: ", ".join(values) for fmt, values in entries.items()}
+
+    async def _remote_source(self, url: str) -> Optional[Path]:
+        """Download a remote image once, keyed by a hash of its URL."""
+        if not self.fetch_remote or urlparse(url).scheme not in ("http", "https"):
+            return None
+
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        existing = await asyncio.to_thread(lambda: next(REMOTE_SOURCE_DIR.glob(f"{name}.*"), None))
+        if existing:
+            return existing
+
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=30, follow_redirects=True)
+        content = bytearray()
+        async with self._http.stream("GET", url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                content.extend(chunk)
+                if len(content) > MAX_REMOTE_IMAGE_BYTES:
+                    raise ValueError(f"Remote image larger than {MAX_REMOTE_IMAGE_BYTES} bytes: {url}")
+
+        extension = detect_image_type(bytes(content[:16]))
+        if extension is None:
+            raise ValueError(f"Remote URL is not a supported image: {url}")
+        path = REMOTE_SOURCE_DIR / f"{name}.{extension}"
+
+        def write():
+            REMOTE_SOURCE_DIR.mkdir(parents=True, exist_ok=True)
+            partial_path = path.with_name(f".{path.name}.part")
+            partial_path.write_bytes(content)
+            os.replace(partial_path, path)
+
+        await asyncio.to_thread(write)
+        return path
+
+    async def derive(self, url: str) -> Optional[ResponsiveImage]:
+        """Variants for one image URL, or None if its source cannot be read."""
+        key = storage.key_for_url(url)
+        scratch_path = None
+        if key:
+            source = storage.local_path(key)
+            if source is None:
+                if not await storage.exists(key):
+                    return None
+                # Stored remotely: fetch a scratch copy to resize
+                scratch_path = INCOMING_DIR / f"{uuid.uuid4().hex}{Path(key).suffix}"
+                await asyncio.to_thread(INCOMING_DIR.mkdir, parents=True, exist_ok=True)
+                await storage.download(key, scratch_path)
+                source = scratch_path
+            output_stem = f"{DERIVATIVE_DIR.name}/{Path(key).with_suffix('').as_posix()}"
+        else:
+            source = await self._remote_source(url)
+            if source is None:
+                return None
+            output_stem = f"{DERIVATIVE_DIR.name}/{REMOTE_SOURCE_DIR.name}/{source.stem}"
+
+        try:
+            loop = asyncio.get_running_loop()
+            derivatives = await loop.run_in_executor(
+                self._executor, build_derivatives, str(source), output_stem, self.formats
+            )
+        finally:
+            if scratch_path:
+                await asyncio.to_thread(scratch_path.unlink, missing_ok=True)
+
+        # A no-op for local storage, where the variants were written in place
+        for variant in derivatives["variants"]:
+            await storage.put_file(
+                variant["path"], UPLOAD_DIR / variant["path"], f"image/{variant['format']}",
+                IMMUTABLE_CACHE_CONTROL if key else None
+            )
+
+        return ResponsiveImage(
+            src=url,
+            width=derivatives["width"],
+            height=derivatives["height"],
+            srcset=self.srcset(derivatives)
+        )
+
+    async def process(self, collection_name: str, doc_id: str) -> None:
+        collection = get_database()[collection_name]
+        projection = {field: 1 for field in IMAGE_PROJECTIONS[collection_name]}
+        projection["responsiveImages"] = 1
+        doc = await collection.find_one({"_id": doc_id}, projection)
+        if not doc:
+            return
+
+        urls = list(dict.fromkeys(url for url in IMAGE_FIELDS[collection_name](doc) if url))
+        existing = {image["src"]: image for image in doc.get("responsiveImages") or []}
+        responsive = []
+        for url in urls:
+            if url in existing:
+                responsive.append(existing[url])
+                continue
+            try:
+                image = await self.derive(url)
+            except Exception as e:
+                logger.warning(f"Could not create variants for {url}: {e}")
+                continue
+            if image:
+                responsive.append(image.dict())
+
+        # Only write if the image fields did not change while we were working
+        match = {"_id": doc_id}
+        match.update({field: doc.get(field) for field in IMAGE_PROJECTIONS[collection_name]})
+        result = await collection.update_one(match, {"$set": {"responsiveImages": responsive}})
+        if result.modified_count:
+            for callback in self._listeners.get(collection_name, []):
+                callback()
+
+    async def _worker(self):
+        while True:
+            key = await self._queue.get()
+            self._queued.discard(key)
+            try:
+                await self.process(*key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Image derivative job {key} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def backfill(self) -> int:
+        """Queue every document that has images without variants, e.g. seeded or pre-existing data."""
+        queued = 0
+        for collection_name, fields in IMAGE_PROJECTIONS.items():
+            projection = {field: 1 for field in fields}
+            projection["responsiveImages.src"] = 1
+            try:
+                docs = await get_database()[collection_name].find({}, projection).to_list(length=None)
+            except Exception as e:
+                logger.error(f"Failed to scan {collection_name} for image variants: {e}")
+                continue
+            for doc in docs:
+                done = {image.get("src") for image in doc.get("responsiveImages") or []}
+                if any(url and url not in done for url in IMAGE_FIELDS[collection_name](doc)):
+                    self.enqueue(collection_name, doc["_id"])
+                    queued += 1
+        return queued
+
+    def start(self) -> None:
+        """Start the process pool and workers, then queue images that still lack variants."""
+        if not self.formats:
+            logger.warning("No WebP/AVIF encoder available; responsive image variants are disabled")
+            return
+        if self._tasks:
+            return
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self.backfill()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._http:
+            await self._http.aclose()
+            self._http = None
+
+# Global instance
+image_derivative_worker = ImageDerivativeWorker()
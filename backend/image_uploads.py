@@ -0,0 +1,326 @@
+"""
+Image Upload Pipeline for G.M.B Travels Kashmir
+Streams uploaded images into content-addressed storage, enforcing a size cap and checking file signatures
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+
+from fastapi import HTTPException, UploadFile
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import get_database
+from storage import storage
+from upload_serving import IMMUTABLE_CACHE_CONTROL
+
+logger = logging.getLogger(__name__)
+
+# Served directly by the local storage backend; scratch space for the S3 backend
+UPLOAD_DIR = Path("uploads")
+DERIVATIVE_DIR = UPLOAD_DIR / "derived"
+INCOMING_DIR = UPLOAD_DIR / ".incoming"
+MAX_UPLOAD_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 256 * 1024
+# Room for multipart boundaries and form fields on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# An upload of a blob that garbage collection is deleting waits for it, up to this long
+REGISTER_RETRY_SECONDS = 0.2
+REGISTER_ATTEMPTS = 50
+
+SUBDIRECTORY_PATTERN = re.compile(r"^[a-z0-9_-]{1,50}$")
+# Content-addressed blob URLs: <storage base URL>/<first two hex digits>/<sha256>.<ext>
+BLOB_URL_PATTERN = re.compile(r"/([0-9a-f]{2})/([0-9a-f]{64})\.(?:jpg|png|gif|webp|avif)\b")
+
+# Collections whose documents may point at uploaded files, anywhere in their fields
+REFERENCE_COLLECTIONS = (
+    "gallery_images", "vehicles", "packages", "popups", "blog_posts",
+    "testimonials", "team_members", "clients", "site_settings", "whatsapp_templates"
+)
+
+def detect_image_type(header: bytes) -> Optional[str]:
+    """Identify an image from its leading bytes; returns the file extension to store it under."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header[4:8] == b"ftyp" and header[8:12] in (b"avif", b"avis"):
+        return "avif"
+    return None
+
+def upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File size must be less than {MAX_UPLOAD_BYTES // (1024 * 1024)}MB"
+    )
+
+def blob_hashes(values: Iterable[Any]) -> Set[str]:
+    """Content-addressed blobs referenced by URLs (or text containing URLs)."""
+    return {
+        match.group(2)
+        for value in values if isinstance(value, str)
+        for match in BLOB_URL_PATTERN.finditer(value)
+    }
+
+def _walk_strings(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _walk_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _walk_strings(item)
+
+async def save_image_upload(
+    file: UploadFile,
+    subdirectory: str = "",
+    max_bytes: int = MAX_UPLOAD_BYTES
+) -> Dict:
+    """Validate and store an uploaded image, returning its filename, URL and size.
+
+    The file is copied in fixed-size chunks with disk writes off the event
+    loop, and the copy stops as soon as it exceeds max_bytes. The type is
+    taken from the file signature, not the client-supplied content type or
+    filename. The file is stored once under its SHA-256, so uploading the
+    same image again returns the existing URL; subdirectory is only
+    validated and recorded on the blob. The blob is registered before the
+    existing file is trusted, so garbage collection cannot delete it in
+    between (see UploadStore.register).
+    """
+    subdirectory = subdirectory.strip().lower()
+    if subdirectory and not SUBDIRECTORY_PATTERN.match(subdirectory):
+        raise HTTPException(status_code=400, detail="Invalid upload category")
+
+    header = await file.read(UPLOAD_CHUNK_SIZE)
+    extension = detect_image_type(header)
+    if extension is None:
+        raise HTTPException(status_code=400, detail="File must be a JPEG, PNG, GIF, WebP or AVIF image")
+
+    await asyncio.to_thread(INCOMING_DIR.mkdir, parents=True, exist_ok=True)
+    # Written under a temporary name so a partial file is never served
+    partial_path = INCOMING_DIR / f"{uuid.uuid4()}.part"
+
+    size = 0
+    digest = hashlib.sha256()
+    buffer = await asyncio.to_thread(open, partial_path, "wb")
+    try:
+        chunk = header
+        while chunk:
+            size += len(chunk)
+            if size > max_bytes:
+                raise upload_too_large()
+            digest.update(chunk)
+            await asyncio.to_thread(buffer.write, chunk)
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        await asyncio.to_thread(buffer.close)
+
+        content_hash = digest.hexdigest()
+        filename = f"{content_hash}.{extension}"
+        key = f"{content_hash[:2]}/{filename}"
+        content_type = "image/jpeg" if extension == "jpg" else f"image/{extension}"
+        upload = {
+            "filename": filename,
+            "key": key,
+            "url": storage.url(key),
+            "size": size,
+            "contentType": content_type,
+            "sha256": content_hash
+        }
+        await upload_store.register(upload, subdirectory)
+        deduplicated = await storage.exists(key)
+        if deduplicated:
+            await asyncio.to_thread(partial_path.unlink)
+        else:
+            await storage.put_file(key, partial_path, content_type, IMMUTABLE_CACHE_CONTROL)
+    except BaseException:
+        await asyncio.to_thread(buffer.close)
+        await asyncio.to_thread(partial_path.unlink, missing_ok=True)
+        raise
+
+    upload["deduplicated"] = deduplicated
+    return upload
+
+class UploadStore:
+    """Reference counts for content-addressed uploads, plus a garbage collector.
+
+    Gallery images, packages and vehicles adjust refCount as they gain or
+    lose image URLs. Other documents can embed upload URLs anywhere (popups,
+    blog content, settings), so each garbage collection first recounts
+    references across REFERENCE_COLLECTIONS and only then deletes blobs
+    that are unreferenced and were last uploaded more than `grace` ago.
+    The grace period keeps a just-uploaded image alive until the form
+    that uses it is saved.
+
+    A blob being deleted is first claimed with `deletingAt`; uploads of
+    the same content wait until its files are gone and the record is
+    removed, then store the file again. A claim left by a collector that
+    died expires after `claim_timeout`.
+    """
+
+    def __init__(
+        self,
+        grace: timedelta = timedelta(hours=float(os.environ.get("UPLOAD_GC_GRACE_HOURS", "24"))),
+        interval: float = float(os.environ.get("UPLOAD_GC_INTERVAL_HOURS", "6")) * 3600,
+        claim_timeout: timedelta = timedelta(minutes=5)
+    ):
+        self.grace = grace
+        self.interval = interval
+        self.claim_timeout = claim_timeout
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return get_database().upload_blobs
+
+    def _unclaimed(self, now: datetime) -> dict:
+        """Blobs garbage collection is not deleting right now."""
+        return {"$or": [{"deletingAt": None}, {"deletingAt": {"$lt": now - self.claim_timeout}}]}
+
+    async def register(self, upload: Dict, subdirectory: str = "") -> None:
+        """Record an upload of a blob, keeping it from garbage collection for the grace period."""
+        now = datetime.utcnow()
+        update = {
+            "$setOnInsert": {
+                "key": upload["key"],
+                "url": upload["url"],
+                "size": upload["size"],
+                "contentType": upload["contentType"],
+                "refCount": 0,
+                "createdAt": now
+            },
+            "$set": {"lastUploadedAt": now},
+            "$unset": {"deletingAt": ""},
+            "$inc": {"uploads": 1}
+        }
+        if subdirectory:
+            update["$addToSet"] = {"categories": subdirectory}
+
+        for _ in range(REGISTER_ATTEMPTS):
+            try:
+                await self.collection.update_one(
+                    {"_id": upload["sha256"], **self._unclaimed(datetime.utcnow())}, update, upsert=True
+                )
+                return
+            except DuplicateKeyError:
+                # Claimed by garbage collection: wait for its files to be removed, then store them again
+                await asyncio.sleep(REGISTER_RETRY_SECONDS)
+        raise HTTPException(status_code=503, detail="Upload is being cleaned up, please try again")
+
+    async def update_references(self, before: Iterable[Any] = (), after: Iterable[Any] = ()) -> None:
+        """Adjust refCount (documents using a blob) for a document whose image URLs changed from `before` to `after`."""
+        before, after = blob_hashes(before), blob_hashes(after)
+        operations = [
+            UpdateOne({"_id": content_hash}, {"$inc": {"refCount": change}})
+            for hashes, change in ((after - before, 1), (before - after, -1))
+            for content_hash in hashes
+        ]
+        if not operations:
+            return
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            # The next garbage collection recount corrects the counts
+            logger.error(f"Failed to update upload reference counts: {e}")
+
+    async def _reference_counts(self) -> Counter:
+        """Documents referencing each blob, across REFERENCE_COLLECTIONS."""
+        db = get_database()
+        counts: Counter = Counter()
+        for collection_name in REFERENCE_COLLECTIONS:
+            async for doc in db[collection_name].find({}):
+                counts.update(blob_hashes(_walk_strings(doc)))
+        return counts
+
+    async def recount(self) -> int:
+        """Recompute every blob's refCount from the documents that reference it."""
+        # Read before the scan and written only if unchanged, so an update_references()
+        # that runs meanwhile is kept rather than overwritten with the older count
+        seen = {blob["_id"]: blob.get("refCount") async for blob in self.collection.find({}, {"refCount": 1})}
+        counts = await self._reference_counts()
+
+        operations = [
+            UpdateOne({"_id": content_hash, "refCount": ref_count}, {"$set": {"refCount": counts.get(content_hash, 0)}})
+            for content_hash, ref_count in seen.items()
+            if ref_count != counts.get(content_hash, 0)
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def _remove_files(self, blob: dict) -> None:
+        content_hash = blob["_id"]
+        key = blob.get("key") or storage.key_for_url(blob.get("url", ""))
+        if key:
+            await storage.delete(key)
+        await storage.delete_prefix(f"{DERIVATIVE_DIR.name}/{content_hash[:2]}/{content_hash}-")
+
+    async def collect_garbage(self) -> Dict[str, int]:
+        """Delete blobs (and their image variants) that nothing references any more."""
+        corrected = await self.recount()
+        cutoff = datetime.utcnow() - self.grace
+        unreferenced = {"refCount": {"$lte": 0}, "lastUploadedAt": {"$lt": cutoff}}
+
+        deleted = 0
+        freed_bytes = 0
+        candidates = await self.collection.find(unreferenced, {"key": 1, "url": 1, "size": 1}).to_list(length=None)
+        # Documents outside the refCount-tracked collections (popups, blog content) may have
+        # started using a blob since the recount, so references are checked again before claiming
+        referenced = await self._reference_counts() if candidates else Counter()
+        for blob in candidates:
+            if referenced.get(blob["_id"]):
+                continue
+            # Claimed with the conditions re-checked, so a blob referenced or uploaded meanwhile is kept
+            claimed_at = datetime.utcnow()
+            claim = await self.collection.update_one(
+                {"_id": blob["_id"], **unreferenced, **self._unclaimed(claimed_at)},
+                {"$set": {"deletingAt": claimed_at}}
+            )
+            if not claim.modified_count:
+                continue
+            # Uploads of this blob wait (see register) until the record is gone
+            await self._remove_files(blob)
+            await self.collection.delete_one({"_id": blob["_id"], "deletingAt": claimed_at})
+            deleted += 1
+            freed_bytes += blob.get("size", 0)
+
+        if deleted:
+            logger.info(f"Upload garbage collection removed {deleted} file(s), {freed_bytes} bytes")
+        return {"recounted": corrected, "deleted": deleted, "freedBytes": freed_bytes}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.collect_garbage()
+            except Exception as e:
+                logger.error(f"Upload garbage collection failed: {e}")
+
+    def start(self) -> None:
+        """Start the periodic garbage collection loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+upload_store = UploadStore()
@@ -0,0 +1,268 @@
+"""
+LLM Client Pool for G.M.B Travels Kashmir
+Shares HTTP connections and caps concurrent requests per LLM provider
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from emergentintegrations.llm.chat import LlmChat
+
+from ai_usage import record_tokens
+from circuit_breaker import CircuitBreaker
+from models import AIUsageRecord
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Errors that mean the provider is unhealthy; a rejected request (4xx) does not."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return True
+
+class PooledChat:
+    """Stateless chat session that sends each message as a standalone completion.
+
+    Exposes the same send_message interface as LlmChat, plus stream_message,
+    but runs on the pool's shared HTTP client for the provider.
+    """
+
+    def __init__(self, pool: "LlmClientPool", provider: str, model: str, system_message: str):
+        self.pool = pool
+        self.provider = provider
+        self.model = model
+        self.system_message = system_message
+
+    def _payload(self, user_message, stream: bool, response_format: Optional[dict] = None) -> dict:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.system_message},
+                {"role": "user", "content": user_message.text}
+            ],
+            "stream": stream
+        }
+        if response_format:
+            payload["response_format"] = response_format
+        if stream:
+            # Ask for token usage in the final chunk
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    async def send_message(
+        self,
+        user_message,
+        timeout: Optional[float] = None,
+        response_format: Optional[dict] = None,
+        usage: Optional[AIUsageRecord] = None
+    ) -> str:
+        async def send():
+            response = await self.pool.http_client(self.provider).post(
+                "/chat/completions", json=self._payload(user_message, stream=False, response_format=response_format)
+            )
+            response.raise_for_status()
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
+            record_tokens(usage, data.get("usage"), self.system_message + user_message.text, content)
+            return content
+
+        timeout = timeout or self.pool.timeout
+        async with self.pool.slot(self.provider, timeout):
+            return await self.pool.breaker(self.provider).call(send, timeout=timeout)
+
+    async def stream_message(self, user_message, usage: Optional[AIUsageRecord] = None) -> AsyncIterator[str]:
+        breaker = self.pool.breaker(self.provider)
+        breaker.before_call()
+        reported_usage = None
+        received = []
+        try:
+            async with self.pool.semaphore(self.provider):
+                async with self.pool.http_client(self.provider).stream(
+                    "POST", "/chat/completions", json=self._payload(user_message, stream=True)
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        reported_usage = chunk.get("usage") or reported_usage
+                        choices = chunk.get("choices") or []
+                        delta = choices[0].get("delta", {}).get("content") if choices else None
+                        if delta:
+                            received.append(delta)
+                            yield delta
+        except (asyncio.CancelledError, GeneratorExit):
+            breaker.record_cancelled()
+            raise
+        except Exception as e:
+            breaker.record_error(e)
+            raise
+        finally:
+            record_tokens(usage, reported_usage, self.system_message + user_message.text, "".join(received))
+        breaker.record_success()
+
+class LimitedLlmChat:
+    """LlmChat wrapper that applies the provider concurrency limit, timeout and circuit breaker."""
+
+    def __init__(self, pool: "LlmClientPool", provider: str, chat: LlmChat, system_message: str):
+        self.pool = pool
+        self.provider = provider
+        self.chat = chat
+        self.system_message = system_message
+
+    async def send_message(
+        self,
+        user_message,
+        timeout: Optional[float] = None,
+        response_format: Optional[dict] = None,
+        usage: Optional[AIUsageRecord] = None
+    ) -> str:
+        # LlmChat has no response_format option; structured output then relies on the prompt alone
+        async def send():
+            content = await self.chat.send_message(user_message)
+            # LlmChat does not expose token usage, so it is estimated from the text
+            record_tokens(usage, None, self.system_message + user_message.text, content)
+            return content
+
+        timeout = timeout or self.pool.timeout
+        async with self.pool.slot(self.provider, timeout):
+            return await self.pool.breaker(self.provider).call(send, timeout=timeout)
+
+class LlmClientPool:
+    """Hands out chat clients keyed by (provider, model).
+
+    Connection pooling applies to providers with an OpenAI-compatible
+    endpoint: LLM_BASE_URL_<PROVIDER> (with LLM_API_KEY_<PROVIDER>), or
+    LLM_BASE_URL for every provider without one (a gateway, or a local stub
+    server in tests). Calls for such a provider reuse one PooledChat per
+    (provider, model) and one keep-alive httpx client, so there is no
+    per-request client setup or TLS handshake. Providers without an
+    endpoint go through emergentintegrations' LlmChat, which is built per
+    call because it keeps conversation history per instance; that path
+    gets no connection reuse. Both paths are capped at LLM_MAX_CONCURRENCY requests per provider
+    (override per provider with LLM_MAX_CONCURRENCY_<PROVIDER>); the wait for
+    a slot and the request itself are each bounded by LLM_TIMEOUT_SECONDS
+    (or the call's timeout), and only the request is guarded by a per-provider circuit breaker that
+    fails fast after LLM_BREAKER_FAILURE_THRESHOLD consecutive failures and
+    probes again after LLM_BREAKER_RESET_SECONDS.
+    """
+
+    def __init__(self):
+        # Default endpoint for providers without their own LLM_BASE_URL_<PROVIDER>
+        self.base_url = os.environ.get("LLM_BASE_URL")
+        self.api_key = os.environ.get("LLM_API_KEY") or os.environ.get("EMERGENT_LLM_KEY")
+        self.default_concurrency = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+        self.timeout = float(os.environ.get("LLM_TIMEOUT_SECONDS", "120"))
+        self.breaker_failure_threshold = int(os.environ.get("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+        self.breaker_reset_seconds = float(os.environ.get("LLM_BREAKER_RESET_SECONDS", "30"))
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._chats: Dict[tuple, PooledChat] = {}
+
+    def semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._semaphores:
+            limit = int(os.environ.get(f"LLM_MAX_CONCURRENCY_{provider.upper()}", self.default_concurrency))
+            self._semaphores[provider] = asyncio.Semaphore(limit)
+        return self._semaphores[provider]
+
+    @asynccontextmanager
+    async def slot(self, provider: str, timeout: float):
+        """Hold one of the provider's concurrency slots, waiting at most timeout for it.
+
+        Taken outside the circuit breaker: time queued behind this process's
+        own calls is not the provider being slow, so running out of it raises
+        TimeoutError without counting as a provider failure.
+        """
+        semaphore = self.semaphore(provider)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"No free llm:{provider} slot within {timeout:g}s") from None
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self._breakers:
+            self._breakers[provider] = CircuitBreaker(
+                f"llm:{provider}",
+                failure_threshold=self.breaker_failure_threshold,
+                reset_timeout=self.breaker_reset_seconds,
+                is_failure=is_provider_failure
+            )
+        return self._breakers[provider]
+
+    def circuit_status(self) -> Dict[str, dict]:
+        """Breaker state per provider that has been called."""
+        return {provider: breaker.snapshot() for provider, breaker in self._breakers.items()}
+
+    def provider_base_url(self, provider: str) -> Optional[str]:
+        """OpenAI-compatible endpoint for provider, if one is configured."""
+        return os.environ.get(f"LLM_BASE_URL_{provider.upper()}") or self.base_url
+
+    def http_client(self, provider: str) -> httpx.AsyncClient:
+        client = self._http_clients.get(provider)
+        if client is None or client.is_closed:
+            api_key = os.environ.get(f"LLM_API_KEY_{provider.upper()}") or self.api_key
+            client = httpx.AsyncClient(
+                base_url=self.provider_base_url(provider),
+                headers={"Authorization": f"Bearer {api_key}"},
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=self.default_concurrency)
+            )
+            self._http_clients[provider] = client
+        return client
+
+    def chat(self, provider: str, model: str, system_message: str, api_key: Optional[str] = None):
+        """Get a chat client for (provider, model)."""
+        if self.provider_base_url(provider):
+            key = (provider, model, system_message)
+            if key not in self._chats:
+                self._chats[key] = PooledChat(self, provider, model, system_message)
+            return self._chats[key]
+
+        chat = LlmChat(
+            api_key=api_key or self.api_key,
+            session_id=f"blog_generator_{uuid.uuid4().hex}",
+            system_message=system_message
+        ).with_model(provider, model)
+        return LimitedLlmChat(self, provider, chat, system_message)
+
+    async def embed(self, provider: str, model: str, text: str) -> List[float]:
+        """Embedding vector for text from the provider's /embeddings endpoint."""
+        if not self.provider_base_url(provider):
+            raise RuntimeError(f"Embeddings require LLM_BASE_URL or LLM_BASE_URL_{provider.upper()}")
+        async def send():
+            response = await self.http_client(provider).post(
+                "/embeddings", json={"model": model, "input": text}
+            )
+            response.raise_for_status()
+            return response.json()["data"][0]["embedding"]
+
+        async with self.slot(provider, self.timeout):
+            return await self.breaker(provider).call(send, timeout=self.timeout)
+
+    async def aclose(self):
+        """Close the shared HTTP clients."""
+        for client in self._http_clients.values():
+            await client.aclose()
+        self._http_clients.clear()
+
+# Global instance
+llm_client_pool = LlmClientPool()
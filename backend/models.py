@@ -30,6 +30,13 @@ class TripType(str, Enum):
     roundtrip = "roundtrip"
     local = "local"
 
+# Responsive Image Models
+class ResponsiveImage(BaseModel):
+    src: str  # original image URL this entry belongs to
+    width: int
+    height: int
+    srcset: Dict[str, str] = {}  # format (avif, webp) -> srcset attribute value
+
 # Package Models
 class ItineraryDay(BaseModel):
     day: int
@@ -46,11 +53,13 @@ class Package(BaseModel):
     groupSize: str
     image: str
     images: List[str] = []
+    responsiveImages: List[ResponsiveImage] = []
     highlights: List[str] = []
     itinerary: List[ItineraryDay] = []
     inclusions: List[str] = []
     exclusions: List[str] = []
     category: str = "standard"
+    seatsPerDeparture: int = Field(default=20, ge=0)  # default capacity of each departure date
     status: PackageStatus = PackageStatus.active
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
@@ -71,6 +80,7 @@ class PackageCreate(BaseModel):
     inclusions: List[str] = []
     exclusions: List[str] = []
     category: str = "standard"
+    seatsPerDeparture: int = Field(default=20, ge=0)
 
 class PackageUpdate(BaseModel):
     title: Optional[str] = None
@@ -85,9 +95,112 @@ class PackageUpdate(BaseModel):
     inclusions: Optional[List[str]] = None
     exclusions: Optional[List[str]] = None
     category: Optional[str] = None
+    seatsPerDeparture: Optional[int] = Field(default=None, ge=0)
     status: Optional[PackageStatus] = None
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
+# Package Inventory Models
+class DepartureAvailability(BaseModel):
+    date: datetime
+    capacity: int
+    seatsAvailable: int
+
+class DepartureCapacityUpdate(BaseModel):
+    capacity: int = Field(ge=0)
+
+class SeatHold(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
+    departureId: str
+    packageId: str
+    date: datetime
+    seats: int
+    status: str = "held"  # held, confirmed or released
+    expiresAt: datetime
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        populate_by_name = True
+
+class SeatHoldCreate(BaseModel):
+    travelDate: datetime
+    travelers: int = Field(ge=1)
+
+# Package Pricing Models
+class PricingRuleKind(str, Enum):
+    season = "season"  # recurring date window
+    pax = "pax"  # group size tier
+    age = "age"  # child age band
+    demand = "demand"  # share of departure seats still available
+
+class PricingRule(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
+    name: str
+    kind: PricingRuleKind
+    multiplier: float = Field(ge=0)
+    packageId: Optional[str] = None  # None applies to every package
+    startDay: Optional[str] = Field(default=None, pattern=r"^\d{2}-\d{2}$")  # season, MM-DD
+    endDay: Optional[str] = Field(default=None, pattern=r"^\d{2}-\d{2}$")
+    minPax: Optional[int] = Field(default=None, ge=1)
+    maxPax: Optional[int] = Field(default=None, ge=1)
+    minAge: Optional[int] = Field(default=None, ge=0)
+    maxAge: Optional[int] = Field(default=None, ge=0)
+    maxAvailableShare: Optional[float] = Field(default=None, ge=0, le=1)  # demand, e.g. 0.25 = a quarter of seats left
+    priority: int = 0
+    isActive: bool = True
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        populate_by_name = True
+
+class PricingRuleCreate(BaseModel):
+    name: str
+    kind: PricingRuleKind
+    multiplier: float = Field(ge=0)
+    packageId: Optional[str] = None
+    startDay: Optional[str] = Field(default=None, pattern=r"^\d{2}-\d{2}$")
+    endDay: Optional[str] = Field(default=None, pattern=r"^\d{2}-\d{2}$")
+    minPax: Optional[int] = Field(default=None, ge=1)
+    maxPax: Optional[int] = Field(default=None, ge=1)
+    minAge: Optional[int] = Field(default=None, ge=0)
+    maxAge: Optional[int] = Field(default=None, ge=0)
+    maxAvailableShare: Optional[float] = Field(default=None, ge=0, le=1)
+    priority: int = 0
+    isActive: bool = True
+
+class PricingRuleUpdate(BaseModel):
+    name: Optional[str] = None
+    multiplier: Optional[float] = Field(default=None, ge=0)
+    startDay: Optional[str] = Field(default=None, pattern=r"^\d{2}-\d{2}$")
+    endDay: Optional[str] = Field(default=None, pattern=r"^\d{2}-\d{2}$")
+    minPax: Optional[int] = Field(default=None, ge=1)
+    maxPax: Optional[int] = Field(default=None, ge=1)
+    minAge: Optional[int] = Field(default=None, ge=0)
+    maxAge: Optional[int] = Field(default=None, ge=0)
+    maxAvailableShare: Optional[float] = Field(default=None, ge=0, le=1)
+    priority: Optional[int] = None
+    isActive: Optional[bool] = None
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+
+class TravelParty(BaseModel):
+    adults: int = Field(default=2, ge=0)
+    childAges: List[int] = []
+
+class PackagePriceQuoteRequest(BaseModel):
+    startDate: datetime
+    endDate: Optional[datetime] = None  # quotes every day from startDate to endDate
+    parties: List[TravelParty] = Field(default_factory=lambda: [TravelParty()], min_length=1, max_length=50)
+
+class PackagePriceQuote(BaseModel):
+    packageId: str
+    basePrice: float
+    dates: List[datetime]
+    parties: List[TravelParty]
+    totals: List[List[float]]  # totals[date][party] in rupees
+
+class PricedPackage(Package):
+    priceFrom: Optional[float] = None  # lowest per-person price over the coming months
+
 # Booking Models
 class Booking(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
@@ -98,6 +211,7 @@ class Booking(BaseModel):
     packageTitle: str
     travelDate: datetime
     travelers: int
+    childAges: List[int] = []  # ages of the travelers who are children
     totalAmount: float
     status: BookingStatus = BookingStatus.pending
     specialRequests: str = ""
@@ -115,9 +229,11 @@ class BookingCreate(BaseModel):
     packageTitle: str
     travelDate: datetime
     travelers: int
+    childAges: List[int] = []
     totalAmount: float
     specialRequests: str = ""
     bookingType: str = "package"
+    holdId: Optional[str] = None  # seat hold from POST /packages/{id}/holds
 
 # Testimonial Models
 class Testimonial(BaseModel):
@@ -182,6 +298,31 @@ class CabBookingCreate(BaseModel):
     passengers: int
     specialRequests: str = ""
 
+class FareQuoteRequest(BaseModel):
+    pickupLocation: str
+    dropLocation: str = ""
+    tripType: TripType
+    pickupDate: Optional[datetime] = None
+    returnDate: Optional[datetime] = None
+    passengers: Optional[int] = None
+
+class VehicleFare(BaseModel):
+    vehicleId: str
+    vehicleType: str
+    name: str
+    fare: float
+    fitsPassengers: bool = True
+
+class FareQuote(BaseModel):
+    pickup: str
+    drop: str = ""
+    tripType: TripType
+    distanceKm: float
+    durationMinutes: int
+    billableKm: float
+    days: int
+    fares: List[VehicleFare]
+
 # Contact Models
 class ContactInquiry(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
@@ -213,6 +354,7 @@ class GalleryImage(BaseModel):
     title: str
     description: str = ""
     imageUrl: str
+    responsiveImages: List[ResponsiveImage] = []
     category: str = "gallery"  # package, gallery, testimonial
     tags: List[str] = []
     isActive: bool = True
@@ -221,6 +363,28 @@ class GalleryImage(BaseModel):
     class Config:
         populate_by_name = True
 
+class GalleryImageSummary(BaseModel):
+    """Public gallery card view of an image."""
+    id: str = Field(alias="_id")
+    title: str
+    description: str = ""
+    imageUrl: str
+    responsiveImages: List[ResponsiveImage] = []
+    category: str
+    tags: List[str] = []
+    createdAt: datetime
+
+    class Config:
+        populate_by_name = True
+
+class GalleryPage(BaseModel):
+    images: List[GalleryImageSummary]
+    nextCursor: Optional[str] = None  # pass as `cursor` to fetch the following page
+
+class GalleryCategoryCount(BaseModel):
+    category: str
+    count: int
+
 class ImageCreate(BaseModel):
     title: str
     description: str = ""
@@ -631,6 +795,10 @@ class BlogPost(BaseModel):
     tags: List[str] = []
     status: BlogStatus = BlogStatus.draft
     
+    # Rendered at publish time from content
+    contentHtml: Optional[str] = None
+    tableOfContents: List[Dict[str, Any]] = []
+    
     # SEO fields
     metaTitle: Optional[str] = None
     metaDescription: Optional[str] = None
@@ -657,6 +825,7 @@ class BlogPost(BaseModel):
     views: int = 0
     likes: int = 0
     shares: int = 0
+    wordCount: int = 0
     
     # Metadata
     createdAt: datetime = Field(default_factory=datetime.utcnow)
@@ -665,6 +834,30 @@ class BlogPost(BaseModel):
     class Config:
         populate_by_name = True
 
+class BlogPostSummary(BaseModel):
+    """Listing card view of a blog post (no content or generation prompt)."""
+    id: str = Field(alias="_id")
+    title: str
+    slug: str
+    excerpt: str
+    category: BlogCategory
+    tags: List[str] = []
+    status: BlogStatus
+    metaTitle: Optional[str] = None
+    metaDescription: Optional[str] = None
+    featuredImage: Optional[str] = None
+    isAIGenerated: bool = False
+    publishedAt: Optional[datetime] = None
+    authorId: Optional[str] = None
+    views: int = 0
+    likes: int = 0
+    shares: int = 0
+    wordCount: int = 0
+    createdAt: datetime
+
+    class Config:
+        populate_by_name = True
+
 class BlogPostCreate(BaseModel):
     title: str
     content: str
@@ -703,6 +896,80 @@ class AIBlogRequest(BaseModel):
     tone: str = "informative"  # informative, casual, professional, exciting
     includeImages: bool = True
     focusAreas: List[str] = []  # specific aspects to focus on
+    useCache: bool = True  # reuse a cached generation for the same or a near-duplicate request
+
+class AIBlogContent(BaseModel):
+    """Blog fields the AI returns in structured-output (JSON) mode."""
+    title: str = Field(min_length=1)
+    slug: str = ""
+    metaTitle: str = ""
+    metaDescription: str = ""
+    excerpt: str = ""
+    content: str = Field(min_length=1)
+    seoKeywords: List[str] = []
+    tags: List[str] = []
+
+class GenerationJobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+class BlogGenerationJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
+    request: AIBlogRequest
+    status: GenerationJobStatus = GenerationJobStatus.queued
+    createdBy: Optional[str] = None  # team member who queued the job
+    attempts: int = 0
+    workerId: Optional[str] = None
+    postId: Optional[str] = None
+    postSlug: Optional[str] = None
+    error: Optional[str] = None
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    startedAt: Optional[datetime] = None
+    completedAt: Optional[datetime] = None
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        populate_by_name = True
+
+class BlogBatchRequest(BaseModel):
+    requests: List[AIBlogRequest] = []  # explicit posts to generate
+    # Or let the AI suggest `count` topics for a category
+    category: Optional[BlogCategory] = None
+    count: int = Field(default=0, ge=0, le=60)
+    targetLength: int = 1500
+    tone: str = "informative"
+    # Optional editorial calendar: post N is scheduled for scheduleStart + N * scheduleIntervalDays
+    scheduleStart: Optional[datetime] = None
+    scheduleIntervalDays: int = Field(default=1, ge=0)
+
+class BlogBatchItem(BaseModel):
+    request: AIBlogRequest
+    status: GenerationJobStatus = GenerationJobStatus.queued
+    attempts: int = 0
+    scheduledFor: Optional[datetime] = None
+    postId: Optional[str] = None
+    postSlug: Optional[str] = None
+    error: Optional[str] = None
+
+class BlogBatchJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
+    batch: BlogBatchRequest
+    items: List[BlogBatchItem] = []
+    status: GenerationJobStatus = GenerationJobStatus.queued
+    createdBy: Optional[str] = None  # team member who queued the batch
+    workerId: Optional[str] = None
+    completedItems: int = 0
+    failedItems: int = 0
+    error: Optional[str] = None
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    startedAt: Optional[datetime] = None
+    completedAt: Optional[datetime] = None
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        populate_by_name = True
 
 class BlogGenerationSettings(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
@@ -716,12 +983,37 @@ class BlogGenerationSettings(BaseModel):
     defaultLength: int = 1500
     lastGenerated: Optional[datetime] = None
     nextScheduled: Optional[datetime] = None
+    # Optional AI spend limits per UTC day; requests are rejected once reached
+    dailyBudgetUsd: Optional[float] = None
+    dailyTokenBudget: Optional[int] = None
+    userDailyBudgetUsd: Optional[float] = None
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
         populate_by_name = True
 
+class AIUsageRecord(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
+    operation: str  # blog_post, blog_post_stream, topics, connection_test
+    provider: str
+    model: str
+    userId: Optional[str] = None
+    promptTokens: int = 0
+    completionTokens: int = 0
+    totalTokens: int = 0
+    tokensEstimated: bool = False  # counted from text length when the provider reports no usage
+    latencyMs: float = 0
+    costUsd: Optional[float] = None  # None when the model has no known price
+    success: bool = True
+    error: Optional[str] = None
+    metadata: Dict[str, Any] = {}  # e.g. category, targetLength
+    day: str = Field(default_factory=lambda: datetime.utcnow().strftime("%Y-%m-%d"))
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        populate_by_name = True
+
 # Vehicle Management Models
 class VehicleType(str, Enum):
     force_urbania = "force_urbania"
@@ -760,11 +1052,13 @@ class Vehicle(BaseModel):
     features: List[str] = []
     specifications: VehicleSpecifications
     image: str
+    responsiveImages: List[ResponsiveImage] = []
     badge: Optional[str] = None
     badgeColor: str = "bg-blue-500"
     isActive: bool = True
     isPopular: bool = False
     sortOrder: int = 0
+    fleetSize: int = Field(default=1, ge=0)  # vehicles of this type available for bookings
     description: Optional[str] = None
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
@@ -787,6 +1081,7 @@ class VehicleCreate(BaseModel):
     isActive: bool = True
     isPopular: bool = False
     sortOrder: int = 0
+    fleetSize: int = Field(default=1, ge=0)
     description: Optional[str] = None
 
 class VehicleUpdate(BaseModel):
@@ -804,6 +1099,7 @@ class VehicleUpdate(BaseModel):
     isActive: Optional[bool] = None
     isPopular: Optional[bool] = None
     sortOrder: Optional[int] = None
+    fleetSize: Optional[int] = Field(default=None, ge=0)
     description: Optional[str] = None
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
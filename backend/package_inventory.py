@@ -0,0 +1,233 @@
+"""
+Package Inventory for G.M.B Travels Kashmir
+Seats per package departure date, with time-limited holds and oversell-free reservations
+"""
+
+import asyncio
+import calendar
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import get_database
+from models import DepartureAvailability, PackageStatus, SeatHold
+
+logger = logging.getLogger(__name__)
+
+# Held seats are returned after this long unless the booking is completed
+HOLD_DURATION = timedelta(minutes=float(os.environ.get("PACKAGE_HOLD_MINUTES", "15")))
+RELEASE_INTERVAL_SECONDS = 60
+
+class SeatsUnavailableError(Exception):
+    """Raised when a departure does not have enough seats left."""
+
+def departure_day(value: datetime) -> datetime:
+    """Midnight of the travel date, the key of a departure."""
+    return datetime(value.year, value.month, value.day)
+
+def departure_id(package_id: str, day: datetime) -> str:
+    return f"{package_id}:{day:%Y-%m-%d}"
+
+class PackageInventory:
+    """Seat inventory per package and departure date.
+
+    Each departure is one package_departures document holding its
+    capacity and seatsAvailable. It is created on first use with the
+    package's seatsPerDeparture. Seats are taken with a single
+    find_one_and_update that only matches while seatsAvailable is large
+    enough, so concurrent bookings cannot oversell without any locking.
+
+    A hold takes seats for HOLD_DURATION while the customer completes
+    the booking. Expired holds are handed back by a background loop, and
+    the TTL index on package_seat_holds.expiresAt removes their documents
+    a day later (see create_indexes).
+    """
+
+    def __init__(self, interval: float = RELEASE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def departures(self):
+        return get_database().package_departures
+
+    @property
+    def holds(self):
+        return get_database().package_seat_holds
+
+    async def _package_capacity(self, package_id: str) -> int:
+        package = await get_database().packages.find_one(
+            {"_id": package_id}, {"seatsPerDeparture": 1, "status": 1}
+        )
+        if not package or package.get("status", PackageStatus.active) != PackageStatus.active:
+            raise LookupError("Package not found")
+        return package.get("seatsPerDeparture", 20)
+
+    async def _ensure_departure(self, package_id: str, day: datetime) -> str:
+        capacity = await self._package_capacity(package_id)
+        _id = departure_id(package_id, day)
+        try:
+            await self.departures.update_one(
+                {"_id": _id},
+                {"$setOnInsert": {
+                    "packageId": package_id,
+                    "date": day,
+                    "capacity": capacity,
+                    "seatsAvailable": capacity,
+                    "createdAt": datetime.utcnow()
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Created by a concurrent request
+            pass
+        return _id
+
+    async def _take_seats(self, package_id: str, travel_date: datetime, seats: int) -> str:
+        """Decrement seatsAvailable if enough are left; returns the departure id."""
+        if seats < 1:
+            raise ValueError("At least one seat is required")
+        day = departure_day(travel_date)
+        if day.date() < date.today():
+            raise ValueError("Travel date is in the past")
+
+        _id = await self._ensure_departure(package_id, day)
+        departure = await self.departures.find_one_and_update(
+            {"_id": _id, "seatsAvailable": {"$gte": seats}},
+            {"$inc": {"seatsAvailable": -seats}, "$set": {"updatedAt": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if departure is None:
+            raise SeatsUnavailableError(f"Not enough seats left on {day:%Y-%m-%d}")
+        return _id
+
+    async def release_seats(self, departure: str, seats: int) -> None:
+        await self.departures.update_one(
+            {"_id": departure},
+            {"$inc": {"seatsAvailable": seats}, "$set": {"updatedAt": datetime.utcnow()}}
+        )
+
+    async def hold(self, package_id: str, travel_date: datetime, seats: int) -> SeatHold:
+        """Take seats for HOLD_DURATION; raises SeatsUnavailableError if the departure is full."""
+        _id = await self._take_seats(package_id, travel_date, seats)
+        hold = SeatHold(
+            departureId=_id,
+            packageId=package_id,
+            date=departure_day(travel_date),
+            seats=seats,
+            expiresAt=datetime.utcnow() + HOLD_DURATION
+        )
+        try:
+            await self.holds.insert_one(hold.dict(by_alias=True))
+        except Exception:
+            await self.release_seats(_id, seats)
+            raise
+        return hold
+
+    async def reserve(self, package_id: str, travel_date: datetime, seats: int, hold_id: Optional[str] = None) -> str:
+        """Seats for a booking: converts a matching, unexpired hold, or takes them directly.
+
+        Returns the departure id, for release_seats() if the booking cannot be saved.
+        """
+        if hold_id is None:
+            return await self._take_seats(package_id, travel_date, seats)
+
+        hold = await self.holds.find_one_and_update(
+            {
+                "_id": hold_id,
+                "status": "held",
+                "packageId": package_id,
+                "date": departure_day(travel_date),
+                "seats": seats,
+                "expiresAt": {"$gt": datetime.utcnow()}
+            },
+            {"$set": {"status": "confirmed"}}
+        )
+        if hold is None:
+            raise SeatsUnavailableError("Seat hold has expired or does not match this booking")
+        return hold["departureId"]
+
+    async def release_expired(self) -> int:
+        """Return the seats of holds that expired without a booking."""
+        released = 0
+        while True:
+            hold = await self.holds.find_one_and_update(
+                {"status": "held", "expiresAt": {"$lte": datetime.utcnow()}},
+                {"$set": {"status": "released"}}
+            )
+            if hold is None:
+                return released
+            await self.release_seats(hold["departureId"], hold["seats"])
+            released += 1
+
+    async def set_capacity(self, package_id: str, travel_date: datetime, capacity: int) -> DepartureAvailability:
+        """Change one departure's capacity; fails if more seats than that are already taken."""
+        day = departure_day(travel_date)
+        _id = await self._ensure_departure(package_id, day)
+        for _ in range(5):
+            current = await self.departures.find_one({"_id": _id})
+            change = capacity - current["capacity"]
+            # Matches only if no other edit changed the capacity meanwhile; $inc keeps concurrent bookings
+            updated = await self.departures.find_one_and_update(
+                {"_id": _id, "capacity": current["capacity"], "seatsAvailable": {"$gte": -change}},
+                {"$set": {"capacity": capacity, "updatedAt": datetime.utcnow()}, "$inc": {"seatsAvailable": change}},
+                return_document=ReturnDocument.AFTER
+            )
+            if updated:
+                return DepartureAvailability(**updated)
+            if current["seatsAvailable"] < -change:
+                raise ValueError(f"{current['capacity'] - current['seatsAvailable']} seats are already taken")
+        raise ValueError("Departure is being changed concurrently, try again")
+
+    async def calendar(self, package_id: str, year: int, month: int) -> List[DepartureAvailability]:
+        """Availability for every day of a month, from one query over the month's departures."""
+        capacity = await self._package_capacity(package_id)
+        first = datetime(year, month, 1)
+        days = calendar.monthrange(year, month)[1]
+        departures = await self.departures.find(
+            {"packageId": package_id, "date": {"$gte": first, "$lt": first + timedelta(days=days)}},
+            {"date": 1, "capacity": 1, "seatsAvailable": 1}
+        ).to_list(length=days)
+        by_day = {departure["date"]: departure for departure in departures}
+
+        availability = []
+        for offset in range(days):
+            day = first + timedelta(days=offset)
+            departure = by_day.get(day, {"capacity": capacity, "seatsAvailable": capacity})
+            availability.append(DepartureAvailability(
+                date=day,
+                capacity=departure["capacity"],
+                seatsAvailable=departure["seatsAvailable"]
+            ))
+        return availability
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                released = await self.release_expired()
+                if released:
+                    logger.info(f"Released {released} expired package seat holds")
+            except Exception as e:
+                logger.error(f"Releasing expired seat holds failed: {e}")
+
+    def start(self) -> None:
+        """Start the loop that returns seats from expired holds."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+package_inventory = PackageInventory()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from jinja2 import Template
 from weasyprint import HTML, CSS
 from pathlib import Path
@@ -6,13 +7,22 @@ import base64
 import requests
 from datetime import datetime
 
+from storage import storage
+
+# PDFs are rendered to local scratch space, then moved to storage
+PDF_SCRATCH_DIR = Path(tempfile.gettempdir()) / "gmb_pdfs"
+PDF_URL_EXPIRES_SECONDS = int(os.environ.get("PDF_URL_EXPIRES_SECONDS", str(7 * 24 * 3600)))
+
 class PackagePDFGenerator:
     def __init__(self):
         self.template_dir = Path(__file__).parent / 'templates'
         self.template_dir.mkdir(exist_ok=True)
         
-    def create_package_pdf(self, package_data, client_info=None):
-        """Generate a beautiful PDF matching the Kashmir package format"""
+    def create_package_pdf(self, package_data, client_info=None, price_rows=None):
+        """Generate a beautiful PDF matching the Kashmir package format
+
+        price_rows (from the pricing engine) replaces the single base price row in the rates table.
+        """
         
         # HTML template matching the exact format from your PDF
         html_template = """
@@ -465,11 +475,21 @@ class PackagePDFGenerator:
                     </tr>
                 </thead>
                 <tbody>
+                    {% if price_rows %}
+                    {% for row in price_rows %}
+                    <tr>
+                        <td>{{ row.pax }}</td>
+                        <td>{{ row.ageLimit }}</td>
+                        <td class="price">₹{{ "{:,.0f}".format(row.price) }}</td>
+                    </tr>
+                    {% endfor %}
+                    {% else %}
                     <tr>
                         <td>{{ package.groupSize.split()[0] if package.groupSize else 'Multiple' }}</td>
                         <td>Above 12 years</td>
                         <td class="price">₹{{ "{:,}".format(package.price) }}</td>
                     </tr>
+                    {% endif %}
                 </tbody>
             </table>
             <p style="font-style: italic; font-size: 12px; color: #666; margin-top: 10px;">
@@ -534,6 +554,7 @@ class PackagePDFGenerator:
         template_data = {
             'package': package_data,
             'client_info': client_info,
+            'price_rows': price_rows,
             'generated_date': datetime.now().strftime('%B %d, %Y'),
             'accommodation_details': [
                 {'city': 'Srinagar', 'hotel_name': 'Grand Retreat / Gurcoo Residency', 'star_rating': '⭐⭐⭐'},
@@ -548,8 +569,8 @@ class PackagePDFGenerator:
         
         # Generate PDF
         pdf_filename = f"package_{package_data['title'].replace(' ', '_').lower()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_path = Path("uploads") / "pdfs"
-        pdf_path.mkdir(exist_ok=True)
+        pdf_path = PDF_SCRATCH_DIR
+        pdf_path.mkdir(parents=True, exist_ok=True)
         
         full_pdf_path = pdf_path / pdf_filename
         
@@ -560,10 +581,18 @@ class PackagePDFGenerator:
         return {
             'filename': pdf_filename,
             'filepath': str(full_pdf_path),
-            'url': f'/uploads/pdfs/{pdf_filename}',
+            'key': f'pdfs/{pdf_filename}',
             'size': os.path.getsize(full_pdf_path)
         }
 
+    async def store_pdf(self, pdf_result, expires_in=PDF_URL_EXPIRES_SECONDS):
+        """Move a generated PDF into storage and add a (time-limited, on S3) download URL"""
+        await storage.put_file(pdf_result['key'], Path(pdf_result['filepath']), 'application/pdf')
+        
+        stored = {key: value for key, value in pdf_result.items() if key != 'filepath'}
+        stored['url'] = await storage.presigned_url(pdf_result['key'], expires_in, filename=pdf_result['filename'])
+        return stored
+
 # Sample usage function
 def generate_sample_pdf():
     """Generate a sample PDF for testing"""
@@ -628,4 +657,4 @@ def generate_sample_pdf():
 if __name__ == "__main__":
     # Test the PDF generator
     result = generate_sample_pdf()
-    print(f"PDF generated successfully: {result['url']}")
\ No newline at end of file
+    print(f"PDF generated successfully: {result['filepath']}")
\ No newline at end of file
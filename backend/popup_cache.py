@@ -0,0 +1,88 @@
+"""
+Active Popup Cache for G.M.B Travels Kashmir
+Keeps the set of currently visible popups in memory until the next schedule boundary
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from database import get_database
+from models import Popup
+
+logger = logging.getLogger(__name__)
+
+# Mongo stores milliseconds; a popup ending at endDate is still shown at that instant
+END_DATE_RESOLUTION = timedelta(milliseconds=1)
+
+class ActivePopupCache:
+    """Active popups, pre-grouped by the page they show on.
+
+    One query loads every enabled popup that has not ended, including
+    ones scheduled to start later. The cache then stays valid until the
+    earliest upcoming startDate or endDate among them, since nothing can
+    appear or disappear before that. `max_age` bounds staleness for
+    admin edits made on another worker; edits on this worker call
+    invalidate(). A load that was already running when invalidate() was
+    called is not trusted: its result is served but reloaded on the next
+    request, since it may have been read before the edit.
+    """
+
+    def __init__(self, max_age: timedelta = timedelta(minutes=5)):
+        self.max_age = max_age
+        self._expires_at: Optional[datetime] = None
+        self._active: List[Popup] = []
+        self._by_page: Dict[str, List[Popup]] = {}
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._expires_at = None
+
+    async def _load(self) -> None:
+        generation = self._generation
+        now = datetime.utcnow()
+        popups = await get_database().popups.find({
+            "isActive": True,
+            "$or": [
+                {"endDate": None},
+                {"endDate": {"$gte": now}}
+            ]
+        }).sort("createdAt", -1).to_list(length=None)
+
+        active: List[Popup] = []
+        expires_at = now + self.max_age
+        for doc in popups:
+            popup = Popup(**doc)
+            if popup.startDate > now:
+                expires_at = min(expires_at, popup.startDate)
+                continue
+            active.append(popup)
+            if popup.endDate is not None:
+                expires_at = min(expires_at, popup.endDate + END_DATE_RESOLUTION)
+
+        by_page: Dict[str, List[Popup]] = {}
+        for popup in active:
+            for page in popup.showOnPages:
+                by_page.setdefault(page, []).append(popup)
+
+        self._active = active
+        self._by_page = by_page
+        # Invalidated while loading: the data may predate the edit, so load again next time
+        self._expires_at = expires_at if generation == self._generation else None
+
+    async def get(self, page: Optional[str] = None) -> List[Popup]:
+        """Popups visible right now, optionally only those shown on page."""
+        if self._expires_at is None or self._expires_at <= datetime.utcnow():
+            async with self._lock:
+                # Another request may have reloaded while we waited
+                if self._expires_at is None or self._expires_at <= datetime.utcnow():
+                    await self._load()
+        if page is None:
+            return self._active
+        return self._by_page.get(page, [])
+
+# Global instance
+active_popup_cache = ActivePopupCache()
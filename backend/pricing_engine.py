@@ -0,0 +1,248 @@
+"""
+Package Pricing Engine for G.M.B Travels Kashmir
+Prices packages by travel date, group size, traveller age and remaining seats from compiled pricing rules
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from database import get_database
+from models import PricingRuleKind, TravelParty
+
+logger = logging.getLogger(__name__)
+
+MAX_PAX = 60
+CHILD_AGE_LIMIT = 12  # older travellers pay the adult price
+DEMAND_STEPS = 100  # remaining-seat share is looked up in 1% steps
+PRICE_FROM_DAYS = 90  # "from" prices look this far ahead
+DEFAULT_PARTY = TravelParty(adults=2)
+
+# Day-of-year index in a leap year, so 29 February has its own slot
+_MONTH_STARTS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+def day_of_year(month_day: str) -> int:
+    """Index for a recurring "MM-DD" date."""
+    month, day = (int(part) for part in month_day.split("-"))
+    date(2000, month, day)  # raises ValueError for impossible dates
+    return int(_MONTH_STARTS[month - 1]) + day - 1
+
+def days_of_year(dates: np.ndarray) -> np.ndarray:
+    """Vectorized day_of_year for a datetime64[D] array."""
+    months = dates.astype("datetime64[M]")
+    month_numbers = (months - dates.astype("datetime64[Y]")).astype(int)
+    return _MONTH_STARTS[month_numbers] + (dates - months).astype(int)
+
+def rule_slots(rule: dict) -> List[Tuple[int, int]]:
+    """Inclusive index ranges a rule covers in its kind's lookup array; raises ValueError if incomplete."""
+    kind = PricingRuleKind(rule["kind"])
+    if kind == PricingRuleKind.season:
+        if not rule.get("startDay") or not rule.get("endDay"):
+            raise ValueError("Season rules need startDay and endDay (MM-DD)")
+        start, end = day_of_year(rule["startDay"]), day_of_year(rule["endDay"])
+        # Windows such as 12-20 to 01-10 wrap around the new year
+        return [(start, end)] if start <= end else [(start, 365), (0, end)]
+    if kind == PricingRuleKind.pax:
+        start, end = rule.get("minPax") or 1, rule.get("maxPax") or MAX_PAX
+        bounds = (1, MAX_PAX)
+    elif kind == PricingRuleKind.age:
+        start, end = rule.get("minAge") or 0, rule.get("maxAge") if rule.get("maxAge") is not None else CHILD_AGE_LIMIT
+        bounds = (0, CHILD_AGE_LIMIT)
+    elif kind == PricingRuleKind.demand:
+        if rule.get("maxAvailableShare") is None:
+            raise ValueError("Demand rules need maxAvailableShare")
+        start, end = 0, int(round(rule["maxAvailableShare"] * DEMAND_STEPS))
+        bounds = (0, DEMAND_STEPS)
+    else:
+        raise ValueError(f"Unknown rule kind: {kind}")
+
+    if start > end:
+        raise ValueError("Rule range is empty")
+    return [(max(start, bounds[0]), min(end, bounds[1]))]
+
+class PricingTable:
+    """Multipliers for one package, compiled from its pricing rules.
+
+    Every rule kind becomes a lookup array (day of year, group size,
+    child age, remaining-seat share in 1% steps) so pricing is array
+    indexing. Rules are painted onto the arrays from least to most
+    specific: global before package-specific, then by priority, then
+    wider ranges before narrower ones, so the most specific rule wins
+    where rules overlap.
+    """
+
+    def __init__(self, rules: Iterable[dict]):
+        self.arrays: Dict[str, np.ndarray] = {
+            PricingRuleKind.season.value: np.ones(366),
+            PricingRuleKind.pax.value: np.ones(MAX_PAX + 1),
+            PricingRuleKind.age.value: np.ones(CHILD_AGE_LIMIT + 1),
+            PricingRuleKind.demand.value: np.ones(DEMAND_STEPS + 1),
+        }
+        compiled = []
+        for rule in rules:
+            try:
+                slots = rule_slots(rule)
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping pricing rule {rule.get('_id')}: {e}")
+                continue
+            span = sum(end - start + 1 for start, end in slots)
+            compiled.append(((rule.get("packageId") is not None, rule.get("priority", 0), -span), rule, slots))
+
+        for _, rule, slots in sorted(compiled, key=lambda item: item[0]):
+            array = self.arrays[PricingRuleKind(rule["kind"]).value]
+            for start, end in slots:
+                array[start:end + 1] = rule["multiplier"]
+
+    def date_factors(self, dates: np.ndarray, available_shares: np.ndarray) -> np.ndarray:
+        """Season times demand multiplier for each date."""
+        steps = np.clip(np.rint(available_shares * DEMAND_STEPS).astype(int), 0, DEMAND_STEPS)
+        return self.arrays["season"][days_of_year(dates)] * self.arrays["demand"][steps]
+
+    def party_factor(self, party: TravelParty) -> float:
+        """Per-person price units for a party: adults count 1, children their age band, scaled by the group-size tier."""
+        ages = np.asarray(party.childAges, dtype=int)
+        people = party.adults + len(party.childAges)
+        units = party.adults + self.arrays["age"][ages].sum()
+        return float(self.arrays["pax"][min(people, MAX_PAX)] * units)
+
+class PricingEngine:
+    """Prices packages for any number of dates and travel parties at once.
+
+    Active pricing_rules are read once and compiled into a PricingTable
+    per package on first use. They are read again after `max_age`, which
+    bounds how long rule edits made on another worker go unpriced; edits
+    on this worker call invalidate(). A quote is then one query for the
+    remaining seats on the requested dates plus an outer product of date
+    and party factors.
+    """
+
+    def __init__(self, max_age: timedelta = timedelta(minutes=5)):
+        self.max_age = max_age
+        self._expires_at: Optional[datetime] = None
+        self._generation = 0
+        self._rules: List[dict] = []
+        self._tables: Dict[str, PricingTable] = {}
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._expires_at = None
+
+    def _expired(self) -> bool:
+        return self._expires_at is None or self._expires_at <= datetime.utcnow()
+
+    async def _load(self) -> None:
+        generation = self._generation
+        expires_at = datetime.utcnow() + self.max_age
+        self._rules = await get_database().pricing_rules.find({"isActive": True}).to_list(length=None)
+        self._tables = {}
+        # Invalidated while loading: the rules may predate the edit, so load again next time
+        self._expires_at = expires_at if generation == self._generation else None
+
+    async def _table(self, package_id: str) -> PricingTable:
+        if self._expired():
+            async with self._lock:
+                if self._expired():
+                    await self._load()
+        table = self._tables.get(package_id)
+        if table is None:
+            table = PricingTable(
+                rule for rule in self._rules if rule.get("packageId") in (None, package_id)
+            )
+            self._tables[package_id] = table
+        return table
+
+    async def _available_shares(
+        self, package_ids: Sequence[str], start: datetime, end: datetime, held_seats: int = 0
+    ) -> Dict[Tuple[str, datetime], float]:
+        """Share of seats still free per (package, departure day); days without a departure document are fully free.
+
+        held_seats are counted as free, so a booking converting its own hold is priced as before the hold.
+        """
+        departures = await get_database().package_departures.find(
+            {"packageId": {"$in": list(package_ids)}, "date": {"$gte": start, "$lte": end}},
+            {"packageId": 1, "date": 1, "capacity": 1, "seatsAvailable": 1}
+        ).to_list(length=None)
+        return {
+            (departure["packageId"], departure["date"]):
+                min(departure["seatsAvailable"] + held_seats, departure["capacity"]) / departure["capacity"]
+                if departure["capacity"] else 0.0
+            for departure in departures
+        }
+
+    async def price_matrix(
+        self,
+        package: dict,
+        dates: Sequence[datetime],
+        parties: Sequence[TravelParty],
+        shares: Optional[Dict[Tuple[str, datetime], float]] = None
+    ) -> np.ndarray:
+        """Total price in rupees for each date (rows) and party (columns)."""
+        for party in parties:
+            if any(age > CHILD_AGE_LIMIT or age < 0 for age in party.childAges):
+                raise ValueError(f"Child ages must be between 0 and {CHILD_AGE_LIMIT}")
+        days = [datetime(d.year, d.month, d.day) for d in dates]
+        if shares is None:
+            shares = await self._available_shares([package["_id"]], min(days), max(days))
+
+        table = await self._table(package["_id"])
+        date_factors = table.date_factors(
+            np.array([d.date() for d in days], dtype="datetime64[D]"),
+            np.array([shares.get((package["_id"], d), 1.0) for d in days])
+        )
+        party_factors = np.array([table.party_factor(party) for party in parties])
+        return np.rint(float(package["price"]) * np.outer(date_factors, party_factors))
+
+    async def price(self, package: dict, travel_date: datetime, party: TravelParty, held_seats: int = 0) -> float:
+        """Total for one party; held_seats are the party's own seat hold, which must not raise the demand multiplier."""
+        day = datetime(travel_date.year, travel_date.month, travel_date.day)
+        shares = await self._available_shares([package["_id"]], day, day, held_seats)
+        return float((await self.price_matrix(package, [day], [party], shares))[0, 0])
+
+    async def prices_from(self, packages: List[dict]) -> Dict[str, float]:
+        """Lowest per-person price over the next PRICE_FROM_DAYS for two adults, per package."""
+        if not packages:
+            return {}
+        today = datetime.combine(date.today(), datetime.min.time())
+        days = [today + timedelta(days=offset) for offset in range(PRICE_FROM_DAYS)]
+        shares = await self._available_shares([package["_id"] for package in packages], days[0], days[-1])
+        lowest = {}
+        for package in packages:
+            matrix = await self.price_matrix(package, days, [DEFAULT_PARTY], shares)
+            lowest[package["_id"]] = float(matrix.min()) / DEFAULT_PARTY.adults
+        return lowest
+
+    async def price_rows(self, package: dict, travel_date: Optional[datetime], travelers: int = 2) -> List[dict]:
+        """Per-person prices by group size and child age band on one date, for the PDF price table."""
+        day = travel_date or datetime.combine(date.today(), datetime.min.time())
+        day = datetime(day.year, day.month, day.day)
+        shares = await self._available_shares([package["_id"]], day, day)
+        table = await self._table(package["_id"])
+        per_person = float(package["price"]) * table.date_factors(
+            np.array([day.date()], dtype="datetime64[D]"),
+            np.array([shares.get((package["_id"], day), 1.0)])
+        )[0]
+
+        pax, ages = table.arrays["pax"], table.arrays["age"]
+        rows = [
+            {"pax": size, "ageLimit": f"Above {CHILD_AGE_LIMIT} years", "price": float(np.rint(per_person * pax[size]))}
+            for size in sorted({2, 4, 6, min(max(travelers, 1), MAX_PAX)})
+        ]
+        # One row per run of child ages sharing a multiplier, as the extra cost of a child joining the party
+        party_size = min(max(travelers, 1) + 1, MAX_PAX)
+        start = 0
+        for age in range(1, CHILD_AGE_LIMIT + 2):
+            if age > CHILD_AGE_LIMIT or ages[age] != ages[start]:
+                rows.append({
+                    "pax": "Child",
+                    "ageLimit": f"{start}-{age - 1} years",
+                    "price": float(np.rint(per_person * pax[party_size] * ages[start]))
+                })
+                start = age
+        return rows
+
+# Global instance
+pricing_engine = PricingEngine()
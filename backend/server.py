@@ -1,16 +1,20 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
+import orjson
 import logging
+import asyncio
+import base64
+import hashlib
+import json
+import math
 from pathlib import Path
 from typing import List, Optional
-import shutil
-import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Load environment variables
 load_dotenv()
@@ -20,6 +24,28 @@ from models import *
 from database import connect_to_mongo, close_mongo_connection, get_database, create_default_admin
 from auth import AuthManager, admin_required, team_member_required
 from pdf_generator import PackagePDFGenerator
+from view_counter import blog_view_counter
+from popup_cache import active_popup_cache
+from fare_engine import fare_engine
+from fleet_availability import FleetUnavailableError, fleet_availability
+from package_inventory import SeatsUnavailableError, package_inventory
+from pricing_engine import pricing_engine, rule_slots
+from blog_scheduler import blog_scheduler
+from blog_jobs import blog_generation_queue, TERMINAL_JOB_STATUSES
+from blog_batch import blog_batch_generator
+from llm_client import llm_client_pool
+from cache import TTLCache
+from image_derivatives import image_derivative_worker
+from upload_serving import UploadStaticFiles
+from image_uploads import (
+    UPLOAD_DIR, MAX_UPLOAD_BYTES, MULTIPART_OVERHEAD_BYTES, save_image_upload, upload_store, upload_too_large
+)
+from ai_usage import AIBudgetExceededError, ai_usage_tracker
+from circuit_breaker import CircuitOpenError
+from blog_service import (
+    blog_listing_cache, blog_post_cache, count_words, render_blog_fields, insert_blog_post,
+    create_ai_blog_post, store_ai_blog_post
+)
 
 # Configure logging
 logging.basicConfig(
@@ -34,8 +60,25 @@ async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
     await create_default_admin()
+    blog_view_counter.start()
+    blog_scheduler.start()
+    blog_generation_queue.start()
+    blog_batch_generator.start()
+    image_derivative_worker.start()
+    upload_store.start()
+    package_inventory.start()
+    fleet_availability.start()
     yield
     # Shutdown
+    await fleet_availability.stop()
+    await package_inventory.stop()
+    await upload_store.stop()
+    await image_derivative_worker.stop()
+    await blog_batch_generator.stop()
+    await blog_generation_queue.stop()
+    await blog_scheduler.stop()
+    await blog_view_counter.stop()
+    await llm_client_pool.aclose()
     await close_mongo_connection()
 
 # Create FastAPI app
@@ -54,11 +97,23 @@ app.add_middleware(
 )
 
 # Create uploads directory
-UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+UPLOAD_PATHS = {"/api/admin/upload", "/api/admin/upload-image"}
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject oversized uploads from Content-Length before the body is read."""
+    if request.method == "POST" and request.url.path in UPLOAD_PATHS:
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and \
+                int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            error = upload_too_large()
+            return JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+    return await call_next(request)
+
 # Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
 
 # Initialize PDF generator
 pdf_generator = PackagePDFGenerator()
@@ -68,6 +123,26 @@ pdf_generator = PackagePDFGenerator()
 async def root():
     return {"message": "G.M.B Travels Kashmir API is running"}
 
+@api_router.get("/health")
+async def health_check():
+    """Health of the API and its dependencies, including the LLM circuit breakers."""
+    database_ok = True
+    try:
+        await get_database().command("ping")
+    except Exception as e:
+        logger.error(f"Health check database ping failed: {e}")
+        database_ok = False
+    
+    llm_circuits = llm_client_pool.circuit_status()
+    degraded = not database_ok or any(circuit["state"] != "closed" for circuit in llm_circuits.values())
+    
+    return {
+        "status": "degraded" if degraded else "ok",
+        "database": "ok" if database_ok else "unavailable",
+        "llm": llm_circuits,
+        "timestamp": datetime.utcnow()
+    }
+
 # Authentication endpoints
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def admin_login(login_data: AdminLogin):
@@ -110,23 +185,24 @@ async def verify_token(current_admin: dict = Depends(admin_required)):
     return {"valid": True, "admin": current_admin["sub"]}
 
 # Package endpoints
-@api_router.get("/packages", response_model=List[Package])
+@api_router.get("/packages", response_model=List[PricedPackage])
 async def get_packages():
-    """Get all active packages (public)."""
+    """Get all active packages with their lowest upcoming price (public)."""
     try:
         db = get_database()
         packages_collection = db.packages
         
         packages_cursor = packages_collection.find({"status": "active"}).sort("createdAt", -1)
         packages = await packages_cursor.to_list(length=100)
+        prices_from = await pricing_engine.prices_from(packages)
         
-        return [Package(**package) for package in packages]
+        return [PricedPackage(**package, priceFrom=prices_from.get(package["_id"])) for package in packages]
         
     except Exception as e:
         logger.error(f"Get packages error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch packages")
 
-@api_router.get("/packages/{package_id}", response_model=Package)
+@api_router.get("/packages/{package_id}", response_model=PricedPackage)
 async def get_package_by_id(package_id: str):
     """Get package by ID (public)."""
     try:
@@ -137,8 +213,9 @@ async def get_package_by_id(package_id: str):
         
         if not package:
             raise HTTPException(status_code=404, detail="Package not found")
+        prices_from = await pricing_engine.prices_from([package])
         
-        return Package(**package)
+        return PricedPackage(**package, priceFrom=prices_from.get(package_id))
         
     except HTTPException:
         raise
@@ -146,6 +223,70 @@ async def get_package_by_id(package_id: str):
         logger.error(f"Get package error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch package")
 
+@api_router.post("/packages/{package_id}/quote", response_model=PackagePriceQuote)
+async def quote_package_prices(package_id: str, quote_request: PackagePriceQuoteRequest):
+    """Prices for every day of a date range and each travel party (public)."""
+    try:
+        db = get_database()
+        package = await db.packages.find_one({"_id": package_id, "status": "active"}, {"price": 1})
+        if not package:
+            raise HTTPException(status_code=404, detail="Package not found")
+        
+        start = quote_request.startDate
+        days = ((quote_request.endDate or start).date() - start.date()).days + 1
+        if not 1 <= days <= 366:
+            raise HTTPException(status_code=400, detail="Date range must cover 1 to 366 days")
+        dates = [datetime(start.year, start.month, start.day) + timedelta(days=offset) for offset in range(days)]
+        
+        totals = await pricing_engine.price_matrix(package, dates, quote_request.parties)
+        return PackagePriceQuote(
+            packageId=package_id,
+            basePrice=package["price"],
+            dates=dates,
+            parties=quote_request.parties,
+            totals=totals.tolist()
+        )
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Quote package prices error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to quote prices")
+
+@api_router.get("/packages/{package_id}/availability", response_model=List[DepartureAvailability])
+async def get_package_availability(
+    package_id: str,
+    month: str = Query(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Month as YYYY-MM")
+):
+    """Seats left on each departure date of a month (public)."""
+    try:
+        year, month_number = (int(part) for part in month.split("-"))
+        return await package_inventory.calendar(package_id, year, month_number)
+        
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Get package availability error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch availability")
+
+@api_router.post("/packages/{package_id}/holds", response_model=SeatHold)
+async def hold_package_seats(package_id: str, hold_data: SeatHoldCreate):
+    """Hold seats on a departure while the customer completes the booking (public)."""
+    try:
+        return await package_inventory.hold(package_id, hold_data.travelDate, hold_data.travelers)
+        
+    except SeatsUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Hold package seats error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to hold seats")
+
 # Admin package endpoints
 @api_router.get("/admin/packages", response_model=List[Package])
 async def admin_get_packages(current_admin: dict = Depends(admin_required)):
@@ -174,6 +315,8 @@ async def create_package(package_data: PackageCreate, current_admin: dict = Depe
         
         result = await packages_collection.insert_one(package.dict(by_alias=True))
         package.id = str(result.inserted_id)
+        await upload_store.update_references(after=[package.image, *package.images])
+        image_derivative_worker.enqueue("packages", package.id)
         
         return package
         
@@ -201,6 +344,13 @@ async def update_package(package_id: str, package_data: PackageUpdate, current_a
             {"_id": package_id},
             {"$set": update_data}
         )
+        if "image" in update_data or "images" in update_data:
+            await upload_store.update_references(
+                before=[existing_package.get("image"), *existing_package.get("images", [])],
+                after=[update_data.get("image", existing_package.get("image")),
+                       *update_data.get("images", existing_package.get("images", []))]
+            )
+            image_derivative_worker.enqueue("packages", package_id)
         
         # Return updated package
         updated_package = await packages_collection.find_one({"_id": package_id})
@@ -219,10 +369,13 @@ async def delete_package(package_id: str, current_admin: dict = Depends(admin_re
         db = get_database()
         packages_collection = db.packages
         
-        result = await packages_collection.delete_one({"_id": package_id})
+        deleted_package = await packages_collection.find_one_and_delete({"_id": package_id})
         
-        if result.deleted_count == 0:
+        if not deleted_package:
             raise HTTPException(status_code=404, detail="Package not found")
+        await upload_store.update_references(
+            before=[deleted_package.get("image"), *deleted_package.get("images", [])]
+        )
         
         return {"message": "Package deleted successfully"}
         
@@ -232,6 +385,109 @@ async def delete_package(package_id: str, current_admin: dict = Depends(admin_re
         logger.error(f"Delete package error: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete package")
 
+@api_router.put("/admin/packages/{package_id}/departures/{travel_date}", response_model=DepartureAvailability)
+async def update_package_departure(
+    package_id: str,
+    travel_date: datetime,
+    capacity_data: DepartureCapacityUpdate,
+    current_admin: dict = Depends(admin_required)
+):
+    """Set the number of seats on one departure date (admin)."""
+    try:
+        return await package_inventory.set_capacity(package_id, travel_date, capacity_data.capacity)
+        
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Update package departure error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to update departure")
+
+# Admin pricing rule endpoints
+@api_router.get("/admin/pricing-rules", response_model=List[PricingRule])
+async def admin_get_pricing_rules(current_admin: dict = Depends(admin_required)):
+    """Get all pricing rules (admin)."""
+    try:
+        db = get_database()
+        
+        rules = await db.pricing_rules.find({}).sort([("kind", 1), ("priority", 1)]).to_list(length=1000)
+        
+        return [PricingRule(**rule) for rule in rules]
+        
+    except Exception as e:
+        logger.error(f"Admin get pricing rules error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch pricing rules")
+
+@api_router.post("/admin/pricing-rules", response_model=PricingRule)
+async def create_pricing_rule(rule_data: PricingRuleCreate, current_admin: dict = Depends(admin_required)):
+    """Create pricing rule (admin)."""
+    try:
+        db = get_database()
+        
+        rule = PricingRule(**rule_data.dict())
+        rule_slots(rule.dict())
+        
+        await db.pricing_rules.insert_one(rule.dict(by_alias=True))
+        pricing_engine.invalidate()
+        
+        return rule
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Create pricing rule error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create pricing rule")
+
+@api_router.put("/admin/pricing-rules/{rule_id}", response_model=PricingRule)
+async def update_pricing_rule(rule_id: str, rule_data: PricingRuleUpdate, current_admin: dict = Depends(admin_required)):
+    """Update pricing rule (admin)."""
+    try:
+        db = get_database()
+        
+        existing_rule = await db.pricing_rules.find_one({"_id": rule_id})
+        if not existing_rule:
+            raise HTTPException(status_code=404, detail="Pricing rule not found")
+        
+        update_data = {k: v for k, v in rule_data.dict().items() if v is not None}
+        rule_slots({**existing_rule, **update_data})
+        
+        await db.pricing_rules.update_one(
+            {"_id": rule_id},
+            {"$set": update_data}
+        )
+        pricing_engine.invalidate()
+        
+        updated_rule = await db.pricing_rules.find_one({"_id": rule_id})
+        return PricingRule(**updated_rule)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Update pricing rule error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to update pricing rule")
+
+@api_router.delete("/admin/pricing-rules/{rule_id}")
+async def delete_pricing_rule(rule_id: str, current_admin: dict = Depends(admin_required)):
+    """Delete pricing rule (admin)."""
+    try:
+        db = get_database()
+        
+        result = await db.pricing_rules.delete_one({"_id": rule_id})
+        if result.deleted_count == 0:
+            raise HTTPException(status_code=404, detail="Pricing rule not found")
+        pricing_engine.invalidate()
+        
+        return {"message": "Pricing rule deleted successfully"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Delete pricing rule error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to delete pricing rule")
+
 # Booking endpoints
 @api_router.post("/bookings", response_model=Booking)
 async def create_booking(booking_data: BookingCreate):
@@ -240,13 +496,38 @@ async def create_booking(booking_data: BookingCreate):
         db = get_database()
         bookings_collection = db.bookings
         
-        booking = Booking(**booking_data.dict())
+        booking = Booking(**booking_data.dict(exclude={"holdId"}))
+        
+        departure = None
+        if booking.packageId:
+            package = await db.packages.find_one({"_id": booking.packageId}, {"price": 1})
+            if not package:
+                raise LookupError("Package not found")
+            # Priced here rather than trusting the client's amount, on the seats left before the customer's own hold
+            booking.totalAmount = await pricing_engine.price(
+                package,
+                booking.travelDate,
+                TravelParty(adults=booking.travelers - len(booking.childAges), childAges=booking.childAges),
+                held_seats=booking.travelers if booking_data.holdId else 0
+            )
+            departure = await package_inventory.reserve(
+                booking.packageId, booking.travelDate, booking.travelers, booking_data.holdId
+            )
         
-        result = await bookings_collection.insert_one(booking.dict(by_alias=True))
+        try:
+            result = await bookings_collection.insert_one(booking.dict(by_alias=True))
+        except Exception:
+            if departure:
+                await package_inventory.release_seats(departure, booking.travelers)
+            raise
         booking.id = str(result.inserted_id)
         
         return booking
         
+    except SeatsUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except (LookupError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Create booking error: {e}")
         raise HTTPException(status_code=500, detail="Failed to create booking")
@@ -307,20 +588,69 @@ async def create_testimonial(testimonial_data: TestimonialCreate):
 async def create_cab_booking(cab_booking_data: CabBookingCreate):
     """Create cab booking (public)."""
     try:
-        db = get_database()
-        cab_bookings_collection = db.cab_bookings
-        
         cab_booking = CabBooking(**cab_booking_data.dict())
+        estimated_cost = await fare_engine.estimate(
+            cab_booking.vehicleType,
+            cab_booking.tripType,
+            cab_booking.pickupLocation,
+            cab_booking.dropLocation,
+            cab_booking.pickupDate,
+            cab_booking.returnDate
+        )
+        if estimated_cost is not None:
+            cab_booking.estimatedCost = estimated_cost
         
-        result = await cab_bookings_collection.insert_one(cab_booking.dict(by_alias=True))
-        cab_booking.id = str(result.inserted_id)
+        await fleet_availability.reserve(cab_booking)
         
         return cab_booking
         
+    except FleetUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Create cab booking error: {e}")
         raise HTTPException(status_code=500, detail="Failed to create cab booking")
 
+@api_router.post("/cab-bookings/quote", response_model=FareQuote)
+async def quote_cab_fare(quote_request: FareQuoteRequest):
+    """Estimate the fare of a trip for every active vehicle (public)."""
+    try:
+        return await fare_engine.quote(
+            quote_request.tripType,
+            quote_request.pickupLocation,
+            quote_request.dropLocation,
+            quote_request.pickupDate,
+            quote_request.returnDate,
+            quote_request.passengers
+        )
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Quote cab fare error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to quote fare")
+
+@api_router.get("/cab-bookings/availability")
+async def get_cab_availability(
+    startDate: datetime,
+    endDate: Optional[datetime] = None
+):
+    """Vehicles of each type free on every day of a date range (public)."""
+    try:
+        return await fleet_availability.availability(startDate, endDate or startDate)
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Get cab availability error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get availability")
+
+@api_router.get("/cab-bookings/locations")
+async def get_cab_locations():
+    """Pickup and drop points the fare engine knows distances for (public)."""
+    return fare_engine.locations()
+
 # Contact endpoints
 @api_router.post("/contact", response_model=ContactInquiry)
 async def create_contact_inquiry(contact_data: ContactCreate):
@@ -340,6 +670,106 @@ async def create_contact_inquiry(contact_data: ContactCreate):
         logger.error(f"Create contact inquiry error: {e}")
         raise HTTPException(status_code=500, detail="Failed to create inquiry")
 
+# Public gallery endpoints
+GALLERY_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "imageUrl": 1,
+    "responsiveImages": 1,
+    "category": 1,
+    "tags": 1,
+    "createdAt": 1,
+}
+
+# Cleared on upload and whenever image variants are attached
+gallery_cache = TTLCache(ttl_seconds=300, max_entries=512)
+image_derivative_worker.add_listener("gallery_images", gallery_cache.clear)
+
+def encode_gallery_cursor(image: dict) -> str:
+    position = f"{image['createdAt'].isoformat()}|{image['_id']}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def gallery_cursor_query(cursor: str) -> dict:
+    """Images that come after the cursor in (createdAt, _id) descending order."""
+    try:
+        created_at, image_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        created_at = datetime.fromisoformat(created_at)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"createdAt": {"$lt": created_at}},
+        {"createdAt": created_at, "_id": {"$lt": image_id}}
+    ]}
+
+@api_router.get("/gallery", response_model=GalleryPage)
+async def get_gallery_images(
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=24, ge=1, le=100)
+):
+    """Get active gallery images, newest first, one page at a time (public)."""
+    try:
+        cache_key = ("page", category, tag, cursor, limit)
+        page = gallery_cache.get(cache_key)
+        if page is not None:
+            return page
+        
+        db = get_database()
+        
+        query = {"isActive": True}
+        if category:
+            query["category"] = category
+        if tag:
+            query["tags"] = tag
+        if cursor:
+            query.update(gallery_cursor_query(cursor))
+        
+        # Keyset pagination: one extra image tells us whether another page exists
+        images = await db.gallery_images.find(query, GALLERY_PROJECTION).sort(
+            [("createdAt", -1), ("_id", -1)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+        
+        page = GalleryPage(
+            images=[GalleryImageSummary(**image) for image in images[:limit]],
+            nextCursor=encode_gallery_cursor(images[limit - 1]) if len(images) > limit else None
+        )
+        gallery_cache.set(cache_key, page)
+        
+        return page
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get gallery images error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch gallery images")
+
+@api_router.get("/gallery/categories", response_model=List[GalleryCategoryCount])
+async def get_gallery_categories():
+    """Get gallery categories with their number of active images (public)."""
+    try:
+        categories = gallery_cache.get(("categories",))
+        if categories is not None:
+            return categories
+        
+        db = get_database()
+        
+        pipeline = [
+            {"$match": {"isActive": True}},
+            {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}}
+        ]
+        rows = await db.gallery_images.aggregate(pipeline).to_list(length=None)
+        
+        categories = [GalleryCategoryCount(category=row["_id"], count=row["count"]) for row in rows]
+        gallery_cache.set(("categories",), categories)
+        
+        return categories
+        
+    except Exception as e:
+        logger.error(f"Get gallery categories error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch gallery categories")
+
 # File upload endpoint
 @api_router.post("/admin/upload")
 async def upload_image(
@@ -351,18 +781,7 @@ async def upload_image(
 ):
     """Upload image (admin)."""
     try:
-        # Validate file type
-        if not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Generate unique filename
-        file_extension = file.filename.split(".")[-1]
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = UPLOAD_DIR / unique_filename
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        upload = await save_image_upload(file)
         
         # Create database entry
         db = get_database()
@@ -371,16 +790,19 @@ async def upload_image(
         image = GalleryImage(
             title=title,
             description=description,
-            imageUrl=f"/uploads/{unique_filename}",
+            imageUrl=upload["url"],
             category=category
         )
         
         result = await images_collection.insert_one(image.dict(by_alias=True))
+        await upload_store.update_references(after=[image.imageUrl])
+        image_derivative_worker.enqueue("gallery_images", image.id)
+        gallery_cache.clear()
         
         return {
             "message": "Image uploaded successfully",
             "image_id": str(result.inserted_id),
-            "image_url": f"/uploads/{unique_filename}"
+            "image_url": upload["url"]
         }
         
     except HTTPException:
@@ -389,6 +811,41 @@ async def upload_image(
         logger.error(f"Upload image error: {e}")
         raise HTTPException(status_code=500, detail="Failed to upload image")
 
+@api_router.post("/admin/upload-image", tags=["admin-images"])
+async def upload_admin_image(
+    file: UploadFile = File(...),
+    category: str = Form("general"),
+    current_admin: dict = Depends(admin_required)
+):
+    """Upload image for admin use (vehicles, packages, etc.)"""
+    try:
+        upload = await save_image_upload(file, subdirectory=category)
+        
+        logger.info(f"Image uploaded successfully: {upload['url']}")
+        
+        return {
+            "status": "success",
+            "message": "Image uploaded successfully",
+            "url": upload["url"],
+            "filename": upload["filename"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Image upload error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to upload image")
+
+@api_router.post("/admin/uploads/gc", tags=["admin-images"])
+async def collect_upload_garbage(current_admin: dict = Depends(admin_required)):
+    """Recount upload references and delete files nothing uses any more (admin)."""
+    try:
+        return await upload_store.collect_garbage()
+        
+    except Exception as e:
+        logger.error(f"Upload garbage collection error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to clean up uploads")
+
 # Dashboard stats endpoint
 @api_router.get("/admin/stats", response_model=DashboardStats)
 async def get_dashboard_stats(current_admin: dict = Depends(admin_required)):
@@ -432,6 +889,13 @@ async def get_dashboard_stats(current_admin: dict = Depends(admin_required)):
         raise HTTPException(status_code=500, detail="Failed to fetch dashboard stats")
 
 # PDF Generation endpoints
+def parse_travel_date(travel_date: Optional[str]) -> Optional[datetime]:
+    """Travel date for pricing a PDF, or None (today) if it is missing or free text such as "To be confirmed"."""
+    try:
+        return datetime.fromisoformat(travel_date) if travel_date else None
+    except ValueError:
+        return None
+
 @api_router.post("/admin/packages/{package_id}/generate-pdf")
 async def generate_package_pdf(
     package_id: str, 
@@ -463,8 +927,10 @@ async def generate_package_pdf(
                 'travelers': travelers or 1
             }
         
+        price_rows = await pricing_engine.price_rows(package, parse_travel_date(travel_date), travelers or 2)
+        
         # Generate PDF
-        pdf_result = pdf_generator.create_package_pdf(package, client_info)
+        pdf_result = await pdf_generator.store_pdf(pdf_generator.create_package_pdf(package, client_info, price_rows))
         
         return {
             "success": True,
@@ -509,14 +975,17 @@ async def download_package_pdf(
                 'travelers': travelers or 1
             }
         
+        price_rows = await pricing_engine.price_rows(package, parse_travel_date(travel_date), travelers or 2)
+        
         # Generate PDF
-        pdf_result = pdf_generator.create_package_pdf(package, client_info)
+        pdf_result = pdf_generator.create_package_pdf(package, client_info, price_rows)
         
-        # Return file for download
+        # Return file for download; it is not kept afterwards
         return FileResponse(
             path=pdf_result['filepath'],
             filename=pdf_result['filename'],
-            media_type='application/pdf'
+            media_type='application/pdf',
+            background=BackgroundTask(Path(pdf_result['filepath']).unlink, missing_ok=True)
         )
         
     except HTTPException:
@@ -531,7 +1000,7 @@ async def generate_sample_pdf(current_admin: dict = Depends(admin_required)):
     try:
         from pdf_generator import generate_sample_pdf
         
-        pdf_result = generate_sample_pdf()
+        pdf_result = await pdf_generator.store_pdf(generate_sample_pdf())
         
         return {
             "success": True,
@@ -806,25 +1275,10 @@ async def admin_change_team_password(
 
 # Popup/Announcement endpoints
 @api_router.get("/popups", response_model=List[Popup])
-async def get_active_popups():
-    """Get active popups (public)."""
+async def get_active_popups(page: Optional[str] = None):
+    """Get active popups, optionally only those shown on one page (public)."""
     try:
-        db = get_database()
-        popup_collection = db.popups
-        
-        # Get active popups that haven't expired
-        current_time = datetime.utcnow()
-        popup_cursor = popup_collection.find({
-            "isActive": True,
-            "startDate": {"$lte": current_time},
-            "$or": [
-                {"endDate": None},
-                {"endDate": {"$gte": current_time}}
-            ]
-        }).sort("createdAt", -1)
-        
-        popups = await popup_cursor.to_list(length=100)
-        return [Popup(**popup) for popup in popups]
+        return await active_popup_cache.get(page)
         
     except Exception as e:
         logger.error(f"Get popups error: {e}")
@@ -857,6 +1311,7 @@ async def create_popup(popup_data: PopupCreate, current_admin: dict = Depends(ad
         
         result = await popup_collection.insert_one(popup.dict(by_alias=True))
         popup.id = str(result.inserted_id)
+        active_popup_cache.invalidate()
         
         return popup
         
@@ -883,6 +1338,7 @@ async def update_popup(popup_id: str, popup_data: PopupUpdate, current_admin: di
             {"_id": popup_id},
             {"$set": update_data}
         )
+        active_popup_cache.invalidate()
         
         # Return updated popup
         updated_popup = await popup_collection.find_one({"_id": popup_id})
@@ -905,6 +1361,7 @@ async def delete_popup(popup_id: str, current_admin: dict = Depends(admin_requir
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Popup not found")
+        active_popup_cache.invalidate()
         
         return {"message": "Popup deleted successfully"}
         
@@ -1130,7 +1587,30 @@ async def add_client_review(
         raise HTTPException(status_code=500, detail="Failed to add review")
 
 # Blog Management endpoints
-@api_router.get("/blog/posts", response_model=List[BlogPost])
+
+# Listing cards never need the body or the AI prompt
+BLOG_LISTING_PROJECTION = {
+    "title": 1,
+    "slug": 1,
+    "excerpt": 1,
+    "category": 1,
+    "tags": 1,
+    "status": 1,
+    "metaTitle": 1,
+    "metaDescription": 1,
+    "featuredImage": 1,
+    "isAIGenerated": 1,
+    "publishedAt": 1,
+    "authorId": 1,
+    "views": 1,
+    "likes": 1,
+    "shares": 1,
+    "createdAt": 1,
+    # Posts saved before wordCount existed fall back to counting server-side
+    "wordCount": {"$ifNull": ["$wordCount", {"$size": {"$split": ["$content", " "]}}]},
+}
+
+@api_router.get("/blog/posts", response_model=List[BlogPostSummary])
 async def get_published_blog_posts(
     category: Optional[str] = None,
     tag: Optional[str] = None,
@@ -1138,6 +1618,11 @@ async def get_published_blog_posts(
 ):
     """Get published blog posts (public)."""
     try:
+        cache_key = (category, tag, limit)
+        cached_posts = blog_listing_cache.get(cache_key)
+        if cached_posts is not None:
+            return cached_posts
+        
         db = get_database()
         blog_collection = db.blog_posts
         
@@ -1146,12 +1631,15 @@ async def get_published_blog_posts(
         if category:
             query["category"] = category
         if tag:
-            query["tags"] = {"$in": [tag]}
+            query["tags"] = tag
         
-        blog_cursor = blog_collection.find(query).sort("publishedAt", -1).limit(limit)
+        blog_cursor = blog_collection.find(query, BLOG_LISTING_PROJECTION).sort("publishedAt", -1).limit(limit)
         blogs = await blog_cursor.to_list(length=limit)
         
-        return [BlogPost(**blog) for blog in blogs]
+        posts = [BlogPostSummary(**blog) for blog in blogs]
+        blog_listing_cache.set(cache_key, posts)
+        
+        return posts
         
     except Exception as e:
         logger.error(f"Get blog posts error: {e}")
@@ -1161,21 +1649,28 @@ async def get_published_blog_posts(
 async def get_blog_post_by_slug(slug: str):
     """Get blog post by slug (public)."""
     try:
-        db = get_database()
-        blog_collection = db.blog_posts
+        post = blog_post_cache.get(slug)
         
-        blog = await blog_collection.find_one({"slug": slug, "status": "published"})
-        
-        if not blog:
-            raise HTTPException(status_code=404, detail="Blog post not found")
+        if post is None:
+            db = get_database()
+            blog_collection = db.blog_posts
+            
+            blog = await blog_collection.find_one({"slug": slug, "status": "published"})
+            
+            if not blog:
+                raise HTTPException(status_code=404, detail="Blog post not found")
+            
+            # Posts published before pre-rendering existed are rendered on first load
+            if blog.get("contentHtml") is None:
+                blog.update(render_blog_fields(blog.get("content")))
+            
+            post = BlogPost(**blog)
+            blog_post_cache.set(slug, post)
         
-        # Increment view count
-        await blog_collection.update_one(
-            {"_id": blog["_id"]},
-            {"$inc": {"views": 1}}
-        )
+        # Buffer the view; it is written in the next batched flush
+        blog_view_counter.increment(post.id)
         
-        return BlogPost(**blog)
+        return post.model_copy(update={"views": post.views + blog_view_counter.pending(post.id)})
         
     except HTTPException:
         raise
@@ -1206,21 +1701,19 @@ async def create_blog_post(blog_data: BlogPostCreate, current_user: dict = Depen
         db = get_database()
         blog_collection = db.blog_posts
         
-        # Check if slug already exists
-        slug = blog_data.title.lower().replace(" ", "-").replace("'", "")[:50]
-        existing_blog = await blog_collection.find_one({"slug": slug})
-        if existing_blog:
-            # Add timestamp to make slug unique
-            slug = f"{slug}-{int(datetime.utcnow().timestamp())}"
-        
         blog = BlogPost(
             **blog_data.dict(),
-            slug=slug,
-            authorId=current_user.get("user_id")
+            slug=blog_data.title.lower().replace(" ", "-").replace("'", "")[:50],
+            authorId=current_user.get("user_id"),
+            wordCount=count_words(blog_data.content)
         )
         
-        result = await blog_collection.insert_one(blog.dict(by_alias=True))
-        blog.id = str(result.inserted_id)
+        # Suffixes the slug with -N if it is already taken
+        blog = await insert_blog_post(blog_collection, blog)
+        blog_listing_cache.clear()
+        
+        if blog.scheduledFor:
+            blog_scheduler.wake()
         
         return blog
         
@@ -1251,10 +1744,26 @@ async def update_blog_post(post_id: str, blog_data: BlogPostUpdate, current_user
             elif update_data["status"] == "approved":
                 update_data["approvedBy"] = current_user.get("user_id")
         
-        await blog_collection.update_one(
-            {"_id": post_id},
-            {"$set": update_data}
-        )
+        if "content" in update_data:
+            update_data["wordCount"] = count_words(update_data["content"])
+        
+        # Render HTML whenever a post is (re)published or its published content changes;
+        # content edited while unpublished drops the old HTML so nothing can serve it later
+        update = {"$set": update_data}
+        new_status = update_data.get("status", existing_blog.get("status"))
+        if new_status == "published":
+            if "content" in update_data or existing_blog.get("status") != "published" or existing_blog.get("contentHtml") is None:
+                update_data.update(render_blog_fields(update_data.get("content", existing_blog.get("content"))))
+        elif "content" in update_data:
+            update["$unset"] = {"contentHtml": "", "tableOfContents": ""}
+        
+        await blog_collection.update_one({"_id": post_id}, update)
+        blog_listing_cache.clear()
+        blog_post_cache.invalidate(existing_blog["slug"])
+        
+        # Approval or a new scheduledFor may move the next publish time
+        if "status" in update_data or "scheduledFor" in update_data:
+            blog_scheduler.wake()
         
         # Return updated blog
         updated_blog = await blog_collection.find_one({"_id": post_id})
@@ -1273,11 +1782,14 @@ async def delete_blog_post(post_id: str, current_user: dict = Depends(admin_requ
         db = get_database()
         blog_collection = db.blog_posts
         
-        result = await blog_collection.delete_one({"_id": post_id})
+        deleted_blog = await blog_collection.find_one_and_delete({"_id": post_id}, {"slug": 1})
         
-        if result.deleted_count == 0:
+        if not deleted_blog:
             raise HTTPException(status_code=404, detail="Blog post not found")
         
+        blog_listing_cache.clear()
+        blog_post_cache.invalidate(deleted_blog["slug"])
+        
         return {"message": "Blog post deleted successfully"}
         
     except HTTPException:
@@ -1291,54 +1803,208 @@ async def delete_blog_post(post_id: str, current_user: dict = Depends(admin_requ
 async def generate_ai_blog_post(request_data: AIBlogRequest, current_user: dict = Depends(team_member_required)):
     """Generate blog post using AI (team members)."""
     try:
-        from ai_blog_generator import ai_blog_generator
+        return await create_ai_blog_post(request_data, author_id=current_user.get("user_id"))
         
-        # Generate blog post
-        blog_data = await ai_blog_generator.generate_blog_post(
+    except AIBudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except Exception as e:
+        logger.error(f"Generate AI blog error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate blog post: {str(e)}")
+
+@api_router.post("/admin/blog/generate/stream")
+async def stream_ai_blog_post(
+    request_data: AIBlogRequest,
+    request: Request,
+    current_user: dict = Depends(team_member_required)
+):
+    """Generate blog post using AI, streaming sections as Server-Sent Events (team members).
+    
+    Emits `delta` events ({"field", "text"}) while the model writes and a final
+    `done` event with the saved post. Disconnecting aborts the generation.
+    """
+    from ai_blog_generator import ai_blog_generator
+    
+    def sse(event: str, data) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    
+    async def event_stream():
+        generation = ai_blog_generator.stream_blog_post(
             topic=request_data.topic,
             category=request_data.category.value,
             keywords=request_data.keywords,
             target_length=request_data.targetLength,
             tone=request_data.tone,
-            focus_areas=request_data.focusAreas
+            focus_areas=request_data.focusAreas,
+            use_cache=request_data.useCache,
+            user_id=current_user.get("user_id")
         )
+        try:
+            async for kind, payload in generation:
+                if await request.is_disconnected():
+                    logger.info(f"AI blog stream for '{request_data.topic}' aborted by client")
+                    return
+                
+                if kind == "delta":
+                    field, text = payload
+                    yield sse("delta", {"field": field, "text": text})
+                else:
+                    blog = await store_ai_blog_post(payload, author_id=current_user.get("user_id"))
+                    yield sse("done", blog.model_dump(mode="json", by_alias=True))
+        except Exception as e:
+            logger.error(f"Stream AI blog error: {e}")
+            yield sse("error", {"detail": f"Failed to generate blog post: {str(e)}"})
+        finally:
+            # Stops the upstream completion if the client went away mid-stream
+            await generation.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.post("/admin/blog/jobs", response_model=BlogGenerationJob, status_code=202)
+async def submit_blog_generation_job(request_data: AIBlogRequest, current_user: dict = Depends(team_member_required)):
+    """Queue an AI blog generation job (team members)."""
+    try:
+        return await blog_generation_queue.submit(request_data, current_user.get("user_id"))
         
-        # Create blog post in database
+    except Exception as e:
+        logger.error(f"Submit blog generation job error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to queue blog generation")
+
+@api_router.get("/admin/blog/jobs", response_model=List[BlogGenerationJob])
+async def get_blog_generation_jobs(
+    status: Optional[GenerationJobStatus] = None,
+    limit: int = Query(default=50, le=200),
+    current_user: dict = Depends(team_member_required)
+):
+    """Get recent AI blog generation jobs (team members)."""
+    try:
         db = get_database()
-        blog_collection = db.blog_posts
+        jobs_collection = db.blog_generation_jobs
         
-        # Ensure unique slug
-        base_slug = blog_data["slug"]
-        slug = base_slug
-        counter = 1
-        while await blog_collection.find_one({"slug": slug}):
-            slug = f"{base_slug}-{counter}"
-            counter += 1
+        query = {"status": status.value} if status else {}
+        jobs_cursor = jobs_collection.find(query).sort("createdAt", -1).limit(limit)
+        jobs = await jobs_cursor.to_list(length=limit)
         
-        blog = BlogPost(
-            **blog_data,
-            slug=slug,
-            status=BlogStatus.pending_approval,
-            authorId=current_user.get("user_id"),
-            isAIGenerated=True
-        )
+        return [BlogGenerationJob(**job) for job in jobs]
+        
+    except Exception as e:
+        logger.error(f"Get blog generation jobs error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch blog generation jobs")
+
+@api_router.get("/admin/blog/jobs/{job_id}", response_model=BlogGenerationJob)
+async def get_blog_generation_job(job_id: str, current_user: dict = Depends(team_member_required)):
+    """Get the status of an AI blog generation job (team members)."""
+    try:
+        job = await blog_generation_queue.get(job_id)
         
-        result = await blog_collection.insert_one(blog.dict(by_alias=True))
-        blog.id = str(result.inserted_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Generation job not found")
         
-        return blog
+        return job
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Generate AI blog error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate blog post: {str(e)}")
+        logger.error(f"Get blog generation job error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch generation job")
+
+@api_router.get("/admin/blog/jobs/{job_id}/events")
+async def stream_blog_generation_job(job_id: str, current_user: dict = Depends(team_member_required)):
+    """Stream status changes of an AI blog generation job as Server-Sent Events (team members)."""
+    job = await blog_generation_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Generation job not found")
+    
+    async def event_stream():
+        last_status = None
+        current_job = job
+        while current_job:
+            if current_job.status != last_status:
+                last_status = current_job.status
+                payload = current_job.model_dump(mode="json", by_alias=True)
+                yield f"event: status\ndata: {json.dumps(payload)}\n\n"
+            if current_job.status.value in TERMINAL_JOB_STATUSES:
+                break
+            await asyncio.sleep(1)
+            current_job = await blog_generation_queue.get(job_id)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.post("/admin/blog/generate-batch", response_model=BlogBatchJob, status_code=202)
+async def generate_blog_batch(batch_request: BlogBatchRequest, current_user: dict = Depends(team_member_required)):
+    """Generate many AI blog posts in the background (team members).
+    
+    Takes explicit requests and/or a category plus count of AI-suggested topics.
+    Poll `/admin/blog/batches/{batch_id}` for per-item status.
+    """
+    try:
+        if not batch_request.requests and not (batch_request.category and batch_request.count):
+            raise HTTPException(status_code=400, detail="Provide requests or a category and count")
+        
+        return await blog_batch_generator.submit(batch_request, current_user.get("user_id"))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Generate blog batch error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to queue blog batch")
+
+@api_router.get("/admin/blog/batches", response_model=List[BlogBatchJob])
+async def get_blog_batches(limit: int = Query(default=20, le=100), current_user: dict = Depends(team_member_required)):
+    """Get recent AI blog generation batches (team members)."""
+    try:
+        db = get_database()
+        batches_collection = db.blog_generation_batches
+        
+        batches_cursor = batches_collection.find({}).sort("createdAt", -1).limit(limit)
+        batches = await batches_cursor.to_list(length=limit)
+        
+        return [BlogBatchJob(**batch) for batch in batches]
+        
+    except Exception as e:
+        logger.error(f"Get blog batches error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch blog batches")
+
+@api_router.get("/admin/blog/batches/{batch_id}", response_model=BlogBatchJob)
+async def get_blog_batch(batch_id: str, current_user: dict = Depends(team_member_required)):
+    """Get the status of an AI blog generation batch (team members)."""
+    try:
+        batch = await blog_batch_generator.get(batch_id)
+        
+        if not batch:
+            raise HTTPException(status_code=404, detail="Blog batch not found")
+        
+        return batch
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get blog batch error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch blog batch")
 
 @api_router.get("/admin/blog/topics/{category}")
-async def get_topic_suggestions(category: str, count: int = Query(default=5, le=20), current_user: dict = Depends(team_member_required)):
-    """Get AI-generated topic suggestions (team members)."""
+async def get_topic_suggestions(
+    category: str,
+    count: int = Query(default=5, le=20),
+    refresh: bool = False,
+    current_user: dict = Depends(team_member_required)
+):
+    """Get AI-generated topic suggestions (team members). Cached per category; `refresh` asks the AI again."""
     try:
         from ai_blog_generator import ai_blog_generator
         
-        topics = await ai_blog_generator.generate_topic_suggestions(category, count)
+        topics = await ai_blog_generator.generate_topic_suggestions(
+            category, count, refresh=refresh, user_id=current_user.get("user_id")
+        )
         return {"topics": topics}
         
     except Exception as e:
@@ -1379,6 +2045,10 @@ async def update_blog_generation_settings(settings_data: dict, current_admin: di
         update_data = {k: v for k, v in settings_data.items() if k != "_id"}
         update_data["updatedAt"] = datetime.utcnow()
         
+        # Let the scheduler recompute the next run from lastGenerated and the new frequency
+        if "generationFrequency" in update_data and "nextScheduled" not in update_data:
+            update_data["nextScheduled"] = None
+        
         if existing_settings:
             await settings_collection.update_one(
                 {"_id": existing_settings["_id"]},
@@ -1390,12 +2060,56 @@ async def update_blog_generation_settings(settings_data: dict, current_admin: di
             await settings_collection.insert_one(new_settings.dict(by_alias=True))
             updated_settings = new_settings.dict(by_alias=True)
         
+        blog_scheduler.wake()
+        
         return BlogGenerationSettings(**updated_settings)
         
     except Exception as e:
         logger.error(f"Update blog settings error: {e}")
         raise HTTPException(status_code=500, detail="Failed to update blog settings")
 
+@api_router.get("/admin/ai-usage")
+async def get_ai_usage(
+    days: int = Query(default=30, ge=1, le=365),
+    user_id: Optional[str] = None,
+    current_admin: dict = Depends(admin_required)
+):
+    """Get AI token, latency and cost totals per model, user and day (admin)."""
+    try:
+        summary = await ai_usage_tracker.summary(days=days, user_id=user_id)
+        
+        # Today's running totals against the configured budgets
+        db = get_database()
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        today_totals = await db.ai_usage_daily.find_one({"_id": today}) or {}
+        settings = await db.blog_generation_settings.find_one({}) or {}
+        summary["today"] = {
+            "costUsd": today_totals.get("costUsd", 0),
+            "totalTokens": today_totals.get("totalTokens", 0),
+            "calls": today_totals.get("calls", 0),
+            "dailyBudgetUsd": settings.get("dailyBudgetUsd"),
+            "dailyTokenBudget": settings.get("dailyTokenBudget"),
+            "userDailyBudgetUsd": settings.get("userDailyBudgetUsd")
+        }
+        return summary
+        
+    except Exception as e:
+        logger.error(f"Get AI usage error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch AI usage")
+
+@api_router.delete("/admin/blog/ai-cache")
+async def clear_ai_response_cache(kind: Optional[str] = None, current_admin: dict = Depends(admin_required)):
+    """Clear cached AI topic suggestions and generations (admin)."""
+    try:
+        from ai_response_cache import ai_response_cache
+        
+        deleted = await ai_response_cache.clear(kind)
+        return {"message": "AI response cache cleared", "deleted": deleted}
+        
+    except Exception as e:
+        logger.error(f"Clear AI response cache error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to clear AI response cache")
+
 @api_router.post("/admin/blog/test-ai")
 async def test_ai_connection(current_admin: dict = Depends(admin_required)):
     """Test AI connection (admin)."""
@@ -1422,25 +2136,41 @@ async def test_ai_connection(current_admin: dict = Depends(admin_required)):
 # VEHICLE MANAGEMENT ENDPOINTS
 # ============================================================================
 
+# Serialized catalogue bodies with their ETags, cleared by vehicle writes and new image variants
+vehicle_catalogue_cache = TTLCache(ttl_seconds=600, max_entries=4)
+image_derivative_worker.add_listener("vehicles", vehicle_catalogue_cache.clear)
+
 @api_router.get("/vehicles", tags=["vehicles"])
 async def get_vehicles(
+    request: Request,
     active_only: bool = Query(True, description="Return only active vehicles")
 ):
     """Get all vehicles (public endpoint)."""
     try:
-        db = get_database()
-        filter_criteria = {}
-        if active_only:
-            filter_criteria["isActive"] = True
+        cached = vehicle_catalogue_cache.get(active_only)
+        if cached is None:
+            db = get_database()
+            filter_criteria = {}
+            if active_only:
+                filter_criteria["isActive"] = True
+            
+            vehicles_cursor = db.vehicles.find(filter_criteria)
+            vehicles = await vehicles_cursor.sort("sortOrder", 1).to_list(length=100)
+            
+            # Serialized once; later requests send the same bytes
+            body = orjson.dumps({
+                "status": "success",
+                "data": [Vehicle(**vehicle).model_dump(by_alias=True) for vehicle in vehicles]
+            })
+            cached = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+            vehicle_catalogue_cache.set(active_only, cached)
         
-        vehicles_cursor = db.vehicles.find(filter_criteria)
-        vehicles = await vehicles_cursor.sort("sortOrder", 1).to_list(length=100)
+        body, etag = cached
+        headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+        if etag in [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
         
-        # Convert ObjectId to string for each vehicle
-        for vehicle in vehicles:
-            vehicle["_id"] = str(vehicle["_id"])
-        
-        return {"status": "success", "data": vehicles}
+        return Response(content=body, media_type="application/json", headers=headers)
         
     except Exception as e:
         logger.error(f"Get vehicles error: {e}")
@@ -1480,6 +2210,11 @@ async def create_vehicle(
         vehicle_dict = vehicle.dict(by_alias=True)
         
         result = await db.vehicles.insert_one(vehicle_dict)
+        await upload_store.update_references(after=[vehicle.image])
+        image_derivative_worker.enqueue("vehicles", vehicle.id)
+        vehicle_catalogue_cache.clear()
+        fare_engine.invalidate()
+        fleet_availability.invalidate()
         
         # Get the created vehicle
         created_vehicle = await db.vehicles.find_one({"_id": vehicle.id})
@@ -1507,13 +2242,20 @@ async def update_vehicle(
         update_data = {k: v for k, v in vehicle_data.dict().items() if v is not None}
         update_data["updatedAt"] = datetime.utcnow()
         
-        result = await db.vehicles.update_one(
+        previous_vehicle = await db.vehicles.find_one_and_update(
             {"_id": vehicle_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection={"image": 1}
         )
         
-        if result.matched_count == 0:
+        if not previous_vehicle:
             raise HTTPException(status_code=404, detail="Vehicle not found")
+        vehicle_catalogue_cache.clear()
+        fare_engine.invalidate()
+        fleet_availability.invalidate()
+        if "image" in update_data:
+            await upload_store.update_references(before=[previous_vehicle.get("image")], after=[update_data["image"]])
+            image_derivative_worker.enqueue("vehicles", vehicle_id)
         
         # Get the updated vehicle
         updated_vehicle = await db.vehicles.find_one({"_id": vehicle_id})
@@ -1537,10 +2279,14 @@ async def delete_vehicle(
     """Delete a vehicle (admin)."""
     try:
         db = get_database()
-        result = await db.vehicles.delete_one({"_id": vehicle_id})
+        deleted_vehicle = await db.vehicles.find_one_and_delete({"_id": vehicle_id}, projection={"image": 1})
         
-        if result.deleted_count == 0:
+        if not deleted_vehicle:
             raise HTTPException(status_code=404, detail="Vehicle not found")
+        await upload_store.update_references(before=[deleted_vehicle.get("image")])
+        vehicle_catalogue_cache.clear()
+        fare_engine.invalidate()
+        fleet_availability.invalidate()
         
         return {
             "status": "success",
@@ -1748,59 +2494,3 @@ async def get_whatsapp_messages(
 
 # Include router in app
 app.include_router(api_router)
-
-# ============================================================================
-# IMAGE UPLOAD ENDPOINTS
-# ============================================================================
-
-@api_router.post("/admin/upload-image", tags=["admin-images"])
-async def upload_image(
-    file: UploadFile = File(...),
-    category: str = Form("general"),
-    current_admin: dict = Depends(admin_required)
-):
-    """Upload image for admin use (vehicles, packages, etc.)"""
-    try:
-        # Validate file type
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Validate file size (max 5MB)
-        file_size = 0
-        content = await file.read()
-        file_size = len(content)
-        
-        if file_size > 5 * 1024 * 1024:  # 5MB
-            raise HTTPException(status_code=400, detail="File size must be less than 5MB")
-        
-        # Create uploads directory if it doesn't exist
-        upload_dir = Path("uploads") / category
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Generate unique filename
-        file_extension = Path(file.filename).suffix
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = upload_dir / unique_filename
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
-        
-        # Return file URL
-        file_url = f"/uploads/{category}/{unique_filename}"
-        
-        logger.info(f"Image uploaded successfully: {file_url}")
-        
-        return {
-            "status": "success",
-            "message": "Image uploaded successfully",
-            "url": file_url,
-            "filename": unique_filename
-        }
-        
-    except Exception as e:
-        logger.error(f"Image upload error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-# Serve uploaded files
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""
+Object Storage for G.M.B Travels Kashmir
+Stores uploads and generated PDFs on the local filesystem or an S3-compatible bucket
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+class StorageBackend(ABC):
+    """Where uploaded files live, addressed by slash-separated keys such as "ab/<sha256>.jpg".
+
+    Files are always written to a local scratch file first and then handed
+    to put_file, which consumes it; the S3 backend streams it to the bucket
+    (in parts, for large files) and the local backend moves it into place.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def put_file(
+        self,
+        key: str,
+        path: Path,
+        content_type: Optional[str] = None,
+        cache_control: Optional[str] = None
+    ) -> None:
+        """Store the scratch file at path under key, consuming it."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether a file is stored under key."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove the file under key, if there is one."""
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str) -> int:
+        """Remove every file whose key starts with prefix, returning how many were removed."""
+
+    @abstractmethod
+    async def download(self, key: str, path: Path) -> None:
+        """Copy the file under key to a local path."""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path of the stored file if it is on this machine's disk, else None."""
+        return None
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public URL for a stored file."""
+
+    @abstractmethod
+    async def presigned_url(self, key: str, expires_in: int = 3600, filename: Optional[str] = None) -> str:
+        """Time-limited URL for a file that should not be public, e.g. a client's PDF quote."""
+
+    @abstractmethod
+    def key_for_url(self, url: str) -> Optional[str]:
+        """Key of a file this backend stored, given its public URL (absolute or relative)."""
+
+class LocalStorage(StorageBackend):
+    """Files under a local directory, served by the /uploads static mount."""
+
+    name = "local"
+
+    def __init__(self, root: Path = Path("uploads"), base_url: str = "/uploads"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    async def put_file(self, key, path, content_type=None, cache_control=None) -> None:
+        target = self._path(key)
+        if Path(path).resolve() == target:
+            # Already written in place (e.g. image variants)
+            return
+
+        def move():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.replace(path, target)
+            except OSError:
+                # Scratch file on another filesystem
+                shutil.move(str(path), target)
+
+        await asyncio.to_thread(move)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._path(key).is_file)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        directory, _, name_prefix = prefix.rpartition("/")
+
+        def remove():
+            removed = 0
+            for path in self._path(directory or ".").glob(f"{name_prefix}*"):
+                if path.is_file():
+                    path.unlink(missing_ok=True)
+                    removed += 1
+            return removed
+
+        return await asyncio.to_thread(remove)
+
+    async def download(self, key: str, path: Path) -> None:
+        await asyncio.to_thread(shutil.copyfile, self._path(key), path)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        path = self._path(key)
+        return path if path.is_file() else None
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    async def presigned_url(self, key: str, expires_in: int = 3600, filename: Optional[str] = None) -> str:
+        # Local files are served as-is by the static mount
+        return self.url(key)
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        # Match on the path only: uploads are stored with the backend's public origin in front
+        path = urlparse(url).path
+        if not path.startswith(self.base_url + "/"):
+            return None
+        return path[len(self.base_url) + 1:]
+
+class S3Storage(StorageBackend):
+    """Files in an S3-compatible bucket (AWS S3, MinIO, Cloudflare R2, ...).
+
+    Uploads go through boto3's transfer manager, which switches to a
+    multipart upload above multipart_threshold. Public URLs point at
+    public_base_url (typically a CDN in front of the bucket) when set,
+    otherwise at the bucket endpoint itself.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        public_base_url: Optional[str] = None,
+        multipart_threshold: int = 8 * 1024 * 1024
+    ):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_threshold
+        )
+        if public_base_url:
+            self.public_base_url = public_base_url.rstrip("/")
+        elif endpoint_url:
+            self.public_base_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_base_url = f"https://{bucket}.s3.{region or 'us-east-1'}.amazonaws.com"
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    async def put_file(self, key, path, content_type=None, cache_control=None) -> None:
+        extra_args = {}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        if cache_control:
+            extra_args["CacheControl"] = cache_control
+
+        await asyncio.to_thread(
+            self.client.upload_file,
+            str(path), self.bucket, self._object_key(key),
+            ExtraArgs=extra_args, Config=self.transfer_config
+        )
+        await asyncio.to_thread(Path(path).unlink, missing_ok=True)
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self._object_key(key))
+
+    async def delete_prefix(self, prefix: str) -> int:
+        def remove():
+            removed = 0
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix)):
+                objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+                if objects:
+                    self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+                    removed += len(objects)
+            return removed
+
+        return await asyncio.to_thread(remove)
+
+    async def download(self, key: str, path: Path) -> None:
+        await asyncio.to_thread(
+            self.client.download_file, self.bucket, self._object_key(key), str(path),
+            Config=self.transfer_config
+        )
+
+    def url(self, key: str) -> str:
+        return f"{self.public_base_url}/{self._object_key(key)}"
+
+    async def presigned_url(self, key: str, expires_in: int = 3600, filename: Optional[str] = None) -> str:
+        params = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        return await asyncio.to_thread(
+            self.client.generate_presigned_url, "get_object", Params=params, ExpiresIn=expires_in
+        )
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        base = self.public_base_url + "/"
+        if self.prefix:
+            base += self.prefix + "/"
+        return url[len(base):].split("?", 1)[0] if url.startswith(base) else None
+
+def create_storage() -> StorageBackend:
+    """Backend selected by STORAGE_BACKEND (local or s3)."""
+    backend = os.environ.get("STORAGE_BACKEND", "local").lower()
+    if backend == "s3":
+        return S3Storage(
+            bucket=os.environ["S3_BUCKET"],
+            prefix=os.environ.get("S3_PREFIX", ""),
+            endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None,
+            region=os.environ.get("S3_REGION") or None,
+            public_base_url=os.environ.get("S3_PUBLIC_BASE_URL") or None
+        )
+    if backend != "local":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    return LocalStorage()
+
+# Global instance
+storage = create_storage()
@@ -0,0 +1,214 @@
+"""
+Upload Serving for G.M.B Travels Kashmir
+Serves /uploads with long-lived caching for content-addressed files, ETags, byte ranges and precompressed variants
+"""
+
+import logging
+import mimetypes
+import os
+import re
+import stat
+from email.utils import formatdate
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Files that can be overwritten in place (e.g. regenerated PDFs) are revalidated with their ETag
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# Blobs (<2 hex>/<sha256>.<ext>) and their variants (derived/<2 hex>/<sha256>-<width>w.<fmt>)
+CONTENT_ADDRESSED_PATTERN = re.compile(r"^(?:derived/)?[0-9a-f]{2}/([0-9a-f]{64}(?:-\d+w)?)\.[a-z0-9]+$")
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Precompressed siblings written next to a file, in order of preference
+PRECOMPRESSED_SUFFIXES: Dict[str, str] = {"br": ".br", "gzip": ".gz"}
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single `bytes=` range.
+
+    Returns None when the header should be ignored (malformed or several
+    ranges; a full 200 response is a valid answer to those) and raises
+    ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError("range not satisfiable")
+    return start, end
+
+def accepted_encodings(header: str) -> set:
+    """Content codings the client accepts, ignoring those with q=0."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+class FileRangeResponse(Response):
+    """206 response streaming one byte range of a file."""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, start: int, end: int, size: int, headers: Dict[str, str], media_type: str):
+        headers = dict(headers)
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+        headers["content-length"] = str(end - start + 1)
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # File shrank while streaming; end the body rather than hang
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+class UploadStaticFiles(StaticFiles):
+    """StaticFiles for the uploads directory.
+
+    Content-addressed files get far-future `immutable` caching and their
+    hash as a strong ETag; everything else is revalidated. Single byte
+    ranges are served as 206 (honouring If-Range), and `.br`/`.gz`
+    siblings are served to clients that accept them. Whole files go out
+    through FileResponse, which uses the server's zero-copy pathsend
+    extension when available; with UPLOADS_ACCEL_REDIRECT set (e.g.
+    "/internal-uploads/"), the body is instead handed to nginx via
+    X-Accel-Redirect so it is sent with sendfile. Dot-files, such as
+    in-progress uploads, are never served.
+    """
+
+    def __init__(self, *args, accel_redirect: Optional[str] = os.environ.get("UPLOADS_ACCEL_REDIRECT"), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accel_redirect = accel_redirect
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        if any(part.startswith(".") for part in re.split(r"[\\/]", path) if part):
+            return "", None
+        return super().lookup_path(path)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        request_headers = Headers(scope=scope)
+        if scope["method"] in ("GET", "HEAD") and "range" not in request_headers:
+            accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+            for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    return self._respond(path, full_path, stat_result, scope, encoding)
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200
+    ) -> Response:
+        relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        return self._respond(relative_path, full_path, stat_result, scope)
+
+    def _headers(self, relative_path: str, stat_result: os.stat_result, encoding: Optional[str]) -> Dict[str, str]:
+        headers = {
+            "accept-ranges": "bytes",
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "vary": "Accept-Encoding"
+        }
+        match = CONTENT_ADDRESSED_PATTERN.match(relative_path)
+        if match:
+            headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            headers["etag"] = f'"{match.group(1)}{"-" + encoding if encoding else ""}"'
+        else:
+            headers["cache-control"] = REVALIDATE_CACHE_CONTROL
+        if encoding:
+            headers["content-encoding"] = encoding
+        return headers
+
+    def _respond(
+        self,
+        relative_path: str,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        encoding: Optional[str] = None
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(relative_path)[0] or "application/octet-stream"
+        response = FileResponse(
+            full_path,
+            stat_result=stat_result,
+            headers=self._headers(relative_path, stat_result, encoding),
+            media_type=media_type
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        if self.accel_redirect and scope["method"] == "GET":
+            # nginx serves the body (and any Range) from its internal location
+            headers = {
+                key: value for key, value in response.headers.items()
+                if key not in ("content-length", "accept-ranges")
+            }
+            full_relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+            headers["x-accel-redirect"] = self.accel_redirect.rstrip("/") + "/" + full_relative
+            return Response(headers=headers, media_type=media_type)
+
+        range_header = request_headers.get("range")
+        if range_header and encoding is None and self._if_range_matches(request_headers, response.headers):
+            size = stat_result.st_size
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                return Response(
+                    status_code=416,
+                    headers={"content-range": f"bytes */{size}", "accept-ranges": "bytes"}
+                )
+            if byte_range is not None and byte_range != (0, size - 1):
+                headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+                return FileRangeResponse(full_path, *byte_range, size, headers, media_type)
+
+        return response
+
+    def _if_range_matches(self, request_headers: Headers, response_headers: Headers) -> bool:
+        """A Range applies unless If-Range names a different version of the file."""
+        if_range = request_headers.get("if-range")
+        if not if_range:
+            return True
+        if if_range.startswith(('"', "W/")):
+            # Only strong ETags may be used with If-Range
+            return not if_range.startswith("W/") and if_range == response_headers.get("etag")
+        return if_range == response_headers.get("last-modified")
@@ -0,0 +1,95 @@
+"""
+Buffered view counter for G.M.B Travels Kashmir
+Aggregates page-view increments in memory and flushes them in one bulk write
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+class ViewCounter:
+    def __init__(self, collection_name: str, field: str = "views", flush_interval: float = 30):
+        self.collection_name = collection_name
+        self.field = field
+        self.flush_interval = flush_interval
+        self._pending: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+
+    def increment(self, doc_id: str, amount: int = 1) -> None:
+        """Record a view; the database write happens on the next flush."""
+        self._pending[doc_id] += amount
+
+    def pending(self, doc_id: str) -> int:
+        """Views recorded for doc_id that have not been flushed yet."""
+        return self._pending.get(doc_id, 0)
+
+    async def flush(self) -> int:
+        """Write all buffered increments with a single bulk_write."""
+        if not self._pending:
+            return 0
+
+        # Swap the buffer first so views arriving during the write are kept
+        pending, self._pending = self._pending, Counter()
+        write = asyncio.ensure_future(self._write(pending))
+        try:
+            return await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # Let the write settle before stopping, so its counts are neither lost nor re-added
+            await asyncio.wait([write])
+            raise
+
+    async def _write(self, pending: Counter) -> int:
+        doc_ids = list(pending)
+        operations = [
+            UpdateOne({"_id": doc_id}, {"$inc": {self.field: pending[doc_id]}})
+            for doc_id in doc_ids
+        ]
+
+        try:
+            db = get_database()
+            await db[self.collection_name].bulk_write(operations, ordered=False)
+            return len(operations)
+        except BulkWriteError as e:
+            # The other updates were applied; only the failed ones are retried on the next flush
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            logger.error(f"Failed to flush {len(failed)} {self.collection_name} view counts: {e}")
+            for index in failed:
+                self._pending[doc_ids[index]] += pending[doc_ids[index]]
+            return len(operations) - len(failed)
+        except Exception as e:
+            logger.error(f"Failed to flush {self.collection_name} view counts: {e}")
+            # Put the counts back so they are retried on the next flush
+            self._pending.update(pending)
+            return 0
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the periodic flush loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write whatever is still buffered."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+# Global instance
+blog_view_counter = ViewCounter("blog_posts")
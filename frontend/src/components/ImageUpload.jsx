@@ -63,11 +63,11 @@ const ImageUpload = ({
         setPreview(fullUrl);
         toast.success('Image uploaded successfully');
       } else {
-        throw new Error(data.message || 'Upload failed');
+        throw new Error(data.detail || data.message || 'Upload failed');
       }
     } catch (error) {
       console.error('Upload error:', error);
-      toast.error('Failed to upload image');
+      toast.error(`Failed to upload image: ${error.message}`);
       setPreview(value || null);
     } finally {
       setUploading(false);
@@ -10,7 +10,7 @@ const PopupDisplay = ({ currentPage = 'home' }) => {
 
   useEffect(() => {
     fetchActivePopups();
-  }, []);
+  }, [currentPage]);
 
   useEffect(() => {
     if (popups.length > 0) {
@@ -44,7 +44,9 @@ const PopupDisplay = ({ currentPage = 'home' }) => {
 
   const fetchActivePopups = async () => {
     try {
-      const response = await axios.get(`${process.env.REACT_APP_BACKEND_URL}/popups`);
+      const response = await axios.get(`${process.env.REACT_APP_BACKEND_URL}/api/popups`, {
+        params: { page: currentPage }
+      });
       setPopups(response.data);
     } catch (error) {
       console.error('Error fetching popups:', error);
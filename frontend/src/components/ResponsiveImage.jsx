@@ -0,0 +1,42 @@
+import React from 'react';
+
+const FORMAT_TYPES = {
+  avif: 'image/avif',
+  webp: 'image/webp',
+};
+
+const withBackendUrl = (srcset) =>
+  srcset
+    .split(', ')
+    .map((entry) => (entry.startsWith('/') ? `${process.env.REACT_APP_BACKEND_URL}${entry}` : entry))
+    .join(', ');
+
+// Renders an image with the AVIF/WebP variants the backend generated for it,
+// falling back to the original URL until the variants exist.
+const ResponsiveImage = ({ src, responsiveImages = [], sizes = '100vw', alt = '', ...props }) => {
+  const responsive = responsiveImages.find((image) => image.src === src);
+
+  if (!responsive) {
+    return <img src={src} alt={alt} loading="lazy" {...props} />;
+  }
+
+  return (
+    <picture className="contents">
+      {Object.entries(FORMAT_TYPES)
+        .filter(([format]) => responsive.srcset[format])
+        .map(([format, type]) => (
+          <source key={format} type={type} srcSet={withBackendUrl(responsive.srcset[format])} sizes={sizes} />
+        ))}
+      <img
+        src={src}
+        alt={alt}
+        width={responsive.width}
+        height={responsive.height}
+        loading="lazy"
+        {...props}
+      />
+    </picture>
+  );
+};
+
+export default ResponsiveImage;
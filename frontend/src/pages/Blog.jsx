@@ -80,10 +80,9 @@ const Blog = () => {
     });
   };
 
-  const calculateReadTime = (content) => {
+  const calculateReadTime = (wordCount) => {
     const wordsPerMinute = 200;
-    const wordCount = content ? content.split(' ').length : 0;
-    const readTime = Math.ceil(wordCount / wordsPerMinute);
+    const readTime = Math.ceil((wordCount || 0) / wordsPerMinute);
     return `${readTime} min`;
   };
 
@@ -173,7 +172,7 @@ const Blog = () => {
                       <div className="flex items-center space-x-4 text-sm text-slate-500">
                         <div className="flex items-center">
                           <Clock className="h-4 w-4 mr-1" />
-                          {post.readTime}
+                          {calculateReadTime(post.wordCount)}
                         </div>
                         <div className="flex items-center">
                           <Eye className="h-4 w-4 mr-1" />
@@ -297,7 +296,7 @@ const Blog = () => {
                       </div>
                       <div className="flex items-center">
                         <Clock className="h-4 w-4 mr-1" />
-                        {calculateReadTime(post.content)}
+                        {calculateReadTime(post.wordCount)}
                       </div>
                     </div>
                     
@@ -250,7 +250,7 @@ const BlogPost = () => {
             <CardContent className="p-8">
               <div 
                 className="prose prose-lg max-w-none prose-slate prose-headings:text-slate-800 prose-a:text-amber-600 prose-a:no-underline hover:prose-a:underline"
-                dangerouslySetInnerHTML={{ __html: post.content }}
+                dangerouslySetInnerHTML={{ __html: post.contentHtml || post.content }}
               />
             </CardContent>
           </Card>
@@ -7,6 +7,7 @@ import { Badge } from '../components/ui/badge';
 import { Calendar } from '../components/ui/calendar';
 import { Popover, PopoverContent, PopoverTrigger } from '../components/ui/popover';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '../components/ui/select';
+import ResponsiveImage from '../components/ResponsiveImage';
 import { 
   Car,
   Users,
@@ -36,6 +37,7 @@ const BookCab = () => {
   const [selectedVehicle, setSelectedVehicle] = useState(null);
   const [vehicleTypes, setVehicleTypes] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [fareQuote, setFareQuote] = useState(null);
   const [bookingForm, setBookingForm] = useState({
     pickupLocation: '',
     dropLocation: '',
@@ -73,6 +75,38 @@ const BookCab = () => {
       setLoading(false);
     }
   };
+
+  // Re-quote whenever the route or dates change
+  useEffect(() => {
+    const { pickupLocation, dropLocation, tripType, pickupDate, returnDate } = bookingForm;
+    if (!pickupLocation || (!dropLocation && tripType !== 'local')) {
+      setFareQuote(null);
+      return;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/cab-bookings/quote`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ pickupLocation, dropLocation, tripType, pickupDate, returnDate }),
+          signal: controller.signal
+        });
+        setFareQuote(response.ok ? await response.json() : null);
+      } catch (error) {
+        if (error.name !== 'AbortError') {
+          console.error('Error fetching fare quote:', error);
+        }
+      }
+    }, 400);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [bookingForm.pickupLocation, bookingForm.dropLocation, bookingForm.tripType, bookingForm.pickupDate, bookingForm.returnDate]);
+
   const handleInputChange = (field, value) => {
     setBookingForm(prev => ({ ...prev, [field]: value }));
   };
@@ -83,10 +117,9 @@ const BookCab = () => {
   };
 
   const calculateEstimatedPrice = () => {
-    if (!selectedVehicle || !bookingForm.pickupLocation || !bookingForm.dropLocation) return 0;
-    // Mock calculation - in real app, you'd use distance calculation API
-    const estimatedDistance = 50; // km
-    return estimatedDistance * selectedVehicle.price;
+    if (!selectedVehicle || !fareQuote) return 0;
+    const vehicleFare = fareQuote.fares.find((fare) => fare.vehicleId === selectedVehicle._id);
+    return vehicleFare ? vehicleFare.fare : 0;
   };
 
   const handleSubmit = (e) => {
@@ -222,8 +255,10 @@ const BookCab = () => {
                     {/* Vehicle Image with 3D Effect */}
                     <div className="relative h-48 overflow-hidden">
                       <div className="absolute inset-0 bg-gradient-to-t from-black/30 to-transparent z-10"></div>
-                      <img 
+                      <ResponsiveImage 
                         src={vehicle.image} 
+                        responsiveImages={vehicle.responsiveImages}
+                        sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
                         alt={vehicle.name}
                         className="w-full h-full object-cover transition-transform duration-700 group-hover:scale-110"
                       />
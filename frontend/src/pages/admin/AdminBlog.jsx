@@ -38,6 +38,8 @@ const AdminBlog = () => {
   const [isAIDialogOpen, setIsAIDialogOpen] = useState(false);
   const [editingPost, setEditingPost] = useState(null);
   const [generating, setGenerating] = useState(false);
+  const [streamPreview, setStreamPreview] = useState(null);
+  const [streamController, setStreamController] = useState(null);
   
   const [postForm, setPostForm] = useState({
     title: '',
@@ -169,15 +171,15 @@ const AdminBlog = () => {
       };
       
       const response = await axios.post(
-        `${process.env.REACT_APP_BACKEND_URL}/admin/blog/generate`,
+        `${process.env.REACT_APP_BACKEND_URL}/admin/blog/jobs`,
         submitData,
         { headers: { Authorization: `Bearer ${token}` } }
       );
       
-      toast.success('AI blog post generated successfully! It\'s pending approval.');
+      toast.success('AI blog generation queued. You can queue more topics while it runs.');
       setIsAIDialogOpen(false);
       resetAIForm();
-      fetchPosts();
+      pollGenerationJob(response.data._id);
     } catch (error) {
       console.error('Error generating AI blog post:', error);
       toast.error(error.response?.data?.detail || 'Failed to generate blog post');
@@ -186,6 +188,101 @@ const AdminBlog = () => {
     }
   };
 
+  const handleStreamAI = async () => {
+    const token = localStorage.getItem('adminToken');
+    const controller = new AbortController();
+    
+    const submitData = {
+      ...aiForm,
+      keywords: Array.isArray(aiForm.keywords) ? aiForm.keywords : aiForm.keywords.split(',').map(k => k.trim()).filter(k => k),
+      focusAreas: Array.isArray(aiForm.focusAreas) ? aiForm.focusAreas : aiForm.focusAreas.split(',').map(f => f.trim()).filter(f => f)
+    };
+    
+    setStreamController(controller);
+    setStreamPreview({ title: '', content: '' });
+    
+    try {
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/admin/blog/generate/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
+        body: JSON.stringify(submitData),
+        signal: controller.signal
+      });
+      
+      if (!response.ok) {
+        throw new Error(`Request failed with status ${response.status}`);
+      }
+      
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        
+        events.forEach((rawEvent) => {
+          const eventName = rawEvent.match(/^event: (.*)$/m)?.[1];
+          const dataLine = rawEvent.match(/^data: (.*)$/m)?.[1];
+          if (!dataLine) return;
+          const data = JSON.parse(dataLine);
+          
+          if (eventName === 'delta' && (data.field === 'title' || data.field === 'content')) {
+            setStreamPreview(prev => ({ ...prev, [data.field]: prev[data.field] + data.text }));
+          } else if (eventName === 'done') {
+            toast.success('AI blog post generated successfully! It\'s pending approval.');
+            fetchPosts();
+          } else if (eventName === 'error') {
+            toast.error(data.detail);
+          }
+        });
+      }
+    } catch (error) {
+      if (error.name === 'AbortError') {
+        toast.info('AI generation stopped');
+      } else {
+        console.error('Error streaming AI blog post:', error);
+        toast.error('Failed to generate blog post');
+      }
+    } finally {
+      setStreamController(null);
+    }
+  };
+
+  const handleStopStream = () => {
+    if (streamController) {
+      streamController.abort();
+    }
+  };
+
+  const pollGenerationJob = async (jobId) => {
+    const token = localStorage.getItem('adminToken');
+    
+    try {
+      const response = await axios.get(
+        `${process.env.REACT_APP_BACKEND_URL}/admin/blog/jobs/${jobId}`,
+        { headers: { Authorization: `Bearer ${token}` } }
+      );
+      const job = response.data;
+      
+      if (job.status === 'completed') {
+        toast.success(`AI blog post "${job.request.topic}" generated! It's pending approval.`);
+        fetchPosts();
+      } else if (job.status === 'failed') {
+        toast.error(`Failed to generate "${job.request.topic}": ${job.error || 'unknown error'}`);
+      } else {
+        setTimeout(() => pollGenerationJob(jobId), 3000);
+      }
+    } catch (error) {
+      console.error('Error checking AI generation job:', error);
+      setTimeout(() => pollGenerationJob(jobId), 10000);
+    }
+  };
+
   const handleEdit = (post) => {
     setEditingPost(post);
     setPostForm({
@@ -407,11 +504,44 @@ const AdminBlog = () => {
                       </div>
                     </div>
                     
+                    {streamPreview && (
+                      <div className="border rounded-lg p-4 bg-slate-50 max-h-64 overflow-y-auto">
+                        <h4 className="font-semibold text-slate-800 mb-2">
+                          {streamPreview.title || 'Waiting for title...'}
+                        </h4>
+                        <p className="text-sm text-slate-600 whitespace-pre-wrap">
+                          {streamPreview.content}
+                        </p>
+                      </div>
+                    )}
+                    
                     <div className="flex space-x-3 pt-4">
+                      {streamController ? (
+                        <Button 
+                          type="button" 
+                          variant="destructive"
+                          className="flex-1"
+                          onClick={handleStopStream}
+                        >
+                          <XCircle className="mr-2 h-4 w-4" />
+                          Stop Generation
+                        </Button>
+                      ) : (
+                        <Button 
+                          type="button" 
+                          variant="outline"
+                          className="flex-1"
+                          onClick={handleStreamAI}
+                          disabled={generating}
+                        >
+                          <Eye className="mr-2 h-4 w-4" />
+                          Live Preview
+                        </Button>
+                      )}
                       <Button 
                         type="submit" 
                         className="flex-1 bg-purple-600 hover:bg-purple-700"
-                        disabled={generating}
+                        disabled={generating || !!streamController}
                       >
                         {generating ? (
                           <>
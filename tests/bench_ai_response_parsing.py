@@ -0,0 +1,38 @@
+"""
+Benchmark for parsing labelled AI blog responses
+
+Run with: python tests/bench_ai_response_parsing.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from ai_blog_generator import StreamingSectionParser, tokenize_sections  # noqa: E402
+from test_ai_blog_generator import large_response  # noqa: E402
+
+def stream(text: str, size: int) -> dict:
+    parser = StreamingSectionParser()
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+    parser.finish()
+    return parser.fields()
+
+def main():
+    for paragraphs in (100, 2000, 20000):
+        response = large_response(paragraphs)
+        kilobytes = len(response) / 1024
+        cases = [
+            ("tokenize_sections", lambda: tokenize_sections(response)),
+            ("stream, 16-char chunks", lambda: stream(response, 16)),
+            ("stream, 1 KB chunks", lambda: stream(response, 1024)),
+        ]
+        for name, parse in cases:
+            runs, seconds = timeit.Timer(parse).autorange()
+            per_run = seconds / runs
+            print(f"{kilobytes:9.0f} KB  {name:24s} {per_run * 1000:9.2f} ms  {kilobytes / 1024 / per_run:7.1f} MB/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Tests for parsing labelled AI blog responses
+"""
+
+import pytest
+
+from ai_blog_generator import StreamingSectionParser, tokenize_sections
+
+BOLD_RESPONSE = (
+    "**BLOG_TITLE**: Hi\n"
+    "**BLOG_CONTENT**:\n"
+    "body text\n"
+    "## Heading\n"
+    "more body\n"
+    "**SEO_KEYWORDS**: kashmir, travel\n"
+)
+
+PLAIN_RESPONSE = (
+    "BLOG_TITLE: Houseboats of Dal Lake\n"
+    "BLOG_SLUG: houseboats-of-dal-lake\n"
+    "EXCERPT: A night on the water\n"
+    "BLOG_CONTENT:\n"
+    "## Intro\n"
+    "BLOG is not a marker here\n"
+    "Some text\n"
+    "SUGGESTED_TAGS: dal lake, houseboat"
+)
+
+EDGE_RESPONSE = (
+    "Sure! Here is your post.\n"
+    "### META_TITLE: Gulmarg in Winter\n"
+    "BLOG_TITLE:Gulmarg\n"
+    "EXCERPT:\n"
+    "BLOG_CONTENT: Snow arrives in December.\n"
+    "Skiing on Apharwat.\n"
+    "**BLOG_TITLE:** A second title is ignored\n"
+    "SEO_KEYWORDS:\n"
+    "- gulmarg\n"
+    "- skiing\n"
+    "SUGGESTED_TAGS:"
+)
+
+def large_response(paragraphs: int = 2000) -> str:
+    body = "\n".join(f"## Day {i}\nWalk the ghats of Srinagar, stop at stall {i} for kahwa." for i in range(paragraphs))
+    return f"BLOG_TITLE: Long post\nEXCERPT: Many days\nBLOG_CONTENT:\n{body}\nSEO_KEYWORDS: {', '.join(['kashmir'] * 50)}\n"
+
+def stream(text: str, size: int) -> dict:
+    parser = StreamingSectionParser()
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+    parser.finish()
+    return parser.fields()
+
+@pytest.mark.parametrize("response", [BOLD_RESPONSE, PLAIN_RESPONSE, EDGE_RESPONSE])
+def test_streaming_parser_handles_every_chunk_size(response):
+    expected = tokenize_sections(response)
+    assert expected["title"] and expected["content"]
+    for size in range(1, len(response) + 1):
+        assert stream(response, size) == expected, f"chunk size {size}"
+
+def test_bold_markers_split_across_chunks():
+    fields = stream(BOLD_RESPONSE, 1)
+    assert fields["title"] == "Hi"
+    assert fields["content"] == "body text\n## Heading\nmore body"
+    assert fields["seoKeywords"] == "kashmir, travel"
+
+def test_edge_cases_match_tokenizer():
+    fields = tokenize_sections(EDGE_RESPONSE)
+    assert fields["title"] == "Gulmarg"
+    assert fields["metaTitle"] == "Gulmarg in Winter"
+    assert fields["excerpt"] == ""
+    assert fields["content"] == "Snow arrives in December.\nSkiing on Apharwat."
+    assert fields["tags"] == ""
+    assert stream(EDGE_RESPONSE, 3) == fields
+
+@pytest.mark.parametrize("size", [1, 7, 64, 4096])
+def test_large_response_matches_tokenizer(size):
+    response = large_response()
+    assert stream(response, size) == tokenize_sections(response)
@@ -0,0 +1,126 @@
+"""
+Tests for the pooled LLM client against a local OpenAI-compatible stub server
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm_client import LlmClientPool, PooledChat
+
+class StubLlmHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.requests.append((self.path, self.headers.get("Authorization"), body))
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        content = f"echo: {body['messages'][-1]['content']}"
+        payload = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 2}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubLlmHandler)
+    server.lock = threading.Lock()
+    server.connections, server.requests = set(), []
+    server.in_flight = server.max_in_flight = 0
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def pool(stub_server, monkeypatch):
+    monkeypatch.delenv("LLM_BASE_URL", raising=False)
+    monkeypatch.setenv("LLM_BASE_URL_OPENAI", f"http://127.0.0.1:{stub_server.server_port}")
+    monkeypatch.setenv("LLM_API_KEY_OPENAI", "stub-key")
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY_OPENAI", "2")
+    return LlmClientPool()
+
+class Message:
+    def __init__(self, text):
+        self.text = text
+
+def test_calls_reuse_one_client_and_connection(pool, stub_server):
+    async def run():
+        replies = []
+        for i in range(5):
+            chat = pool.chat("openai", "gpt-4o-mini", "system prompt")
+            replies.append(await chat.send_message(Message(f"hello {i}")))
+        await pool.aclose()
+        return replies
+
+    replies = asyncio.run(run())
+
+    assert replies == [f"echo: hello {i}" for i in range(5)]
+    assert pool.chat("openai", "gpt-4o-mini", "system prompt") is pool.chat("openai", "gpt-4o-mini", "system prompt")
+    assert isinstance(pool.chat("openai", "gpt-4o-mini", "system prompt"), PooledChat)
+    assert len(stub_server.connections) == 1
+    path, authorization, body = stub_server.requests[0]
+    assert path == "/chat/completions"
+    assert authorization == "Bearer stub-key"
+    assert body["model"] == "gpt-4o-mini"
+    assert body["messages"][0] == {"role": "system", "content": "system prompt"}
+
+def test_provider_concurrency_limit(pool, stub_server):
+    stub_server.delay = 0.1
+
+    async def run():
+        chat = pool.chat("openai", "gpt-4o-mini", "system prompt")
+        replies = await asyncio.gather(*(chat.send_message(Message(str(i))) for i in range(6)))
+        await pool.aclose()
+        return replies
+
+    replies = asyncio.run(run())
+
+    assert sorted(replies) == sorted(f"echo: {i}" for i in range(6))
+    assert stub_server.max_in_flight == 2
+
+def test_endpoint_is_per_provider(pool, monkeypatch):
+    assert pool.provider_base_url("openai").startswith("http://127.0.0.1:")
+    assert pool.provider_base_url("anthropic") is None
+    monkeypatch.setenv("LLM_BASE_URL_ANTHROPIC", "http://127.0.0.1:1")
+    assert pool.provider_base_url("anthropic") == "http://127.0.0.1:1"
+
+def test_queueing_for_a_slot_is_not_a_provider_failure(pool, stub_server):
+    stub_server.delay = 0.5
+
+    async def run():
+        chat = pool.chat("openai", "gpt-4o-mini", "system prompt")
+        slow = [asyncio.create_task(chat.send_message(Message(str(i)))) for i in range(2)]
+        await asyncio.sleep(0.1)
+        with pytest.raises(asyncio.TimeoutError):
+            await chat.send_message(Message("queued"), timeout=0.1)
+        failures = pool.breaker("openai").consecutive_failures
+        await asyncio.gather(*slow)
+        await pool.aclose()
+        return failures
+
+    assert asyncio.run(run()) == 0
+    assert pool.breaker("openai").consecutive_failures == 0
+    assert pool.semaphore("openai")._value == 2
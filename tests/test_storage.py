@@ -0,0 +1,118 @@
+"""
+Tests for the storage backends, with S3 running against moto's in-process stand-in
+"""
+
+import asyncio
+import os
+from urllib.parse import parse_qs, urlparse
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from storage import LocalStorage, S3Storage, StorageBackend
+
+BUCKET = "gmb-uploads"
+MB = 1024 * 1024
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield S3Storage(BUCKET, prefix="media", region="us-east-1", multipart_threshold=5 * MB)
+
+def scratch_file(tmp_path, name: str, size: int):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    return path
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+    class Incomplete(StorageBackend):
+        async def exists(self, key):
+            return False
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_s3_put_exists_download_delete(s3_storage, tmp_path):
+    source = scratch_file(tmp_path, "upload.part", 1024)
+    content = source.read_bytes()
+
+    async def run():
+        await s3_storage.put_file("ab/abc.jpg", source, "image/jpeg", "public, max-age=31536000, immutable")
+        assert not source.exists()  # put_file consumes the scratch file
+        assert await s3_storage.exists("ab/abc.jpg")
+        assert not await s3_storage.exists("ab/missing.jpg")
+
+        copy = tmp_path / "copy.jpg"
+        await s3_storage.download("ab/abc.jpg", copy)
+        assert copy.read_bytes() == content
+
+        await s3_storage.delete("ab/abc.jpg")
+        assert not await s3_storage.exists("ab/abc.jpg")
+
+    asyncio.run(run())
+
+def test_s3_object_metadata_and_prefix(s3_storage, tmp_path):
+    asyncio.run(s3_storage.put_file(
+        "ab/abc.png", scratch_file(tmp_path, "a.part", 10), "image/png", "public, max-age=31536000, immutable"
+    ))
+    # Stored under the prefix, with the headers the upload was given
+    head = s3_storage.client.head_object(Bucket=BUCKET, Key="media/ab/abc.png")
+    assert head["ContentType"] == "image/png"
+    assert head["CacheControl"] == "public, max-age=31536000, immutable"
+
+def test_s3_large_files_use_multipart_upload(s3_storage, tmp_path):
+    asyncio.run(s3_storage.put_file("pdfs/big.pdf", scratch_file(tmp_path, "big.part", 11 * MB), "application/pdf"))
+    head = s3_storage.client.head_object(Bucket=BUCKET, Key="media/pdfs/big.pdf")
+    assert head["ContentLength"] == 11 * MB
+    assert head["ETag"].strip('"').endswith("-3")  # three parts of at most 5 MB
+
+def test_s3_delete_prefix_removes_variants(s3_storage, tmp_path):
+    async def run():
+        for name in ("abc-320.webp", "abc-640.webp", "abc-640.avif", "abd-320.webp"):
+            await s3_storage.put_file(f"derived/ab/{name}", scratch_file(tmp_path, name, 10), "image/webp")
+        removed = await s3_storage.delete_prefix("derived/ab/abc-")
+        return removed, await s3_storage.exists("derived/ab/abd-320.webp")
+
+    assert asyncio.run(run()) == (3, True)
+
+def test_s3_urls(s3_storage, tmp_path):
+    url = s3_storage.url("ab/abc.jpg")
+    assert url == f"https://{BUCKET}.s3.us-east-1.amazonaws.com/media/ab/abc.jpg"
+    assert s3_storage.key_for_url(url) == "ab/abc.jpg"
+    assert s3_storage.key_for_url("/uploads/ab/abc.jpg") is None
+
+    asyncio.run(s3_storage.put_file("pdfs/quote.pdf", scratch_file(tmp_path, "q.part", 10), "application/pdf"))
+    presigned = asyncio.run(s3_storage.presigned_url("pdfs/quote.pdf", expires_in=600, filename="quote.pdf"))
+    query = parse_qs(urlparse(presigned).query)
+    assert urlparse(presigned).path.endswith("/media/pdfs/quote.pdf")
+    assert query["response-content-disposition"] == ['attachment; filename="quote.pdf"']
+    assert "X-Amz-Signature" in query or "Signature" in query
+
+def test_local_storage_round_trip(tmp_path):
+    storage = LocalStorage(root=tmp_path / "uploads", base_url="/uploads")
+    source = scratch_file(tmp_path, "upload.part", 100)
+    content = source.read_bytes()
+
+    async def run():
+        await storage.put_file("ab/abc.jpg", source, "image/jpeg")
+        assert await storage.exists("ab/abc.jpg")
+        assert storage.local_path("ab/abc.jpg").read_bytes() == content
+        await storage.put_file("derived/ab/abc-320.webp", scratch_file(tmp_path, "v.part", 10))
+        assert await storage.delete_prefix("derived/ab/abc-") == 1
+        await storage.delete("ab/abc.jpg")
+        assert not await storage.exists("ab/abc.jpg")
+
+    asyncio.run(run())
+
+    assert not source.exists()
+    assert storage.key_for_url("https://example.com/uploads/ab/abc.jpg") == "ab/abc.jpg"
+    with pytest.raises(ValueError):
+        storage._path("../outside.jpg")